@@ -0,0 +1,95 @@
+import asyncio
+from collections import deque
+
+MESSAGE_LIMIT = 2000  # batas karakter satu pesan Discord
+
+
+class AuditLogSink:
+    # Penampung event untuk channel log (#bukti-transaksi). Mode batch:
+    # event ditampung per guild lalu dikirim sebagai satu pesan gabungan
+    # tiap `interval` detik atau setelah `max_events` event. Buffer dibatasi
+    # `max_buffer` per guild; kalau penuh event tertua dibuang dan jumlahnya
+    # dicatat di pesan berikutnya. Mode instan (batched=False) mengirim
+    # tiap event langsung seperti dulu, cocok untuk server sepi.
+
+    def __init__(self, resolve_channel, batched=True, interval=10.0, max_events=20, max_buffer=1000):
+        self.resolve_channel = resolve_channel  # fn(guild) -> TextChannel | None
+        self.batched = batched
+        self.interval = interval
+        self.max_events = max_events
+        self.max_buffer = max_buffer
+        self._buffers = {}  # guild_id -> (guild, deque[str])
+        self._dropped = {}  # guild_id -> jumlah event yang dibuang
+        self._task = None
+        self._closing = False
+        self._wake = asyncio.Event()
+        self.sent = 0
+
+    async def post(self, guild, text):
+        if not self.batched:
+            await self._send(guild, [text])
+            return
+        entry = self._buffers.get(guild.id)
+        if entry is None:
+            entry = self._buffers[guild.id] = (guild, deque(maxlen=self.max_buffer))
+        buffer = entry[1]
+        if len(buffer) == self.max_buffer:
+            self._dropped[guild.id] = self._dropped.get(guild.id, 0) + 1
+        buffer.append(text)
+        if len(buffer) >= self.max_events:
+            self._wake.set()
+
+    # --- Lifecycle ---
+    def start(self):
+        if self.batched and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def close(self):
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        buffers, self._buffers = self._buffers, {}
+        dropped, self._dropped = self._dropped, {}
+        for guild_id, (guild, buffer) in buffers.items():
+            lines = list(buffer)
+            if dropped.get(guild_id):
+                lines.insert(0, f"⚠️ {dropped[guild_id]} event log terlewat (buffer penuh).")
+            await self._send(guild, lines)
+
+    # --- Kirim ---
+    def _chunks(self, lines):
+        # Gabungkan event ke pesan sebesar mungkin tanpa melewati batas karakter
+        chunk = ""
+        for line in lines:
+            line = line[:MESSAGE_LIMIT]
+            if chunk and len(chunk) + 2 + len(line) > MESSAGE_LIMIT:
+                yield chunk
+                chunk = ""
+            chunk = f"{chunk}\n\n{line}" if chunk else line
+        if chunk:
+            yield chunk
+
+    async def _send(self, guild, lines):
+        channel = self.resolve_channel(guild)
+        if channel is None:
+            return
+        for chunk in self._chunks(lines):
+            try:
+                await channel.send(chunk)
+                self.sent += 1
+            except Exception as e:
+                print(f"⚠️ Gagal kirim log transaksi: {e}")
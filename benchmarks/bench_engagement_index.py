@@ -0,0 +1,83 @@
+# Benchmark EngagementIndex: latensi lookup dan memori di 1M / 10M key.
+#
+#   python benchmarks/bench_engagement_index.py --sizes 1000000,10000000
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engagement_index import EngagementIndex  # noqa: E402
+
+
+def legacy_bytes_per_key(sample=50000):
+    # Memori dict-of-dicts hasil json.load(engagement_log.json), per key
+    rng = random.Random(1)
+    tracemalloc.start()
+    log = {format(rng.getrandbits(64), '016x'): {"like": True} for _ in range(sample)}
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del log
+    return size / sample
+
+
+def time_lookups(index, keys_hex, task_type):
+    start = time.perf_counter()
+    for key in keys_hex:
+        index.contains(key, task_type)
+    return (time.perf_counter() - start) / len(keys_hex) * 1e9
+
+
+def run(size, lookups, rng):
+    keys = array('Q', sorted({rng.getrandbits(64) for _ in range(size)}))
+    masks = bytearray([1]) * len(keys)
+    hits = [format(keys[rng.randrange(len(keys))], '016x') for _ in range(lookups)]
+    misses = [format(rng.getrandbits(64), '016x') for _ in range(lookups)]
+
+    results = []
+    for bloom in (False, True):
+        index = EngagementIndex(bloom=bloom)
+        start = time.perf_counter()
+        index.load_arrays(keys, masks)
+        build = time.perf_counter() - start
+        results.append({
+            "bloom": bloom,
+            "build_s": build,
+            "hit_ns": time_lookups(index, hits, "like"),
+            "miss_ns": time_lookups(index, misses, "like"),
+            "insert_ns": None,
+            "mem_mb": index.memory_bytes() / 1e6,
+        })
+        start = time.perf_counter()
+        for key in misses:
+            index.add(key, "retweet")
+        results[-1]["insert_ns"] = (time.perf_counter() - start) / len(misses) * 1e9
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000000,10000000")
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    legacy = legacy_bytes_per_key()
+    print(f"engagement_log.json di memori (dict of dict): ~{legacy:.0f} byte/key")
+    print(f"{'keys':>10} {'bloom':>5} {'build s':>8} {'hit ns':>8} {'miss ns':>8} {'insert ns':>9} {'MB':>8} {'legacy MB':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for r in run(size, args.lookups, rng):
+            print(
+                f"{size:>10} {'ya' if r['bloom'] else '-':>5} {r['build_s']:>8.2f} {r['hit_ns']:>8.0f} "
+                f"{r['miss_ns']:>8.0f} {r['insert_ns']:>9.0f} {r['mem_mb']:>8.1f} {legacy * size / 1e6:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
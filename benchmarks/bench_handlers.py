@@ -0,0 +1,320 @@
+# Benchmark handler utama (on_reaction_add, !ambil, process_payment,
+# !givepoint, expire_requests) tanpa gateway: main.py dijalankan apa adanya
+# di atas layer Discord palsu (benchmarks/fake_discord.py) dan dataset
+# sintetis di direktori sementara.
+#
+#   python benchmarks/bench_handlers.py --users 10000 --requests 10000 --events 2000
+#   python benchmarks/bench_handlers.py --users 1000000 --engagements 5000000
+#
+# Sebagai regression gate:
+#
+#   python benchmarks/bench_handlers.py --save baseline.json
+#   python benchmarks/bench_handlers.py --baseline baseline.json --tolerance 0.25
+#
+# keluar dengan kode 1 kalau throughput turun, p99 naik, atau REST call /
+# byte per event naik melebihi toleransi.
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeContext, FakeMessage, FakeReaction, FakeReference, FakeWorld  # noqa: E402
+
+# Jendela debounce dipersingkat supaya kerja tertunda ikut terhitung per skenario
+BENCH_ENV = {
+    "EMBED_RENDER_WINDOW": "0.05",
+    "EMBED_RENDER_INTERVAL": "0.1",
+    "ROLE_SYNC_WINDOW": "0.05",
+    "AUDIT_LOG_INTERVAL": "0.1",
+    "METRICS_PORT": "0",
+}
+DRAIN_SECONDS = 0.5
+USER_ID_BASE = 1 << 50
+
+
+def written_bytes():
+    # Byte yang ditulis proses ini (write syscall), Linux saja
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+# --- Dataset ---
+def generate_dataset(args, rng, channel_id):
+    users = range(USER_ID_BASE, USER_ID_BASE + args.users)
+    points = {str(uid): float(rng.randrange(0, 200)) for uid in users}
+
+    requests = {}
+    for i in range(args.requests):
+        msg_id = USER_ID_BASE * 2 + i
+        requester = str(rng.choice(users))
+        requests[str(msg_id)] = {
+            "requester_id": requester,
+            "link": f"https://x.com/user/status/{msg_id}",
+            "tasks": [
+                {"type": "comment", "text": f"komentar {n}", "price": 1.0, "assigned_to": None, "status": "open"}
+                for n in range(args.comments)
+            ],
+            "channel_id": str(channel_id),
+            "message_id": str(msg_id),
+            "liked_by": [],
+            "retweeted_by": [],
+            "followed_by": [],
+            "expiry_timestamp": int(time.time()) + 7 * 86400,
+            "escrow_key": f"escrow_{msg_id}",
+        }
+        points[f"escrow_{msg_id}"] = float(args.comments)
+
+    engagements = {}
+    for _ in range(args.engagements):
+        key = format(rng.getrandbits(64), "016x")
+        engagements[key] = {"like": True}
+
+    # Pelaku event: pasangan (user, request) yang sudah follow requester
+    actors = []
+    follows = {}
+    request_ids = list(requests)
+    for _ in range(args.events):
+        msg_id = rng.choice(request_ids)
+        user = rng.choice(users)
+        while str(user) == requests[msg_id]["requester_id"]:
+            user = rng.choice(users)
+        actors.append((user, msg_id))
+        follows[f"{user}_{requests[msg_id]['requester_id']}"] = True
+
+    return points, requests, follows, engagements, actors
+
+
+def write_dataset(directory, backend, points, requests, follows, engagements):
+    from storage import ENGAGEMENT_FILE, FOLLOWS_FILE, POINTS_FILE, REQUESTS_FILE, migrate_json_to_sqlite
+
+    for name, doc in ((POINTS_FILE, points), (REQUESTS_FILE, requests), (FOLLOWS_FILE, follows), (ENGAGEMENT_FILE, engagements)):
+        with open(os.path.join(directory, name), "w") as f:
+            json.dump(doc, f)
+    if backend == "sqlite":
+        migrate_json_to_sqlite(directory, os.path.join(directory, "bot.db"))
+
+
+# --- Skenario ---
+def scenario_reaction(main, world, actors, rng):
+    channel = world.guild.channel_named("jual-beli")
+    for user_id, msg_id in actors:
+        member = world.guild.get_member(user_id)
+        message = channel.messages[int(msg_id)]
+        emoji = rng.choice(("❤️", "🔁"))
+        yield 1, main.on_reaction_add(FakeReaction(message, emoji), member)
+
+
+def scenario_take_task(main, world, actors, rng):
+    channel = world.guild.channel_named("jual-beli")
+    for user_id, msg_id in actors:
+        member = world.guild.get_member(user_id)
+        target = channel.messages[int(msg_id)]
+        command = FakeMessage(world, channel, member, "!ambil 1", reference=FakeReference(target))
+        ctx = FakeContext(world, member, channel, command)
+        yield 1, main.take_task.callback(ctx, 1)
+
+
+def scenario_process_payment(main, world, actors, rng):
+    # Menyetujui klaim yang dibuat skenario reaksi dan !ambil
+    for dm_id in list(main.pending_verifications)[:len(actors)]:
+        data = main.claim_pending(dm_id)
+        if data is not None:
+            yield 1, main.process_payment(data, approved=True, dm_id=dm_id)
+
+
+def scenario_give_point(main, world, actors, rng):
+    channel = world.guild.channel_named("bukti-transaksi")
+    for user_id, _ in actors:
+        giver = world.guild.get_member(user_id)
+        receiver = world.guild.get_member(rng.choice(world.guild.member_ids))
+        if receiver is giver:
+            continue
+        command = FakeMessage(world, channel, giver, "!givepoint")
+        ctx = FakeContext(world, giver, channel, command)
+        yield 1, main.give_point.callback(ctx, receiver, rng.randint(1, 3))
+
+
+def scenario_expire(main, world, actors, rng, batch=100):
+    msg_ids = list(dict.fromkeys(msg_id for _, msg_id in actors))
+    for i in range(0, len(msg_ids), batch):
+        chunk = [(world.guild.id, msg_id) for msg_id in msg_ids[i:i + batch]]
+        for key in chunk:
+            main.expiry_timers.cancel(key)
+        yield len(chunk), main.expire_requests(chunk)
+
+
+SCENARIOS = {
+    "on_reaction_add": scenario_reaction,
+    "take_task": scenario_take_task,
+    "process_payment": scenario_process_payment,
+    "give_point": scenario_give_point,
+    "expire_requests": scenario_expire,
+}
+
+
+async def run_scenario(main, world, name, events, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    items = 0
+
+    async def timed(count, coro):
+        nonlocal items
+        async with semaphore:
+            start = time.perf_counter()
+            await coro
+            latencies.append(time.perf_counter() - start)
+            items += count
+
+    rest_before = world.rest.total()
+    routes_before = dict(world.rest.calls)
+    bytes_before = written_bytes()
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(count, coro) for count, coro in events))
+    elapsed = time.perf_counter() - start
+
+    # Kerja tertunda (render embed, sinkron role, log, write-behind) ikut dihitung
+    await asyncio.sleep(DRAIN_SECONDS)
+    await main.audit_log.flush()
+    state = main.guild_states.get(world.guild.id)
+    await state.engagement_index.flush()
+    await state.ledger.flush()
+    bytes_after = written_bytes()
+
+    latencies.sort()
+    items = max(items, 1)
+    routes = {route: count - routes_before.get(route, 0) for route, count in world.rest.calls.items()}
+    return {
+        "events": items,
+        "throughput": items / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0,
+        "rest_per_event": (world.rest.total() - rest_before) / items,
+        "bytes_per_event": (bytes_after - bytes_before) / items if bytes_before is not None else None,
+        "routes": {route: count for route, count in routes.items() if count},
+    }
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    main = importlib.import_module("main")
+    world = FakeWorld(
+        range(USER_ID_BASE, USER_ID_BASE + args.users),
+        list(main.ROLE_NAMES.values()),
+        ["general", "jual-beli", "bukti-transaksi"],
+    )
+    world.install(main.bot)
+
+    channel = world.guild.channel_named("jual-beli")
+    points, requests, follows, engagements, actors = generate_dataset(args, rng, channel.id)
+    for msg_id in requests:
+        channel.messages[int(msg_id)] = FakeMessage(world, channel, world.bot_user, embed=object(), message_id=int(msg_id))
+    directory, _ = main.guild_data_paths(world.guild.id)
+    os.makedirs(directory, exist_ok=True)
+    write_dataset(directory, args.backend, points, requests, follows, engagements)
+    del points, requests, follows, engagements
+
+    start = time.perf_counter()
+    await main.on_ready()
+    print(f"startup: {time.perf_counter() - start:.2f} s ({args.users} user, {args.requests} request)")
+
+    results = {}
+    selected = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    for name in selected:
+        events = list(SCENARIOS[name](main, world, actors, rng))
+        results[name] = await run_scenario(main, world, name, events, args.concurrency)
+
+    await main.bot.close()
+    return results
+
+
+def report(results):
+    print(f"\n{'skenario':<18} {'event':>7} {'event/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'REST/ev':>8} {'byte/ev':>10}")
+    for name, r in results.items():
+        written = f"{r['bytes_per_event']:>10.0f}" if r["bytes_per_event"] is not None else f"{'-':>10}"
+        print(f"{name:<18} {r['events']:>7} {r['throughput']:>10.1f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['rest_per_event']:>8.2f} {written}")
+    print("\nREST call per skenario:")
+    for name, r in results.items():
+        routes = ", ".join(f"{route} ×{count}" for route, count in sorted(r["routes"].items(), key=lambda x: -x[1]))
+        print(f"  {name}: {routes or '-'}")
+
+
+def compare(results, baseline, tolerance):
+    # Daftar regresi terhadap baseline; kosong berarti lolos
+    failures = []
+    for name, base in baseline.items():
+        r = results.get(name)
+        if r is None:
+            continue
+        if r["throughput"] < base["throughput"] * (1 - tolerance):
+            failures.append(f"{name}: throughput {r['throughput']:.1f} < {base['throughput']:.1f}")
+        if r["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            failures.append(f"{name}: p99 {r['p99_ms']:.2f} ms > {base['p99_ms']:.2f} ms")
+        if r["rest_per_event"] > base["rest_per_event"] * (1 + tolerance):
+            failures.append(f"{name}: REST/event {r['rest_per_event']:.2f} > {base['rest_per_event']:.2f}")
+        if r["bytes_per_event"] is not None and base.get("bytes_per_event") is not None:
+            if r["bytes_per_event"] > base["bytes_per_event"] * (1 + tolerance):
+                failures.append(f"{name}: byte/event {r['bytes_per_event']:.0f} > {base['bytes_per_event']:.0f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=3, help="komentar per request")
+    parser.add_argument("--engagements", type=int, default=100000, help="entri engagement_log awal")
+    parser.add_argument("--events", type=int, default=2000, help="event per skenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--scenarios", default="", help="daftar dipisah koma; default semua")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="simpan hasil sebagai baseline JSON")
+    parser.add_argument("--baseline", help="bandingkan dengan baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    save_path = os.path.abspath(args.save) if args.save else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = tempfile.mkdtemp(prefix="bench_handlers_")
+    os.chdir(workdir)
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ.setdefault("SQLITE_PATH", os.path.join(workdir, "bot.db"))
+    print(f"data: {workdir}")
+
+    results = asyncio.run(run(args))
+    report(results)
+
+    if save_path:
+        with open(save_path, "w") as f:
+            json.dump(results, f, indent=2)
+    if baseline_path:
+        with open(baseline_path) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        if failures:
+            print("\n❌ Regresi:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print("\n✅ Tidak ada regresi terhadap baseline")
+
+
+if __name__ == "__main__":
+    main()
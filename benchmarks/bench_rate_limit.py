@@ -0,0 +1,83 @@
+# Benchmark anti-spam: memori dan latensi SlidingWindowLimiter dibanding
+# defaultdict(list) lama, pada aliran pesan simulasi dari 100k user.
+#
+#   python benchmarks/bench_rate_limit.py --users 100000 --messages 2000000
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rate_limit import SlidingWindowLimiter  # noqa: E402
+
+
+class LegacyLimiter:
+    # Logika on_message sebelum SlidingWindowLimiter
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.user_message_count = defaultdict(list)
+
+    def hit(self, key, now):
+        self.user_message_count[key] = [t for t in self.user_message_count[key] if now - t < self.window]
+        self.user_message_count[key].append(now)
+        return len(self.user_message_count[key]) > self.limit
+
+    def __len__(self):
+        return len(self.user_message_count)
+
+
+def stream(users, messages, rate, seed):
+    # Pesan datang `rate` per detik; user dipilih acak dengan sebaran
+    # condong (sebagian kecil user sangat aktif), dan populasi yang aktif
+    # bergeser seiring waktu sehingga semua user akhirnya pernah bicara.
+    rng = random.Random(seed)
+    for i in range(messages):
+        now = i / rate
+        offset = int(users * i / messages)
+        user = (offset + int(rng.paretovariate(1.2)) * 7919 + rng.randrange(500)) % users
+        yield user, now
+
+
+def run(name, limiter, args, samples):
+    tracemalloc.start()
+    checkpoints = set(args.messages * k // samples for k in range(1, samples + 1))
+    rows = []
+    muted = 0
+    start = time.perf_counter()
+    for i, (user, now) in enumerate(stream(args.users, args.messages, args.rate, args.seed), 1):
+        muted += limiter.hit(user, now)
+        if i in checkpoints:
+            size, _ = tracemalloc.get_traced_memory()
+            rows.append((i, len(limiter), size / 1e6))
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    print(f"\n{name}: {elapsed / args.messages * 1e9:.0f} ns/pesan (dengan tracemalloc), {muted} pesan melewati batas")
+    print(f"{'pesan':>10} {'key':>8} {'memori MB':>10}")
+    for i, keys, mb in rows:
+        print(f"{i:>10} {keys:>8} {mb:>10.2f}")
+    return muted
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--messages", type=int, default=2000000)
+    parser.add_argument("--rate", type=float, default=200.0, help="pesan per detik")
+    parser.add_argument("--samples", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    legacy = run("defaultdict(list)", LegacyLimiter(7, 60), args, args.samples)
+    ring = run("SlidingWindowLimiter", SlidingWindowLimiter(7, 60, capacity=args.users), args, args.samples)
+    if legacy != ring:
+        print(f"\n⚠️ Hasil berbeda: {legacy} vs {ring}")
+
+
+if __name__ == "__main__":
+    main()
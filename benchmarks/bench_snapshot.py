@@ -0,0 +1,98 @@
+# Benchmark snapshot biner: waktu tulis dan waktu muat state saat start
+# (saldo, index engagement, graf follow, statistik pemberi) dibandingkan
+# dengan membaca file JSON lama.
+#
+#   python benchmarks/bench_snapshot.py --users 1000000 --engagements 10000000
+#   python benchmarks/bench_snapshot.py --users 100000 --engagements 1000000 --json
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engagement_index import EngagementIndex  # noqa: E402
+from follow_graph import FollowGraph  # noqa: E402
+from snapshot import Snapshot, build_sections, write_snapshot  # noqa: E402
+
+USER_ID_BASE = 1 << 50
+
+
+def generate(args, rng):
+    users = [USER_ID_BASE + i for i in range(args.users)]
+    balances = {str(uid): float(rng.randrange(0, 200)) for uid in users}
+    keys = array('Q', sorted({rng.getrandbits(64) for _ in range(args.engagements)}))
+    masks = bytearray(rng.choice((1, 2, 4, 8)) for _ in range(len(keys)))
+    graph = FollowGraph()
+    graph.load((rng.choice(users), rng.choice(users)) for _ in range(args.follows))
+    giver_stats = {str(uid): (rng.randrange(1, 50), float(rng.randrange(1, 500))) for uid in users[:args.users // 10]}
+    return balances, (keys, masks), graph, giver_stats
+
+
+def load_snapshot(path):
+    start = time.perf_counter()
+    with Snapshot(path) as snap:
+        opened = time.perf_counter() - start
+        balances = snap.balances()
+        index = EngagementIndex()
+        index.load_arrays(*snap.engagements())
+        graph = FollowGraph()
+        graph.load_arrays(*snap.follows())
+        snap.giver_stats()
+        timings = dict(snap.timings)
+    return time.perf_counter() - start, opened, timings, len(balances)
+
+
+def load_json(directory):
+    start = time.perf_counter()
+    with open(os.path.join(directory, "points.json")) as f:
+        json.load(f)
+    index = EngagementIndex()
+    with open(os.path.join(directory, "engagement_log.json")) as f:
+        index.load(json.load(f))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark snapshot biner state bot")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--engagements", type=int, default=10000000)
+    parser.add_argument("--follows", type=int, default=1000000)
+    parser.add_argument("--json", action="store_true", help="bandingkan dengan points.json + engagement_log.json")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"Membuat dataset: {args.users} user, {args.engagements} engagement, {args.follows} follow ...")
+    balances, engagements, graph, giver_stats = generate(args, rng)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.snap")
+        start = time.perf_counter()
+        sections = build_sections(balances, engagements, graph.arrays(), giver_stats, {}, {}, {})
+        size = write_snapshot(path, sections)
+        print(f"Tulis snapshot: {time.perf_counter() - start:.2f} detik, {size / 1e6:.1f} MB")
+
+        total, opened, timings, loaded = load_snapshot(path)
+        print(f"Muat snapshot:  {total:.3f} detik ({loaded} saldo; buka + header {opened * 1000:.1f} ms)")
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            print(f"  {name:<18} {seconds * 1000:>8.1f} ms")
+
+        if args.json:
+            with open(os.path.join(directory, "points.json"), "w") as f:
+                json.dump(balances, f, indent=4)
+            keys, masks = engagements
+            log = {f"{key:016x}": {"like": True} for key in keys}
+            with open(os.path.join(directory, "engagement_log.json"), "w") as f:
+                json.dump(log, f, indent=4)
+            del log
+            print(f"Muat JSON lama: {load_json(directory):.3f} detik (points.json + engagement_log.json)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+# Pengganti objek Discord untuk benchmark offline. Objek di sini meniru
+# atribut/method yang dipakai handler di main.py; setiap method yang di bot
+# asli memanggil REST API dicatat di RestLog dan tidak menyentuh jaringan.
+
+import asyncio
+import itertools
+from collections import Counter
+
+import discord
+
+_snowflakes = itertools.count(1 << 60)
+
+
+def next_id():
+    return next(_snowflakes)
+
+
+class RestLog:
+    def __init__(self):
+        self.calls = Counter()
+
+    def record(self, route):
+        self.calls[route] += 1
+
+    def total(self):
+        return sum(self.calls.values())
+
+
+class _NotFoundResponse:
+    status = 404
+    reason = "Not Found"
+
+
+class FakeRole:
+    def __init__(self, guild, name, default=False):
+        self.guild = guild
+        self.id = guild.id if default else next_id()
+        self.name = name
+        self._default = default
+
+    def is_default(self):
+        return self._default
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMessage:
+    def __init__(self, world, channel, author, content="", embed=None, message_id=None, reference=None):
+        self.world = world
+        self.id = message_id or next_id()
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.embeds = [embed] if embed is not None else []
+        self.reference = reference
+        self.guild = getattr(channel, "guild", None)
+
+    async def edit(self, content=None, embed=None):
+        self.world.rest.record("PATCH /channels/{id}/messages/{id}")
+        if embed is not None:
+            self.embeds = [embed]
+
+    async def delete(self, delay=None):
+        self.world.rest.record("DELETE /channels/{id}/messages/{id}")
+
+    async def add_reaction(self, emoji):
+        self.world.rest.record("PUT /channels/{id}/messages/{id}/reactions")
+
+    async def remove_reaction(self, emoji, member):
+        self.world.rest.record("DELETE /channels/{id}/messages/{id}/reactions")
+
+
+class FakeReference:
+    def __init__(self, message):
+        self.message_id = message.id
+        self.resolved = message
+
+
+class FakeReaction:
+    def __init__(self, message, emoji):
+        self.message = message
+        self.emoji = emoji
+
+
+class _Messageable:
+    # Pesan yang dikirim hanya disimpan kalau `keep` (channel server), supaya
+    # DM jutaan user tidak menumpuk di memori.
+    keep = False
+
+    async def send(self, content=None, *, embed=None, delete_after=None):
+        self.world.rest.record("POST /channels/{id}/messages")
+        message = FakeMessage(self.world, self, self.world.bot_user, content, embed)
+        if self.keep:
+            self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id):
+        message = self.messages.get(message_id)
+        if message is None:
+            message = FakeMessage(self.world, self, self.world.bot_user, message_id=message_id)
+        return message
+
+
+class FakeTextChannel(_Messageable, discord.TextChannel):
+    keep = True
+
+    def __init__(self, world, guild, name):
+        self.world = world
+        self.guild = guild
+        self.name = name
+        self.id = next_id()
+        self.messages = {}
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    async def fetch_message(self, message_id):
+        self.world.rest.record("GET /channels/{id}/messages/{id}")
+        message = self.messages.get(message_id)
+        if message is None:
+            raise discord.NotFound(_NotFoundResponse(), "Unknown Message")
+        return message
+
+    async def set_permissions(self, target, **permissions):
+        self.world.rest.record("PUT /channels/{id}/permissions/{id}")
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"<FakeTextChannel name={self.name!r}>"
+
+
+class FakeDMChannel(_Messageable, discord.DMChannel):
+    def __init__(self, world, recipient):
+        self.world = world
+        self.id = next_id()
+        self.recipients = [recipient] if recipient is not None else []
+        self.messages = {}
+
+    def __repr__(self):
+        return f"<FakeDMChannel recipient={self.recipient!r}>"
+
+
+class FakeUser:
+    def __init__(self, world, user_id, name=None, bot=False):
+        self.world = world
+        self.id = user_id
+        self.name = name or f"user{user_id}"
+        self.bot = bot
+        self._dm = None
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    @property
+    def dm_channel(self):
+        if self._dm is None:
+            self._dm = self.world.add_dm_channel(self)
+        return self._dm
+
+    async def send(self, content=None, *, embed=None, delete_after=None):
+        return await self.dm_channel.send(content, embed=embed)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"<FakeUser id={self.id}>"
+
+
+class FakeMember(FakeUser):
+    def __init__(self, world, guild, user_id):
+        super().__init__(world, user_id)
+        self.guild = guild
+        self.roles = [guild.default_role]
+
+    async def add_roles(self, *roles, reason=None):
+        self.world.rest.record("PUT /guilds/{id}/members/{id}/roles/{id}")
+        self.roles.extend(role for role in roles if role not in self.roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        self.world.rest.record("DELETE /guilds/{id}/members/{id}/roles/{id}")
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def edit(self, *, roles=None, reason=None):
+        self.world.rest.record("PATCH /guilds/{id}/members/{id}")
+        if roles is not None:
+            self.roles = [self.guild.default_role] + list(roles)
+
+
+class FakeGuild:
+    # Member dibuat saat pertama diakses (id dalam `member_ids`), jadi
+    # dataset 1M user tidak perlu 1M objek di depan.
+
+    def __init__(self, world, member_ids, role_names, channel_names):
+        self.world = world
+        self.id = next_id()
+        self.name = "Benchmark"
+        self.member_ids = member_ids
+        self._members = {}
+        self.default_role = FakeRole(self, "@everyone", default=True)
+        self.roles = [self.default_role] + [FakeRole(self, name) for name in role_names]
+        self._roles_by_id = {role.id: role for role in self.roles}
+        self.text_channels = [FakeTextChannel(world, self, name) for name in channel_names]
+        self._channels_by_id = {channel.id: channel for channel in self.text_channels}
+
+    @property
+    def channels(self):
+        return self.text_channels
+
+    def get_member(self, user_id):
+        member = self._members.get(user_id)
+        if member is None and user_id in self.member_ids:
+            member = self._members[user_id] = FakeMember(self.world, self, user_id)
+        return member
+
+    def get_role(self, role_id):
+        return self._roles_by_id.get(role_id)
+
+    def get_channel(self, channel_id):
+        return self._channels_by_id.get(channel_id)
+
+    def channel_named(self, name):
+        return next(channel for channel in self.text_channels if channel.name == name)
+
+    async def create_role(self, *, name, reason=None):
+        self.world.rest.record("POST /guilds/{id}/roles")
+        role = FakeRole(self, name)
+        self.roles.append(role)
+        self._roles_by_id[role.id] = role
+        return role
+
+
+class FakeContext:
+    def __init__(self, world, author, channel, message):
+        self.world = world
+        self.author = author
+        self.guild = channel.guild
+        self.channel = channel
+        self.message = message
+
+    async def send(self, content=None, *, embed=None, delete_after=None):
+        return await self.channel.send(content, embed=embed, delete_after=delete_after)
+
+
+class FakeWorld:
+    # Satu guild + DM + log REST. install() memasang dunia ini ke instance
+    # bot dari main.py tanpa koneksi gateway.
+
+    def __init__(self, member_ids, role_names, channel_names):
+        self.rest = RestLog()
+        self.bot_user = FakeUser(self, next_id(), name="EngagementBot", bot=True)
+        self._dm_channels = {}
+        self.guild = FakeGuild(self, member_ids, role_names, channel_names)
+
+    def add_dm_channel(self, user):
+        channel = FakeDMChannel(self, user)
+        self._dm_channels[channel.id] = channel
+        return channel
+
+    def get_channel(self, channel_id):
+        return self.guild.get_channel(channel_id) or self._dm_channels.get(channel_id)
+
+    def get_partial_messageable(self, channel_id, **kwargs):
+        channel = self.get_channel(channel_id)
+        if channel is None:
+            channel = self._dm_channels[channel_id] = FakeDMChannel(self, None)
+            channel.id = channel_id
+        return channel
+
+    def install(self, bot):
+        world = self
+
+        class OfflineBot(type(bot)):
+            guilds = property(lambda self: [world.guild])
+            user = property(lambda self: world.bot_user)
+
+        bot.__class__ = OfflineBot
+        # AutoShardedClient.close() memberi sinyal ke antrean event shard yang
+        # biasanya dibuat saat connect
+        bot._AutoShardedClient__queue = asyncio.PriorityQueue()
+        bot.get_user = self.guild.get_member
+        bot.get_guild = lambda guild_id: self.guild if guild_id == self.guild.id else None
+        bot.get_channel = self.get_channel
+        bot.get_partial_messageable = self.get_partial_messageable
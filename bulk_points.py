@@ -0,0 +1,89 @@
+import csv
+import io
+import re
+
+_MENTION = re.compile(r"^<@!?(\d+)>$")
+
+
+def parse_user_id(text):
+    # "123", "<@123>" atau "<@!123>" -> int, selain itu None
+    text = text.strip()
+    match = _MENTION.match(text)
+    if match:
+        return int(match.group(1))
+    return int(text) if text.isdigit() else None
+
+
+def parse_csv(text):
+    # Baris "user,jumlah" (jumlah opsional). Header dan baris kosong dilewati.
+    # -> ([(nomor baris, user_id, jumlah atau None)], [pesan error])
+    rows = []
+    errors = []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        cells = [cell.strip() for cell in row]
+        if not any(cells):
+            continue
+        user_id = parse_user_id(cells[0])
+        if user_id is None:
+            if line_no == 1:
+                continue  # header
+            errors.append(f"baris {line_no}: user `{cells[0]}` tidak valid")
+            continue
+        amount = None
+        if len(cells) > 1 and cells[1]:
+            try:
+                amount = float(cells[1])
+            except ValueError:
+                errors.append(f"baris {line_no}: jumlah `{cells[1]}` bukan angka")
+                continue
+        rows.append((line_no, user_id, amount))
+    return rows, errors
+
+
+class BulkAdjustment:
+    # Kumpulan penyesuaian poin yang divalidasi utuh sebelum diterapkan.
+    # Satu user hanya dihitung sekali; kemunculan berikutnya dicatat sebagai
+    # duplikat.
+
+    def __init__(self, limit, max_targets):
+        self.limit = limit
+        self.max_targets = max_targets
+        self.amounts = {}  # user_id -> jumlah
+        self.members = {}  # user_id -> Member
+        self.errors = []
+        self.duplicates = 0
+        self.bots = 0
+
+    def add(self, member, amount, source):
+        if member is None:
+            self.errors.append(f"{source}: bukan member server ini")
+            return
+        if member.bot:
+            self.bots += 1
+            return
+        if amount is None:
+            self.errors.append(f"{source}: jumlah poin tidak diisi")
+            return
+        if amount == 0 or not (-self.limit <= amount <= self.limit):
+            self.errors.append(f"{source}: jumlah harus antara -{self.limit} hingga {self.limit} dan bukan 0")
+            return
+        if member.id in self.amounts:
+            self.duplicates += 1
+            return
+        self.amounts[member.id] = amount
+        self.members[member.id] = member
+
+    def validate(self):
+        if not self.amounts and not self.errors:
+            self.errors.append("tidak ada target")
+        if len(self.amounts) > self.max_targets:
+            self.errors.append(f"terlalu banyak target ({len(self.amounts)}, maksimal {self.max_targets})")
+        return not self.errors
+
+    @property
+    def credited(self):
+        return round(sum(amount for amount in self.amounts.values() if amount > 0), 1)
+
+    @property
+    def debited(self):
+        return round(-sum(amount for amount in self.amounts.values() if amount < 0), 1)
@@ -0,0 +1,66 @@
+import asyncio
+
+from scheduler import Scheduler
+
+
+class ConfirmationDigest:
+    # Klaim yang menunggu konfirmasi requester (mode "gabung") ditampung per
+    # (guild, requester) selama `window` detik sejak klaim pertama, lalu
+    # diserahkan ke `send` sebagai satu DM berisi beberapa klaim. Satu DM
+    # memuat paling banyak `max_claims` klaim; buffer yang sudah penuh
+    # langsung dikirim tanpa menunggu jendela habis.
+    #
+    # Buffer hanya di memori. Tiap klaim tetap punya record pending dan
+    # deadline auto-approve sendiri, jadi klaim yang belum sempat dikirim
+    # saat restart tetap disetujui otomatis; pemilik guild berikutnya
+    # memasukkannya lagi ke digest saat membuka state guild.
+
+    def __init__(self, send, window=60.0, max_claims=20):
+        self.send = send  # async fn(guild_id, requester_id, [claim_id])
+        self.window = window
+        self.max_claims = max_claims
+        self._buffers = {}  # (guild_id, requester_id) -> [claim_id]
+        self._timers = Scheduler(self._flush_due, name="confirm-digest")
+        self.claims = 0
+        self.sent = 0
+
+    def __len__(self):
+        return sum(len(claims) for claims in self._buffers.values())
+
+    def add(self, guild_id, requester_id, claim_id):
+        key = (int(guild_id), str(requester_id))
+        claims = self._buffers.setdefault(key, [])
+        if claim_id in claims:
+            return
+        claims.append(claim_id)
+        self.claims += 1
+        if len(claims) >= self.max_claims:
+            self._timers.schedule(key, 0)
+        elif len(claims) == 1:
+            self._timers.schedule(key, self._timers.clock() + self.window)
+
+    def discard_guild(self, guild_id):
+        # Guild ditutup / pindah proses: klaimnya di-digest ulang oleh pemilik baru
+        for key in [key for key in self._buffers if key[0] == int(guild_id)]:
+            self._timers.cancel(key)
+            del self._buffers[key]
+
+    # --- Lifecycle ---
+    def start(self):
+        self._timers.start()
+
+    async def close(self):
+        await self._timers.close()
+        await self._flush_due(list(self._buffers))
+
+    async def _flush_due(self, keys):
+        await asyncio.gather(*(self._flush(key) for key in keys))
+
+    async def _flush(self, key):
+        claims = self._buffers.pop(key, [])
+        self._timers.cancel(key)
+        for i in range(0, len(claims), self.max_claims):
+            try:
+                self.sent += await self.send(*key, claims[i:i + self.max_claims])
+            except Exception as e:
+                print(f"⚠️ Gagal kirim digest konfirmasi ke {key[1]}: {e}")
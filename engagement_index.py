@@ -0,0 +1,248 @@
+import asyncio
+import math
+from array import array
+from bisect import bisect_left
+
+from storage import ENGAGEMENT_FILE
+
+# Satu bit per jenis engagement
+TASK_BITS = {"like": 1, "retweet": 2, "comment": 4, "follow": 8}
+
+
+class BloomFilter:
+    # Blocked Bloom filter: satu blok 64 bit per key, dipilih dari bit bawah
+    # key; k bit di dalam blok diambil dari potongan 6 bit berikutnya. Key
+    # engagement sudah berupa potongan SHA-256, jadi tidak perlu di-hash ulang.
+    # Cukup satu akses array per query.
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1024)
+        bits_per_key = -math.log(error_rate) / (math.log(2) ** 2) * 1.5  # kompensasi blocking
+        self.capacity = capacity
+        self.block_bits = max(10, math.ceil(math.log2(capacity * bits_per_key / 64)))
+        self.hashes = min(round(bits_per_key * math.log(2)), (64 - self.block_bits) // 6)
+        self._block_mask = (1 << self.block_bits) - 1
+        self.blocks = array('Q', bytes(8 << self.block_bits))
+
+    def _mask(self, key):
+        h = key >> self.block_bits
+        mask = 0
+        for _ in range(self.hashes):
+            mask |= 1 << (h & 63)
+            h >>= 6
+        return mask
+
+    def add(self, key):
+        self.blocks[key & self._block_mask] |= self._mask(key)
+
+    def might_contain(self, key):
+        mask = self._mask(key)
+        return self.blocks[key & self._block_mask] & mask == mask
+
+    def memory_bytes(self):
+        return self.blocks.itemsize * len(self.blocks)
+
+
+class EngagementIndex:
+    # Index resident untuk aturan "sekali seumur hidup": key 64-bit dari
+    # make_engagement_key -> bitmask jenis engagement. Data utama disimpan di
+    # array terurut (8 byte key + 1 byte mask), insert baru masuk ke dict
+    # delta kecil yang digabung ke array setelah `merge_threshold` entri.
+    # Bloom filter opsional menjawab miss tanpa binary search.
+    #
+    # Penulisan ke storage bersifat write-behind, di-batch tiap `flush_interval`.
+    # Supaya tanda tidak hilang kalau bot crash sebelum flush, klaim memakai
+    # stage() dan meneruskan record-nya ke PointsLedger.commit() bersama
+    # perubahan request: tanda ikut journal ledger, di-replay lewat apply(),
+    # dan journal baru dipotong setelah flush() berhasil.
+
+    def __init__(self, bloom=False, error_rate=0.01, merge_threshold=65536, flush_interval=5.0):
+        self.use_bloom = bloom
+        self.error_rate = error_rate
+        self.merge_threshold = merge_threshold
+        self.flush_interval = flush_interval
+        self.storage = None
+        self._keys = array('Q')
+        self._masks = bytearray()
+        self._delta = {}
+        self._new_keys = 0  # key di delta yang belum ada di array
+        self._bloom = None
+        self._unsaved = []
+        self._task = None
+        self._closing = False
+        self._wake = asyncio.Event()
+
+    def __len__(self):
+        return len(self._keys) + self._new_keys
+
+    # --- Lifecycle ---
+    async def open(self, storage, arrays=None):
+        # arrays: (keys, masks) dari snapshot; tanpa itu dibaca dari storage
+        self.storage = storage
+        if arrays is not None:
+            self.load_arrays(*arrays)
+        else:
+            self.load(await storage.load_engagements())
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def close(self):
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def abandon(self):
+        # Guild pindah ke proses lain: tanda yang belum tersimpan ada di
+        # journal ledger dan di-replay pemilik baru, jadi cukup dibuang
+        self._closing = True
+        self._unsaved = []
+        self.storage = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def flush(self):
+        # -> False kalau gagal (tanda tetap di buffer untuk flush berikutnya)
+        if not self._unsaved or self.storage is None:
+            return True
+        items, self._unsaved = self._unsaved, []
+        try:
+            await self.storage.mark_engaged_many(items)
+        except Exception as e:
+            self._unsaved[:0] = items
+            print(f"❌ Error saat simpan engagement log: {e}")
+            return False
+        return True
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    # --- Build ---
+    def load(self, log):
+        # log: {key_hex: {task_type: True}} (format engagement_log.json)
+        pairs = []
+        for key_hex, types in log.items():
+            mask = 0
+            for task_type, done in types.items():
+                if done:
+                    mask |= TASK_BITS.get(task_type, 0)
+            pairs.append((int(key_hex, 16), mask))
+        pairs.sort()
+        self.load_arrays(array('Q', (k for k, _ in pairs)), bytearray(m for _, m in pairs))
+
+    def load_arrays(self, keys, masks):
+        # keys harus terurut naik dan sejajar dengan masks
+        self._keys = keys
+        self._masks = masks
+        self._delta = {}
+        self._new_keys = 0
+        self._rebuild_bloom()
+
+    def arrays(self):
+        # -> (keys, masks) terurut termasuk delta, mis. untuk snapshot
+        if self._delta:
+            self._merge()
+        return self._keys, self._masks
+
+    def _rebuild_bloom(self):
+        if not self.use_bloom:
+            self._bloom = None
+            return
+        self._bloom = BloomFilter(len(self) * 2, self.error_rate)
+        for key in self._keys:
+            self._bloom.add(key)
+        for key in self._delta:
+            self._bloom.add(key)
+
+    # --- Query ---
+    def _lookup(self, key):
+        mask = self._delta.get(key)
+        if mask is not None:
+            return mask
+        keys = self._keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return self._masks[i]
+        return 0
+
+    def contains(self, key_hex, task_type):
+        key = int(key_hex, 16)
+        if self._bloom is not None and not self._bloom.might_contain(key):
+            return False
+        return bool(self._lookup(key) & TASK_BITS[task_type])
+
+    def add(self, key_hex, task_type):
+        # True jika baru ditandai, False jika sudah pernah
+        key = int(key_hex, 16)
+        bit = TASK_BITS[task_type]
+        mask = self._lookup(key)
+        if mask & bit:
+            return False
+        if not mask and key not in self._delta:
+            self._new_keys += 1
+        self._delta[key] = mask | bit
+        if self._bloom is not None:
+            if len(self) > self._bloom.capacity:
+                # Filter penuh (mis. guild baru mulai dari 1024): bangun ulang
+                # 2x jumlah key sekarang, key ini sudah ikut di delta
+                self._rebuild_bloom()
+            else:
+                self._bloom.add(key)
+        self._unsaved.append((key_hex, task_type))
+        if len(self._delta) >= self.merge_threshold:
+            self._merge()
+        return True
+
+    def stage(self, key_hex, task_type):
+        # Tandai di memori; -> record journal, atau None jika sudah pernah
+        if not self.add(key_hex, task_type):
+            return None
+        return {"store": ENGAGEMENT_FILE, "key": key_hex, "task": task_type}
+
+    def apply(self, record):
+        # Replay record dari journal ledger (idempotent)
+        self.add(record["key"], record["task"])
+
+    def _merge(self):
+        # Key lama cukup di-update di tempat; key baru disisipkan dengan
+        # menyalin potongan array di antara posisi sisipan.
+        keys, masks = self._keys, self._masks
+        inserts = []
+        for key, mask in self._delta.items():
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                masks[i] = mask
+            else:
+                inserts.append((i, key, mask))
+        if inserts:
+            inserts.sort()
+            new_keys, new_masks = array('Q'), bytearray()
+            prev = 0
+            for i, key, mask in inserts:
+                new_keys.extend(keys[prev:i])
+                new_masks.extend(masks[prev:i])
+                new_keys.append(key)
+                new_masks.append(mask)
+                prev = i
+            new_keys.extend(keys[prev:])
+            new_masks.extend(masks[prev:])
+            self._keys, self._masks = new_keys, new_masks
+        self._delta = {}
+        self._new_keys = 0
+
+    def memory_bytes(self):
+        size = self._keys.itemsize * len(self._keys) + len(self._masks)
+        size += len(self._delta) * 100  # perkiraan kasar entri dict
+        if self._bloom is not None:
+            size += self._bloom.memory_bytes()
+        return size
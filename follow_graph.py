@@ -0,0 +1,161 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class _EdgeArrays:
+    # Edge (a, b) dalam dua array 64-bit sejajar, terurut berdasarkan (a, b).
+    # Edge baru ditampung di dict delta a -> set(b) lalu digabung berkala.
+
+    def __init__(self):
+        self.src = array('Q')
+        self.dst = array('Q')
+        self.delta = {}
+        self.delta_size = 0
+
+    def load(self, pairs):
+        # pairs harus sudah terurut dan unik
+        self.src = array('Q', (a for a, _ in pairs))
+        self.dst = array('Q', (b for _, b in pairs))
+        self.delta = {}
+        self.delta_size = 0
+
+    def load_arrays(self, src, dst):
+        # Array sejajar yang sudah terurut, mis. dari snapshot
+        self.src = src
+        self.dst = dst
+        self.delta = {}
+        self.delta_size = 0
+
+    def __len__(self):
+        return len(self.src) + self.delta_size
+
+    def _range(self, a):
+        return bisect_left(self.src, a), bisect_right(self.src, a)
+
+    def contains(self, a, b):
+        if b in self.delta.get(a, ()):
+            return True
+        lo, hi = self._range(a)
+        i = bisect_left(self.dst, b, lo, hi)
+        return i < hi and self.dst[i] == b
+
+    def add(self, a, b):
+        self.delta.setdefault(a, set()).add(b)
+        self.delta_size += 1
+
+    def neighbours(self, a):
+        # Tetangga a, terurut
+        lo, hi = self._range(a)
+        result = self.dst[lo:hi]
+        extra = self.delta.get(a)
+        if extra:
+            result = array('Q', sorted(set(result) | extra))
+        return result
+
+    def merge(self):
+        src, dst = self.src, self.dst
+        inserts = []
+        for a, bs in self.delta.items():
+            lo, hi = self._range(a)
+            for b in bs:
+                inserts.append((bisect_left(dst, b, lo, hi), a, b))
+        inserts.sort()
+        new_src, new_dst = array('Q'), array('Q')
+        prev = 0
+        for i, a, b in inserts:
+            new_src.extend(src[prev:i])
+            new_dst.extend(dst[prev:i])
+            new_src.append(a)
+            new_dst.append(b)
+            prev = i
+        new_src.extend(src[prev:])
+        new_dst.extend(dst[prev:])
+        self.src, self.dst = new_src, new_dst
+        self.delta = {}
+        self.delta_size = 0
+
+    def memory_bytes(self):
+        return 16 * len(self.src) + self.delta_size * 120  # delta: perkiraan kasar
+
+
+def _intersect_sorted(xs, ys):
+    result = []
+    i = j = 0
+    while i < len(xs) and j < len(ys):
+        if xs[i] == ys[j]:
+            result.append(xs[i])
+            i += 1
+            j += 1
+        elif xs[i] < ys[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class FollowGraph:
+    # Graf follow (follower -> target) dengan id Discord 64-bit. Disimpan dua
+    # arah: `_out` terurut per follower dan `_in` terurut per target, sehingga
+    # is_following dan "siapa yang sudah follow X" sama-sama O(log n).
+
+    def __init__(self, merge_threshold=4096):
+        self.merge_threshold = merge_threshold
+        self._out = _EdgeArrays()
+        self._in = _EdgeArrays()
+
+    def __len__(self):
+        return len(self._out)
+
+    def load(self, edges):
+        edges = sorted(set((int(f), int(t)) for f, t in edges))
+        self._out.load(edges)
+        self._in.load(sorted((t, f) for f, t in edges))
+
+    def load_arrays(self, out_src, out_dst, in_src, in_dst):
+        # Empat array hasil arrays(), tanpa mengurutkan ulang
+        self._out.load_arrays(out_src, out_dst)
+        self._in.load_arrays(in_src, in_dst)
+
+    def arrays(self):
+        # -> (out_src, out_dst, in_src, in_dst) terurut termasuk delta
+        if self._out.delta_size:
+            self._out.merge()
+            self._in.merge()
+        return self._out.src, self._out.dst, self._in.src, self._in.dst
+
+    def is_following(self, follower_id, target_id):
+        return self._out.contains(int(follower_id), int(target_id))
+
+    def add(self, follower_id, target_id):
+        # True jika edge baru, False jika sudah ada
+        follower_id, target_id = int(follower_id), int(target_id)
+        if self._out.contains(follower_id, target_id):
+            return False
+        self._out.add(follower_id, target_id)
+        self._in.add(target_id, follower_id)
+        if self._out.delta_size >= self.merge_threshold:
+            self._out.merge()
+            self._in.merge()
+        return True
+
+    def following(self, user_id):
+        return list(self._out.neighbours(int(user_id)))
+
+    def followers(self, user_id):
+        # Siapa saja yang sudah follow user_id
+        return list(self._in.neighbours(int(user_id)))
+
+    def is_mutual(self, a, b):
+        return self.is_following(a, b) and self.is_following(b, a)
+
+    def common_following(self, a, b):
+        # Akun yang di-follow oleh a dan b sekaligus
+        return _intersect_sorted(self._out.neighbours(int(a)), self._out.neighbours(int(b)))
+
+    def mutuals(self, user_id):
+        # Akun yang saling follow dengan user_id
+        user_id = int(user_id)
+        return _intersect_sorted(self._out.neighbours(user_id), self._in.neighbours(user_id))
+
+    def memory_bytes(self):
+        return self._out.memory_bytes() + self._in.memory_bytes()
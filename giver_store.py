@@ -0,0 +1,53 @@
+from storage import GIVER_FILE
+
+
+class GiverStore:
+    # Statistik pemberi poin satu guild (user_id -> (jumlah pemberian, total
+    # poin diberikan)), resident di memori seperti PendingStore. stage_add()
+    # langsung mengubah memori dan mengembalikan record untuk
+    # PointsLedger.commit(), jadi statistik tercatat di baris journal yang
+    # sama dengan transfer !givepoint. Record berisi nilai akhir (bukan
+    # selisih) supaya replay idempotent; giver_count.json baru ditulis saat
+    # ledger compaction, itu pun hanya user yang berubah.
+
+    def __init__(self):
+        self._stats = {}  # user_id -> (jumlah pemberian, total poin diberikan)
+        self._changed = set()  # user_id yang berubah sejak compaction terakhir
+
+    def __len__(self):
+        return len(self._stats)
+
+    def load(self, stats):
+        # stats: {user_id: (jumlah, total)} (lihat Storage.load_giver_stats)
+        self._stats = {str(user_id): tuple(value) for user_id, value in stats.items()}
+        self._changed = set()
+
+    def get(self, user_id, default=None):
+        return self._stats.get(str(user_id), default)
+
+    def all(self):
+        return dict(self._stats)
+
+    # --- Writes ---
+    def stage_add(self, user_id, amount):
+        user_id = str(user_id)
+        count, total = self._stats.get(user_id, (0, 0))
+        value = (count + 1, total + amount)
+        self._stats[user_id] = value
+        self._changed.add(user_id)
+        return {"store": GIVER_FILE, "key": user_id, "value": list(value)}
+
+    # --- Replay / compaction ---
+    def apply(self, record):
+        user_id = str(record["key"])
+        self._stats[user_id] = tuple(record["value"])
+        self._changed.add(user_id)
+
+    def take_changes(self):
+        # -> {user_id: (jumlah, total)} sejak compaction terakhir
+        changed, self._changed = self._changed, set()
+        return {user_id: self._stats[user_id] for user_id in changed}
+
+    def restore_changes(self, changes):
+        # Compaction gagal: tandai ulang supaya ikut compaction berikutnya
+        self._changed |= set(changes)
@@ -0,0 +1,97 @@
+import discord
+
+
+class GuildRegistry:
+    # Resolusi nama channel/role -> objek per guild dalam O(1). Nama dari
+    # konfigurasi (key -> nama) di-resolve sekali ke id saat guild pertama
+    # kali dipakai, lalu dijaga tetap sinkron lewat event on_guild_channel_*
+    # dan on_guild_role_*. Objeknya sendiri diambil dari cache guild
+    # (get_channel / get_role), jadi selalu versi terbaru.
+    #
+    # Seperti discord.utils.get, kalau ada beberapa dengan nama sama yang
+    # dipakai adalah yang pertama ditemukan.
+
+    def __init__(self, channel_names, role_names):
+        self.channel_names = channel_names  # key -> nama text channel
+        self.role_names = role_names  # key -> nama role
+        self._channel_keys = {name: key for key, name in channel_names.items()}
+        self._role_keys = {name: key for key, name in role_names.items()}
+        self._guilds = {}  # guild_id -> ({key: channel_id}, {key: role_id})
+
+    def _entry(self, guild):
+        entry = self._guilds.get(guild.id)
+        if entry is None:
+            entry = self._guilds[guild.id] = (self._scan_channels(guild), self._scan_roles(guild))
+        return entry
+
+    def _scan_channels(self, guild):
+        found = {}
+        for channel in guild.text_channels:
+            key = self._channel_keys.get(channel.name)
+            if key is not None:
+                found.setdefault(key, channel.id)
+        return found
+
+    def _scan_roles(self, guild):
+        found = {}
+        for role in guild.roles:
+            key = self._role_keys.get(role.name)
+            if key is not None:
+                found.setdefault(key, role.id)
+        return found
+
+    def forget_guild(self, guild):
+        self._guilds.pop(guild.id, None)
+
+    # --- Query ---
+    def channel(self, guild, key):
+        channel_id = self._entry(guild)[0].get(key)
+        return guild.get_channel(channel_id) if channel_id is not None else None
+
+    def role(self, guild, key):
+        role_id = self._entry(guild)[1].get(key)
+        return guild.get_role(role_id) if role_id is not None else None
+
+    def roles(self, guild, keys):
+        found = set()
+        for key in keys:
+            role = self.role(guild, key)
+            if role is not None:
+                found.add(role)
+        return found
+
+    # --- Event ---
+    def channel_created(self, channel):
+        if not isinstance(channel, discord.TextChannel) or channel.guild.id not in self._guilds:
+            return
+        key = self._channel_keys.get(channel.name)
+        if key is not None:
+            self._guilds[channel.guild.id][0].setdefault(key, channel.id)
+
+    def channel_deleted(self, channel):
+        entry = self._guilds.get(channel.guild.id)
+        if entry is not None and channel.id in entry[0].values():
+            # Jarang terjadi: scan ulang supaya channel lain dengan nama sama ikut terpakai
+            self._guilds[channel.guild.id] = (self._scan_channels(channel.guild), entry[1])
+
+    def channel_updated(self, before, after):
+        if before.name != after.name:
+            self.channel_deleted(before)
+            self.channel_created(after)
+
+    def role_created(self, role):
+        if role.guild.id not in self._guilds:
+            return
+        key = self._role_keys.get(role.name)
+        if key is not None:
+            self._guilds[role.guild.id][1].setdefault(key, role.id)
+
+    def role_deleted(self, role):
+        entry = self._guilds.get(role.guild.id)
+        if entry is not None and role.id in entry[1].values():
+            self._guilds[role.guild.id] = (entry[0], self._scan_roles(role.guild))
+
+    def role_updated(self, before, after):
+        if before.name != after.name:
+            self.role_deleted(before)
+            self.role_created(after)
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import os
+import time
+
+from engagement_index import EngagementIndex
+from follow_graph import FollowGraph
+from giver_store import GiverStore
+from leaderboard import Leaderboard
+from ledger import PointsLedger
+from locks import LockManager
+from message_cache import MessageCache
+from pending_store import PendingStore
+from render_queue import EmbedRenderQueue
+from request_store import RequestStore
+from settlement import SettlementQueue
+from snapshot import Snapshot, SnapshotError, build_sections, write_snapshot
+from storage import POINTS_JOURNAL_FILE, open_storage
+
+
+# Pengaturan guild yang diedit operator, di direktori data guild (untuk
+# backend JSON maupun SQLite). Key yang tidak ada memakai default dari bot.
+SETTINGS_FILE = "settings.json"
+
+
+def load_settings(directory, defaults):
+    # -> defaults yang ditimpa isi SETTINGS_FILE; "prices" dan "role_tiers"
+    # ditimpa per jenis engagement / per tier
+    settings = dict(defaults)
+    path = os.path.join(directory, SETTINGS_FILE)
+    if not os.path.exists(path):
+        return settings
+    try:
+        with open(path, 'r') as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Pengaturan {path} tidak bisa dibaca, memakai default: {e}")
+        return settings
+    for name, value in overrides.items():
+        if name not in defaults:
+            print(f"⚠️ Pengaturan tidak dikenal di {path}: {name}")
+        elif name == "prices":
+            settings[name] = {task: value.get(task, price) for task, price in defaults[name].items()}
+        elif name == "role_tiers":
+            # {key role: ambang}; key tier tetap, hanya ambangnya yang bisa diubah
+            thresholds = {key: value.get(key, threshold) for threshold, key in defaults[name]}
+            settings[name] = sorted(((threshold, key) for key, threshold in thresholds.items()), reverse=True)
+        else:
+            settings[name] = value
+    return settings
+
+
+class GuildState:
+    # Semua data satu guild: saldo (ledger + journal) dan peringkatnya,
+    # request, konfirmasi pending, dan statistik pemberi (RequestStore /
+    # PendingStore / GiverStore, perubahannya ikut journal ledger), follow,
+    # index engagement, preferensi user, dan lock-nya sendiri. Tiap guild punya direktori data
+    # (atau database SQLite) terpisah, jadi key panas di satu guild tidak
+    # menahan lock, fsync, atau compaction guild lain.
+    # Pengaturan guild (harga, tier role, mode konfirmasi default) dibaca dari
+    # SETTINGS_FILE di direktori yang sama, lihat load_settings().
+    #
+    # Dengan `snapshot_path`, state resident ditulis ke snapshot biner saat
+    # close() dan dimuat dari sana saat open() selama sidik storage belum
+    # berubah; kalau tidak cocok, semuanya dibaca dari storage seperti biasa.
+
+    def __init__(self, guild_id, directory, render, settings=None, backend="json", sqlite_path=None,
+                 ledger_flush_interval=5.0, ledger_flush_threshold=100, ledger_compact_threshold=10000,
+                 settlement_window=0.05, engagement_bloom=False,
+                 render_window=0.5, render_interval=2.0, message_cache_size=10000, snapshot_path=None):
+        self.guild_id = guild_id
+        self.directory = directory
+        self.snapshot_path = snapshot_path
+        self.startup_report = {}  # tahap -> detik, diisi open()
+        self._leaderboard_load = None
+        os.makedirs(directory, exist_ok=True)
+        self.settings = load_settings(directory, settings or {})
+        self.locks = LockManager()
+        self.storage = open_storage(
+            backend,
+            json_dir=directory,
+            sqlite_path=sqlite_path or os.path.join(directory, "bot.db"),
+            locks=self.locks,
+        )
+        self.leaderboard = Leaderboard(self.settings.get("role_tiers", ()))
+        self.requests = RequestStore()
+        self.pending = PendingStore()
+        self.giver_stats = GiverStore()
+        self.engagement_index = EngagementIndex(bloom=engagement_bloom, flush_interval=ledger_flush_interval)
+        self.ledger = PointsLedger(
+            self.storage,
+            journal_path=os.path.join(directory, POINTS_JOURNAL_FILE),
+            flush_interval=ledger_flush_interval,
+            flush_threshold=ledger_flush_threshold,
+            compact_threshold=ledger_compact_threshold,
+            on_change=self.leaderboard.update,
+            requests=self.requests,
+            engagements=self.engagement_index,
+            pending=self.pending,
+            givers=self.giver_stats,
+        )
+        self.settlements = SettlementQueue(
+            self.ledger, self.requests, self.pending, self.locks, window=settlement_window
+        )
+        self.follow_graph = FollowGraph()
+        self.preferences = {}  # user_id -> {nama: nilai}, lihat Storage.put_preferences
+        self.messages = MessageCache(message_cache_size)
+        self.render_queue = EmbedRenderQueue(
+            self.requests.get, render, window=render_window, interval=render_interval, messages=self.messages
+        )
+
+    async def open(self):
+        started = time.perf_counter()
+        report = self.startup_report
+        loaded = await asyncio.to_thread(self._read_snapshot) if self.snapshot_path else None
+        report["snapshot"] = time.perf_counter() - started
+
+        phase = time.perf_counter()
+        self.requests.load(loaded["requests"] if loaded else await self.storage.load_requests())
+        self.pending.load(loaded["pending"] if loaded else await self.storage.load_pending())
+        self.giver_stats.load(loaded["giver_stats"] if loaded else await self.storage.load_giver_stats())
+        report["requests"] = time.perf_counter() - phase
+
+        # Index engagement dibuka sebelum ledger: replay journal bisa berisi tanda engagement
+        phase = time.perf_counter()
+        await self.engagement_index.open(self.storage, arrays=loaded["engagements"] if loaded else None)
+        report["engagements"] = time.perf_counter() - phase
+
+        phase = time.perf_counter()
+        await self.ledger.open(balances=loaded["balances"] if loaded else None)
+        self._leaderboard_load = self.leaderboard.load(self.ledger.balances)
+        report["ledger"] = time.perf_counter() - phase
+
+        phase = time.perf_counter()
+        if loaded:
+            self.follow_graph.load_arrays(*loaded["follows"])
+            self.preferences.update(loaded["preferences"])
+        else:
+            self.follow_graph.load(await self.storage.load_follows())
+            self.preferences.update(await self.storage.load_preferences())
+        report["indexes"] = time.perf_counter() - phase
+        report["total"] = time.perf_counter() - started
+
+        source = "snapshot" if loaded else "storage"
+        phases = ", ".join(f"{name} {seconds:.2f}" for name, seconds in report.items() if name != "total")
+        print(f"⏱️ Guild {self.guild_id} dibuka dari {source} dalam {report['total']:.2f} detik ({phases})")
+
+    def _read_snapshot(self):
+        # Dijalankan di thread. -> dict state, atau None kalau snapshot tidak
+        # ada / rusak / sudah tertinggal dari storage
+        if not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with Snapshot(self.snapshot_path) as snap:
+                if snap.meta().get("fingerprint") != self.storage.fingerprint():
+                    print(f"ℹ️ Snapshot {self.snapshot_path} lebih lama dari storage, dibaca dari storage")
+                    return None
+                return {
+                    "balances": snap.balances(),
+                    "engagements": snap.engagements(),
+                    "follows": snap.follows(),
+                    "giver_stats": snap.giver_stats(),
+                    "requests": snap.get("requests", {}),
+                    "pending": snap.get("pending", {}),
+                    "preferences": snap.get("preferences", {}),
+                }
+        except (OSError, ValueError, SnapshotError) as e:
+            print(f"⚠️ Snapshot {self.snapshot_path} tidak bisa dibaca: {e}")
+            return None
+
+    async def close(self):
+        # Urutan sama seperti sebelum multi-guild: settlement selesai dulu,
+        # lalu ledger dipadatkan, baru storage ditutup. Snapshot ditulis
+        # paling akhir supaya sidiknya mencakup semua tulisan storage.
+        if self._leaderboard_load is not None:
+            self._leaderboard_load.cancel()
+        await self.settlements.close()
+        await self.render_queue.close()
+        await self.ledger.close()
+        await self.engagement_index.close()
+        state = await self._snapshot_state() if self.snapshot_path else None
+        await self.storage.close()
+        if state is not None:
+            try:
+                started = time.perf_counter()
+                size = await asyncio.to_thread(self._write_snapshot, state)
+                print(f"💾 Snapshot guild {self.guild_id}: {size / 1e6:.1f} MB dalam {time.perf_counter() - started:.2f} detik")
+            except Exception as e:
+                print(f"❌ Error saat menulis snapshot guild {self.guild_id}: {e}")
+
+    async def abandon(self):
+        # Lease guild diambil alih proses lain yang sudah menulis ke storage
+        # dan journal yang sama. Timer dan antrean dihentikan, state di
+        # memori dibuang tanpa compaction, flush, maupun snapshot: pemilik
+        # baru me-replay journal-nya sendiri.
+        if self._leaderboard_load is not None:
+            self._leaderboard_load.cancel()
+        await self.ledger.abandon()
+        await self.engagement_index.abandon()
+        await self.settlements.abandon()
+        await self.render_queue.abandon()
+        await self.storage.close()
+
+    async def _snapshot_state(self):
+        return {
+            "balances": dict(self.ledger.balances),
+            "engagements": self.engagement_index.arrays(),
+            "follows": self.follow_graph.arrays(),
+            "giver_stats": self.giver_stats.all(),
+            "requests": self.requests.all(),
+            "pending": self.pending.all(),
+            "mutes": await self.storage.load_mutes(),
+            "preferences": {user_id: dict(prefs) for user_id, prefs in self.preferences.items()},
+        }
+
+    def _write_snapshot(self, state):
+        meta = {"guild_id": self.guild_id, "fingerprint": self.storage.fingerprint()}
+        return write_snapshot(self.snapshot_path, build_sections(**state, meta=meta))
+
+
+class GuildStates:
+    # guild_id -> GuildState, dibuka saat pertama dibutuhkan. Pembukaan
+    # bersamaan untuk guild yang sama cukup satu kali.
+
+    def __init__(self, factory):
+        self.factory = factory  # async fn(guild_id) -> GuildState yang sudah dibuka
+        self._states = {}
+        self._opening = {}
+
+    def __len__(self):
+        return len(self._states)
+
+    def __iter__(self):
+        return iter(list(self._states.values()))
+
+    def get(self, guild_id):
+        return self._states.get(int(guild_id))
+
+    async def open(self, guild_id):
+        guild_id = int(guild_id)
+        state = self._states.get(guild_id)
+        if state is not None:
+            return state
+        task = self._opening.get(guild_id)
+        if task is None:
+            task = self._opening[guild_id] = asyncio.create_task(self._open(guild_id))
+        return await asyncio.shield(task)
+
+    async def _open(self, guild_id):
+        try:
+            state = await self.factory(guild_id)
+            self._states[guild_id] = state
+            return state
+        finally:
+            self._opening.pop(guild_id, None)
+
+    async def close(self, guild_id):
+        state = self._states.pop(int(guild_id), None)
+        if state is not None:
+            await state.close()
+
+    async def abandon(self, guild_id):
+        state = self._states.pop(int(guild_id), None)
+        if state is not None:
+            await state.abandon()
+
+    async def close_all(self):
+        await asyncio.gather(*self._opening.values(), return_exceptions=True)
+        for guild_id in list(self._states):
+            await self.close(guild_id)
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+
+
+class Journal:
+    # Log append-only, satu baris JSON per transaksi. Baris hanya di-buffer
+    # saat append(); sync() menulis semua buffer sekaligus lalu fsync.
+
+    def __init__(self, path):
+        self.path = path
+        self.entries_on_disk = 0
+        self.bytes_written = 0
+        self.torn = False  # read() menemukan baris terakhir yang terpotong
+        self._valid_bytes = 0
+        self._buffer = []
+        self._lock = asyncio.Lock()
+        self._abandoned = False
+
+    @property
+    def abandoned(self):
+        return self._abandoned
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def read(self):
+        # Baris terakhir yang terpotong (crash saat menulis) diabaikan;
+        # repair() membuangnya dari file
+        records = []
+        self.torn = False
+        self._valid_bytes = 0
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    self.torn = True
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    self.torn = True
+                    break
+                self._valid_bytes += len(line)
+        self.entries_on_disk = len(records)
+        return records
+
+    def repair(self):
+        # Potong sisa baris rusak supaya append berikutnya tidak tersambung
+        # ke baris itu (dan ikut terbuang saat read() berikutnya)
+        with open(self.path, 'r+b') as f:
+            f.truncate(self._valid_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        self.torn = False
+
+    def append(self, record):
+        if self._abandoned:
+            return
+        self._buffer.append(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _write(self, lines):
+        with open(self.path, 'a') as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def sync(self):
+        async with self._lock:
+            if self._abandoned:
+                raise RuntimeError(f"journal {self.path} sudah ditinggalkan")
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self._write, lines)
+            except Exception:
+                self._buffer[:0] = lines
+                raise
+            self.entries_on_disk += len(lines)
+            self.bytes_written += sum(len(line) for line in lines)
+
+    def _truncate(self):
+        with open(self.path, 'w') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def truncate(self):
+        # Dipanggil setelah snapshot tersimpan; entri yang masih di buffer
+        # tetap ditulis belakangan dan aman di-replay di atas snapshot.
+        async with self._lock:
+            await asyncio.to_thread(self._truncate)
+            self.entries_on_disk = 0
+
+    def abandon(self):
+        # File sudah dipegang proses lain: buang buffer, tolak tulisan berikutnya
+        self._abandoned = True
+        self._buffer = []
@@ -1,2 +1,24 @@
-def keep_alive():
-    pass # Placeholder to satisfy import
+from aiohttp import web
+
+
+async def keep_alive(metrics, health, host="127.0.0.1", port=8080):
+    # Server HTTP kecil di event loop bot:
+    #   /healthz  -> 200 jika health() True, 503 jika tidak
+    #   /metrics  -> metrik format teks Prometheus
+    # Mengembalikan runner; panggil `await runner.cleanup()` saat bot mati.
+
+    async def healthz(request):
+        ok = health()
+        return web.Response(status=200 if ok else 503, text="ok\n" if ok else "unavailable\n")
+
+    async def metrics_page(request):
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metrics_page)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"✅ Endpoint metrik aktif di http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,249 @@
+import asyncio
+import bisect
+import random
+
+
+class _End:
+    # Sentinel di ujung setiap level: lebih besar dari nilai apa pun
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __ge__(self, other):
+        return True
+
+
+class _Node:
+    __slots__ = ("value", "next", "width")
+
+    def __init__(self, value, next, width):
+        self.value = value
+        self.next = next
+        self.width = width  # jumlah langkah di level 0 sampai next[level]
+
+
+_NIL = _Node(_End(), [], [])
+
+
+class IndexableSkipList:
+    # Skip list terurut dengan lebar link, jadi insert, remove, select (item
+    # ke-i) dan bisect (jumlah item < nilai) semuanya O(log n).
+
+    def __init__(self, max_levels=24, rng=None):
+        self.max_levels = max_levels
+        self.size = 0
+        self._rng = rng or random.Random()
+        self.head = _Node(None, [_NIL] * max_levels, [1] * max_levels)
+
+    def __len__(self):
+        return self.size
+
+    def build(self, values):
+        # Bangun ulang dari nilai yang SUDAH terurut dalam O(n). Level item
+        # ke-i mengikuti jumlah nol di akhir (i + 1), jadi strukturnya sama
+        # seimbangnya dengan hasil insert acak.
+        head = self.head = _Node(None, [_NIL] * self.max_levels, [1] * self.max_levels)
+        last = [head] * self.max_levels
+        last_pos = [-1] * self.max_levels
+        count = 0
+        for i, value in enumerate(values):
+            position = i + 1
+            levels = min(self.max_levels, ((position & -position).bit_length()))
+            node = _Node(value, [_NIL] * levels, [0] * levels)
+            for level in range(levels):
+                last[level].next[level] = node
+                last[level].width[level] = i - last_pos[level]
+                last[level] = node
+                last_pos[level] = i
+            count = position
+        for level in range(self.max_levels):
+            last[level].next[level] = _NIL
+            last[level].width[level] = count - last_pos[level]
+        self.size = count
+
+    def _random_levels(self):
+        levels = 1
+        while levels < self.max_levels and self._rng.getrandbits(1):
+            levels += 1
+        return levels
+
+    def insert(self, value):
+        chain = [None] * self.max_levels
+        steps_at_level = [0] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = self._random_levels()
+        new = _Node(value, [None] * levels, [None] * levels)
+        steps = 0
+        for level in range(levels):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, self.max_levels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        chain = [None] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is _NIL or target.value != value:
+            raise KeyError(value)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.max_levels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        node = self.head
+        index += 1
+        for level in reversed(range(self.max_levels)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def bisect_left(self, value):
+        # Jumlah item yang < value
+        rank = 0
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].value < value:
+                rank += node.width[level]
+                node = node.next[level]
+        return rank
+
+    def slice(self, start, count):
+        # `count` item mulai dari indeks `start`: satu select lalu jalan di level 0
+        items = []
+        if start >= self.size or count <= 0:
+            return items
+        node = self.head
+        index = start + 1
+        for level in reversed(range(self.max_levels)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        while node is not _NIL and len(items) < count:
+            items.append(node.value)
+            node = node.next[0]
+        return items
+
+
+def is_user_key(key):
+    # Key ledger selain user (escrow_<msg_id>) tidak ikut peringkat
+    return key.isdigit()
+
+
+class Leaderboard:
+    # Peringkat saldo user yang diperbarui ledger pada setiap perubahan saldo
+    # (lihat PointsLedger on_change). Item skip list = (-saldo, user_id) supaya
+    # urutan naik = saldo tertinggi dulu; user dengan saldo sama diurutkan
+    # menurut id. Jumlah user per tier ROLE_TIERS ikut dijaga.
+
+    def __init__(self, tiers):
+        # tiers: [(ambang, key)] urut menurun seperti ROLE_TIERS
+        self._thresholds = [threshold for threshold, _ in reversed(tiers)]
+        self._tier_keys = [key for _, key in reversed(tiers)]
+        self._ranks = IndexableSkipList()
+        self._balances = {}  # user_id -> saldo yang sedang terindeks
+        self.tier_counts = self._empty_counts()
+        self._pending = None  # user_id -> saldo baru, selama load() berjalan
+        self._ready = asyncio.Event()
+        self._ready.set()
+
+    def __len__(self):
+        return len(self._balances)
+
+    def _empty_counts(self):
+        counts = {key: 0 for key in self._tier_keys}
+        counts[None] = 0  # di bawah tier terendah
+        return counts
+
+    def tier(self, balance):
+        index = bisect.bisect_right(self._thresholds, balance) - 1
+        return self._tier_keys[index] if index >= 0 else None
+
+    async def wait_ready(self):
+        await self._ready.wait()
+
+    def _build(self, items):
+        balances = {key: balance for key, balance in items if is_user_key(key)}
+        ranks = IndexableSkipList()
+        ranks.build(sorted((-balance, int(key)) for key, balance in balances.items()))
+        counts = self._empty_counts()
+        for balance in balances.values():
+            counts[self.tier(balance)] += 1
+        return balances, ranks, counts
+
+    def load(self, balances):
+        # Skip list dibangun di thread dari salinan saldo (jutaan node butuh
+        # beberapa detik), jadi pembukaan guild tidak menunggu. Perubahan
+        # yang datang selama itu dicatat di _pending lalu diterapkan setelah
+        # build selesai. -> task yang selesai saat peringkat siap.
+        self._ready.clear()
+        self._pending = {}
+        return asyncio.get_running_loop().create_task(self._load(list(balances.items())))
+
+    async def _load(self, items):
+        try:
+            built, ranks, counts = await asyncio.to_thread(self._build, items)
+            self._balances, self._ranks, self.tier_counts = built, ranks, counts
+            pending, self._pending = self._pending, None
+            for key, balance in pending.items():
+                self.update(key, balance)
+        finally:
+            self._pending = None
+            self._ready.set()
+
+    def update(self, key, balance):
+        if not is_user_key(key):
+            return
+        if self._pending is not None:
+            self._pending[key] = balance
+            return
+        old = self._balances.get(key)
+        if old == balance:
+            return
+        if old is not None:
+            self._ranks.remove((-old, int(key)))
+            self.tier_counts[self.tier(old)] -= 1
+        if balance is None:
+            del self._balances[key]
+            return
+        self._balances[key] = balance
+        self._ranks.insert((-balance, int(key)))
+        self.tier_counts[self.tier(balance)] += 1
+
+    def top(self, count, offset=0):
+        # -> [(user_id, saldo)]; panggil setelah wait_ready()
+        return [(user_id, -negative) for negative, user_id in self._ranks.slice(offset, count)]
+
+    def rank(self, user_id):
+        # -> (peringkat mulai 1, saldo) atau None; saldo sama = peringkat sama
+        balance = self._balances.get(str(user_id))
+        if balance is None:
+            return None
+        return self._ranks.bisect_left((-balance, 0)) + 1, balance
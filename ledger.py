@@ -0,0 +1,249 @@
+import asyncio
+import time
+
+from journal import Journal
+from storage import ENGAGEMENT_FILE, GIVER_FILE, PENDING_FILE, REQUESTS_FILE
+
+
+class PointsLedger:
+    # Saldo poin disimpan di memori. Setiap perpindahan poin dicatat sebagai
+    # satu baris di journal append-only (fsync di-batch tiap `flush_interval`
+    # detik atau setelah `flush_threshold` transaksi). Journal dipadatkan ke
+    # snapshot di storage setelah `compact_threshold` transaksi dan saat close().
+    #
+    # Setiap leg menyimpan saldo akhir key-nya, jadi replay bersifat idempotent:
+    # entri yang sudah masuk snapshot aman diterapkan ulang. Baris journal juga
+    # bisa membawa perubahan record storage (lihat commit()) yang ikut di-replay.
+    # Record request, konfirmasi pending, dan statistik pemberi diterapkan ke
+    # RequestStore `requests` / PendingStore `pending` / GiverStore `givers`
+    # (kalau ada) dan baru ditulis ke storage saat compaction. Record tanda
+    # engagement diterapkan ke EngagementIndex `engagements`; journal baru
+    # dipotong setelah index itu berhasil flush.
+
+    def __init__(self, storage, journal_path, flush_interval=5.0, flush_threshold=100, compact_threshold=10000,
+                 on_change=None, requests=None, engagements=None, pending=None, givers=None):
+        self.storage = storage
+        self.on_change = on_change  # fn(key, saldo baru) setelah open(), mis. Leaderboard.update
+        self.requests = requests  # RequestStore yang sudah dimuat sebelum open()
+        self.engagements = engagements  # EngagementIndex yang sudah dibuka sebelum open()
+        self.pending = pending  # PendingStore yang sudah dimuat sebelum open()
+        self.givers = givers  # GiverStore yang sudah dimuat sebelum open()
+        self.journal = Journal(journal_path)
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.compact_threshold = compact_threshold
+        self.balances = {}
+        self._changed = set()  # key yang berubah sejak snapshot terakhir
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._closing = False
+
+    # --- Lifecycle ---
+    async def open(self, balances=None):
+        # balances: saldo dari snapshot; tanpa itu dibaca dari storage
+        self.balances = balances if balances is not None else await self.storage.load_balances()
+        records = await asyncio.to_thread(self.journal.read)
+        if self.journal.torn:
+            print("⚠️ Ledger: baris terakhir journal terpotong, diabaikan")
+            await asyncio.to_thread(self.journal.repair)
+        pending_records = []
+        for record in records:
+            self._replay(record)
+            pending_records.extend(self._apply_resident_records(record.get("records", ())))
+        if pending_records:
+            await self.storage.apply_records(pending_records)
+        if records:
+            print(f"♻️ Ledger: {len(records)} transaksi di-replay dari journal")
+            await self.compact()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def close(self):
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.compact()
+
+    async def abandon(self):
+        # Lease guild hilang: pemilik baru sudah memakai journal dan storage
+        # yang sama. Hentikan flush loop tanpa compaction; transaksi yang
+        # belum di-fsync dibuang dan commit() berikutnya gagal.
+        self._closing = True
+        self.journal.abandon()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _replay(self, record):
+        for leg in record["legs"]:
+            if leg["balance"] is None:
+                self.balances.pop(leg["key"], None)
+            else:
+                self.balances[leg["key"]] = leg["balance"]
+            self._changed.add(leg["key"])
+
+    def _resident_store(self, record):
+        # RequestStore / EngagementIndex / PendingStore / GiverStore pemilik
+        # record, atau None kalau record langsung diterapkan ke storage
+        if record["store"] == REQUESTS_FILE:
+            return self.requests
+        if record["store"] == PENDING_FILE:
+            return self.pending
+        if record["store"] == GIVER_FILE:
+            return self.givers
+        if record["store"] == ENGAGEMENT_FILE:
+            return self.engagements
+        return None
+
+    def _apply_resident_records(self, records):
+        # -> record yang tidak dipegang di memori (diterapkan ke storage)
+        rest = []
+        for record in records:
+            store = self._resident_store(record)
+            if store is not None:
+                store.apply(record)
+            else:
+                rest.append(record)
+        return rest
+
+    async def flush(self):
+        async with self._flush_lock:
+            try:
+                await self.journal.sync()
+            except Exception as e:
+                print(f"❌ Error saat sync journal ledger: {e}")
+                return
+        if self.journal.entries_on_disk >= self.compact_threshold:
+            await self.compact()
+
+    async def compact(self):
+        if self.journal.abandoned:
+            return
+        async with self._flush_lock:
+            changed, self._changed = self._changed, set()
+            changed_requests = self.requests.take_changes() if self.requests is not None else {}
+            changed_pending = self.pending.take_changes() if self.pending is not None else {}
+            changed_givers = self.givers.take_changes() if self.givers is not None else {}
+            try:
+                await self.journal.sync()
+                await self.storage.save_balances(
+                    dict(self.balances),
+                    changed={key: self.balances.get(key) for key in changed},
+                )
+                if changed_requests:
+                    await self.storage.save_requests(self.requests.all(), changed=changed_requests)
+                if changed_pending:
+                    await self.storage.save_pending(self.pending.all(), changed=changed_pending)
+                if changed_givers:
+                    await self.storage.save_giver_stats(self.givers.all(), changed=changed_givers)
+                if self.engagements is not None and not await self.engagements.flush():
+                    raise RuntimeError("tanda engagement belum tersimpan, journal tidak dipotong")
+                await self.journal.truncate()
+            except Exception as e:
+                self._changed |= changed
+                if changed_requests:
+                    self.requests.restore_changes(changed_requests)
+                if changed_pending:
+                    self.pending.restore_changes(changed_pending)
+                if changed_givers:
+                    self.givers.restore_changes(changed_givers)
+                print(f"❌ Error saat compact ledger: {e}")
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    # --- Reads ---
+    def balance(self, key):
+        return self.balances.get(str(key), 0)
+
+    # --- Writes ---
+    def _leg(self, entry_type, key, amount):
+        key = str(key)
+        new_balance = round(self.balances.get(key, 0) + amount, 1)
+        self.balances[key] = new_balance
+        self._changed.add(key)
+        if self.on_change is not None:
+            self.on_change(key, new_balance)
+        return {"type": entry_type, "key": key, "amount": abs(amount), "balance": new_balance}
+
+    def _commit(self, legs):
+        self.journal.append({"ts": time.time(), "legs": legs})
+        if self.journal.pending >= self.flush_threshold:
+            self._wake.set()
+
+    async def commit(self, legs, records=()):
+        # Legs (hasil stage_*) dan perubahan record ditulis sebagai satu baris
+        # journal lalu langsung di-fsync; record baru diterapkan ke storage
+        # setelah durable. Crash di antaranya dipulihkan oleh replay di open().
+        # Record request / pending / engagement / pemberi sudah diterapkan ke memori oleh stage*().
+        records = [record for record in records if record is not None]
+        self.journal.append({"ts": time.time(), "legs": legs, "records": records})
+        records = [record for record in records if self._resident_store(record) is None]
+        async with self._flush_lock:
+            await self.journal.sync()
+            if records:
+                await self.storage.apply_records(records)
+
+    def credit(self, user_id, amount):
+        leg = self._leg("credit", user_id, amount)
+        self._commit([leg])
+        return leg["balance"]
+
+    def debit(self, user_id, amount):
+        leg = self._leg("debit", user_id, -amount)
+        self._commit([leg])
+        return leg["balance"]
+
+    def stage_adjust(self, user_id, amount):
+        # Koreksi moderator (positif = kredit); legs harus diteruskan ke commit()
+        return [self._leg("credit" if amount >= 0 else "debit", user_id, amount)]
+
+    def stage_transfer(self, from_id, to_id, amount, tax=0, subsidy=0):
+        # Pengirim bayar amount + tax, penerima dapat amount + subsidy.
+        # Saldo di memori langsung berubah; legs harus diteruskan ke commit().
+        legs = [
+            self._leg("debit", from_id, -amount),
+            self._leg("credit", to_id, amount),
+        ]
+        if tax:
+            legs.append(self._leg("tax", from_id, -tax))
+        if subsidy:
+            legs.append(self._leg("subsidy", to_id, subsidy))
+        return legs
+
+    def transfer(self, from_id, to_id, amount, tax=0, subsidy=0):
+        self._commit(self.stage_transfer(from_id, to_id, amount, tax=tax, subsidy=subsidy))
+
+    def hold_escrow(self, user_id, escrow_key, amount):
+        legs = [self._leg("escrow_hold", user_id, -amount)]
+        self.balances[escrow_key] = amount
+        self._changed.add(escrow_key)
+        legs.append({"type": "escrow_hold", "key": escrow_key, "amount": amount, "balance": amount})
+        self._commit(legs)
+
+    def stage_release_escrow(self, escrow_key, to_id):
+        # -> (jumlah dikembalikan, legs); legs harus diteruskan ke commit()
+        amount = self.balances.pop(escrow_key, None)
+        if amount is None:
+            return 0, []
+        self._changed.add(escrow_key)
+        legs = [{"type": "escrow_release", "key": escrow_key, "amount": amount, "balance": None}]
+        if amount > 0:
+            legs.append(self._leg("escrow_release", to_id, amount))
+        return amount, legs
+
+    def release_escrow(self, escrow_key, to_id):
+        amount, legs = self.stage_release_escrow(escrow_key, to_id)
+        if legs:
+            self._commit(legs)
+        return amount
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class LockStats:
+    def __init__(self):
+        self.acquired = 0
+        self.contended = 0  # harus menunggu karena lock sedang dipegang
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+
+    def as_dict(self):
+        return {
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "wait_total": self.wait_total,
+            "wait_max": self.wait_max,
+            "hold_total": self.hold_total,
+        }
+
+
+class LockManager:
+    # Lock per key, key berupa (namespace, id): ("store", "requests.json"),
+    # ("request", msg_id), ("user", user_id). Operasi yang tidak berbagi key
+    # berjalan paralel.
+    #
+    # hold() bisa memegang beberapa key sekaligus; key selalu diambil dalam
+    # urutan terurut sehingga dua operasi multi-key (mis. transfer A->B dan
+    # B->A) tidak bisa saling menunggu. Lock dibuang begitu tidak ada yang
+    # memegang atau menunggu, jadi jumlahnya mengikuti operasi yang sedang
+    # berjalan saja.
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._locks = {}  # key -> [asyncio.Lock, jumlah pemakai]
+        self.stats = {}  # namespace -> LockStats
+
+    def __len__(self):
+        return len(self._locks)
+
+    @staticmethod
+    def _normalize(key):
+        namespace, ident = key
+        return namespace, str(ident)
+
+    async def _acquire(self, key):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        stats = self.stats.get(key[0])
+        if stats is None:
+            stats = self.stats[key[0]] = LockStats()
+        stats.acquired += 1
+        # Pemakai lain (pemegang atau yang menunggu) berarti harus antre,
+        # walau lock sesaat kosong karena giliran sedang dioper
+        if not (entry[0].locked() or entry[1] > 1):
+            await entry[0].acquire()
+            return
+        stats.contended += 1
+        start = self.clock()
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._release_entry(key, entry, locked=False)
+            raise
+        finally:
+            waited = self.clock() - start
+            stats.wait_total += waited
+            stats.wait_max = max(stats.wait_max, waited)
+
+    def _release_entry(self, key, entry, locked=True):
+        if locked:
+            entry[0].release()
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+    @asynccontextmanager
+    async def hold(self, *keys):
+        keys = sorted(set(self._normalize(key) for key in keys))
+        held = []
+        acquired_at = None
+        try:
+            for key in keys:
+                await self._acquire(key)
+                held.append(key)
+            acquired_at = self.clock()
+            yield
+        finally:
+            held_for = self.clock() - acquired_at if acquired_at is not None else 0.0
+            for key in reversed(held):
+                self.stats[key[0]].hold_total += held_for
+                self._release_entry(key, self._locks[key])
+
+    def snapshot(self):
+        # Metrik contention per namespace
+        return {namespace: stats.as_dict() for namespace, stats in self.stats.items()}
@@ -1,11 +1,30 @@
 import os
 import discord
 from discord.ext import commands
-import json
-from collections import defaultdict
 import asyncio
-from datetime import datetime, timedelta
+from datetime import timedelta
 import hashlib
+import logging
+import shutil
+import signal
+import socket
+import sys
+import time
+import typing
+from audit_log import AuditLogSink
+from bulk_points import BulkAdjustment, parse_csv
+from confirm_digest import ConfirmationDigest
+from guild_registry import GuildRegistry
+from guild_state import GuildState, GuildStates
+from keep_alive import keep_alive
+from metrics import MetricsRegistry, RateLimitCounter, timed
+from rate_limit import SlidingWindowLimiter
+from request_store import REACTOR_FIELDS
+from role_sync import RoleReconciler
+from scheduler import Scheduler
+from shared_state import LeaseCoordinator, open_shared_state
+from snapshot import SNAPSHOT_FILE
+from storage import DOCUMENTS, POINTS_JOURNAL_FILE
 
 # --- Setup ---
 intents = discord.Intents.default()
@@ -13,17 +32,55 @@ intents.message_content = True
 intents.reactions = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class EngagementBot(commands.AutoShardedBot):
+    async def setup_hook(self):
+        # bot.run() hanya menangani Ctrl+C; host / container menghentikan
+        # proses dengan SIGTERM. Keduanya harus lewat close() supaya kredit
+        # yang masih di buffer ledger ikut tersimpan.
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.close_on_signal)
+
+    def close_on_signal(self):
+        print("🛑 SIGTERM diterima, bot ditutup")
+        task = asyncio.create_task(self.close())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def close(self):
+        # Pastikan saldo di memori tersimpan sebelum bot mati
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        await confirm_digest.close()
+        await confirmation_timers.close()
+        await decision_inbox.close()
+        await mute_timers.close()
+        await role_reconciler.close()
+        await expiry_timers.close()
+        await audit_log.close()
+        await guild_states.close_all()
+        await coordinator.close()
+        await shared.close()
+        await super().close()
+
+# Jumlah shard; kosong = mengikuti rekomendasi Discord. SHARD_IDS ("0,1")
+# membatasi shard yang dijalankan proses ini saat bot dipecah ke beberapa proses.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+SHARD_IDS = os.getenv("SHARD_IDS")
+
+bot = EngagementBot(
+    command_prefix="!",
+    intents=intents,
+    shard_count=int(SHARD_COUNT) if SHARD_COUNT else None,
+    shard_ids=[int(shard_id) for shard_id in SHARD_IDS.split(",")] if SHARD_IDS else None,
+)
 
 # --- State ---
-user_message_count = defaultdict(list)
-user_mute_level = defaultdict(int)
-daily_given = defaultdict(lambda: {"count": 0, "reset": None})
-last_daily_reward = {}
-pending_verifications = {}  # dm_message_id -> data
-
-# --- File I/O Lock ---
-file_lock = asyncio.Lock()
+pending_verifications = {}  # dm_message_id -> data, hanya guild milik proses ini
+active_mutes = {}  # "guild_id:user_id" -> data mute (disimpan di storage)
+_muted_role_setup = {}  # guild_id -> task pembuatan role Muted
+_background_tasks = set()
+metrics_server = None
+_started = False
+exit_code = 0
 
 # --- Konfigurasi ---
 ENGAGEMENT_PRICES = {
@@ -33,155 +90,743 @@ ENGAGEMENT_PRICES = {
     "follow": 2.0
 }
 
+# Nama role di server; kode hanya memakai key di kiri
+ROLE_NAMES = {
+    "whale": "Whale",
+    "sultan": "Sultan",
+    "menengah": "Ekonomi Menengah",
+    "donasi": "Butuh Donasi",
+    "dermawan": "Dermawan",
+    "muted": "🔇 Muted",
+}
+
 ROLE_TIERS = [
-    (100, "Whale"),
-    (50, "Sultan"),
-    (9, "Ekonomi Menengah"),
-    (5, "Butuh Donasi"),
+    (100, "whale"),
+    (50, "sultan"),
+    (9, "menengah"),
+    (5, "donasi"),
 ]
 
-PENDING_FILE = 'pending_dm.json'
+# Role yang dikelola sinkronisasi poin
+MANAGED_ROLES = {role_key for _, role_key in ROLE_TIERS} | {"dermawan"}
+
+CHANNEL_NAMES = {
+    "log": "bukti-transaksi",
+}
+
+# Anti-spam per channel: lebih dari N pesan dalam W detik = mute
+SPAM_LIMITS = {
+    "jual-beli": (7, 60),
+    "bukti-transaksi": (7, 60),
+    "general": (7, 60),
+}
+# Batas jumlah user yang dilacak sekaligus per struktur state
+RATE_LIMIT_CAPACITY = int(os.getenv("RATE_LIMIT_CAPACITY", "100000"))
+# Level mute turun ke 0 setelah sekian detik tanpa mute baru
+MUTE_LEVEL_TTL = 7 * 86400
+# Jumlah set_permissions paralel saat menyiapkan role Muted pertama kali
+MUTE_SETUP_CONCURRENCY = int(os.getenv("MUTE_SETUP_CONCURRENCY", "5"))
+
+CONFIRM_TIMEOUT = 900  # detik sebelum klaim dianggap sah
+
+# Cara requester menerima konfirmasi klaim (default; tiap user bisa memilih
+# lewat !konfirmasi):
+#   satuan -> satu DM per klaim, ✅/❌ di DM itu
+#   gabung -> klaim dalam CONFIRM_BATCH_WINDOW detik dikirim sebagai satu DM
+#             (maks. CONFIRM_BATCH_MAX klaim), setujui/tolak semua atau per nomor
+CONFIRM_MODES = ("satuan", "gabung")
+CONFIRM_MODE = os.getenv("CONFIRM_MODE", "satuan")
+CONFIRM_BATCH_WINDOW = float(os.getenv("CONFIRM_BATCH_WINDOW", "60"))
+CONFIRM_BATCH_MAX = int(os.getenv("CONFIRM_BATCH_MAX", "20"))
+# Command yang boleh dipakai di DM (selain itu command hanya di server)
+DM_COMMANDS = {"setuju", "tolak"}
+
+# Default pengaturan guild. Tiap guild bisa menimpanya lewat settings.json di
+# direktori datanya, mis. {"prices": {"like": 1.0}, "role_tiers": {"whale": 200},
+# "confirm_mode": "gabung"} (lihat guild_state.load_settings)
+GUILD_SETTINGS = {
+    "prices": ENGAGEMENT_PRICES,
+    "role_tiers": ROLE_TIERS,
+    "confirm_mode": CONFIRM_MODE,
+}
+
+# Perubahan poin untuk member yang sama dalam jendela ini = satu edit role
+ROLE_SYNC_WINDOW = float(os.getenv("ROLE_SYNC_WINDOW", "2"))
+
+# !bulkpoint: batas per member sama dengan !addpoint, jumlah target per
+# perintah, dan edit role paralel setelahnya
+BULK_POINT_LIMIT = 20
+BULK_POINT_MAX_TARGETS = int(os.getenv("BULK_POINT_MAX_TARGETS", "5000"))
+BULK_ROLE_CONCURRENCY = int(os.getenv("BULK_ROLE_CONCURRENCY", "5"))
+
+# Embed request: perubahan dalam jendela ini digabung, maksimal satu edit per interval
+EMBED_RENDER_WINDOW = float(os.getenv("EMBED_RENDER_WINDOW", "0.5"))
+EMBED_RENDER_INTERVAL = float(os.getenv("EMBED_RENDER_INTERVAL", "2"))
+
+# !top: jumlah baris default dan maksimal per halaman
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_MAX_PAGE_SIZE = 25
+
+# Handle pesan embed request yang disimpan per guild (LRU), supaya !ambil
+# dan edit embed tidak perlu fetch_message
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", "10000"))
+
+# Storage: "json" (file lama) atau "sqlite" (migrasi: python storage.py migrate)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "bot.db")
+
+# Data tiap guild ada di GUILD_DATA_DIR/<guild_id>/. File lama di direktori
+# kerja (bot satu server) dipakai guild LEGACY_GUILD_ID; kalau kosong dan bot
+# hanya ada di satu guild, file lama dipindahkan ke direktori guild tersebut.
+GUILD_DATA_DIR = os.getenv("GUILD_DATA_DIR", "guilds")
+LEGACY_GUILD_ID = os.getenv("LEGACY_GUILD_ID")
+
+# Snapshot biner state tiap guild (SNAPSHOT_FILE di direktori data guild):
+# ditulis saat guild ditutup, dimuat saat start kalau storage belum berubah
+STATE_SNAPSHOT = os.getenv("STATE_SNAPSHOT", "1") == "1"
+
+# Ledger: fsync journal tiap N detik atau setelah N transaksi,
+# padatkan journal ke snapshot storage setelah N transaksi
+LEDGER_FLUSH_INTERVAL = float(os.getenv("LEDGER_FLUSH_INTERVAL", "5"))
+LEDGER_FLUSH_THRESHOLD = int(os.getenv("LEDGER_FLUSH_THRESHOLD", "100"))
+LEDGER_COMPACT_THRESHOLD = int(os.getenv("LEDGER_COMPACT_THRESHOLD", "10000"))
+
+# Settlement yang datang dalam jendela ini di-commit bersama (satu fsync)
+SETTLEMENT_WINDOW = float(os.getenv("SETTLEMENT_WINDOW", "0.05"))
+
+# Index engagement resident; Bloom filter opsional di depan binary search
+ENGAGEMENT_BLOOM = os.getenv("ENGAGEMENT_BLOOM", "0") == "1"
+
+registry = GuildRegistry(CHANNEL_NAMES, ROLE_NAMES)
+
+spam_limiters = {
+    name: SlidingWindowLimiter(limit, window, capacity=RATE_LIMIT_CAPACITY)
+    for name, (limit, window) in SPAM_LIMITS.items()
+}
+# State bersama antar proses bot. Kosong = satu proses, state di memori;
+# path SQLite = beberapa proses (mis. satu per shard) di host yang sama.
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH")
+PROCESS_ID = os.getenv("PROCESS_ID") or f"{socket.gethostname()}:{os.getpid()}"
+# Lease guild / leader habis setelah sekian detik tanpa perpanjangan
+LEASE_TTL = float(os.getenv("LEASE_TTL", "30"))
+# Interval pemilik guild memeriksa keputusan konfirmasi dari proses lain
+DECISION_POLL_INTERVAL = float(os.getenv("DECISION_POLL_INTERVAL", "1"))
+
+# Namespace di state bersama, key "guild_id:user_id" kecuali disebut lain:
+#   mute_level   -> level mute terakhir
+#   daily_given  -> jumlah !givepoint hari ini
+#   daily_reward -> waktu hadiah #general
+#   pending      -> dm_message_id -> guild_id (rute reaksi DM)
+#   confirm_batch -> dm_message_id DM gabungan -> {guild_id, claims: [id pending | None]}
+#   decision     -> "guild_id:dm_message_id" -> disetujui / tidak
+# Namespace cache yang boleh dibuang (LRU) saat state di memori penuh;
+# pending, decision, confirm_batch, dan lease hanya hilang karena kedaluwarsa
+SHARED_CACHE_NAMESPACES = ("mute_level", "daily_given", "daily_reward")
+shared = open_shared_state(SHARED_STATE_PATH, capacity=RATE_LIMIT_CAPACITY, bounded=SHARED_CACHE_NAMESPACES)
+
+def shared_key(guild_id, user_id):
+    return f"{guild_id}:{user_id}"
+
+# Log #bukti-transaksi: "batch" (digabung per interval / N event) atau "instant"
+AUDIT_LOG_MODE = os.getenv("AUDIT_LOG_MODE", "batch")
+AUDIT_LOG_INTERVAL = float(os.getenv("AUDIT_LOG_INTERVAL", "10"))
+AUDIT_LOG_BATCH = int(os.getenv("AUDIT_LOG_BATCH", "20"))
+
+audit_log = AuditLogSink(
+    lambda guild: registry.channel(guild, "log"),
+    batched=AUDIT_LOG_MODE != "instant",
+    interval=AUDIT_LOG_INTERVAL,
+    max_events=AUDIT_LOG_BATCH,
+)
+
+# Endpoint /healthz dan /metrics; port 0 = nonaktif
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "8080"))
+
+# --- METRIK ---
+metrics = MetricsRegistry()
+event_latency = metrics.histogram("bot_event_duration_seconds", "Durasi handler event Discord", labels=("event",))
+command_latency = metrics.histogram("bot_command_duration_seconds", "Durasi command", labels=("command",))
+rest_rate_limits = metrics.counter("bot_rest_429_total", "Respons 429 dari REST API Discord", labels=("scope",))
+logging.getLogger("discord.http").addHandler(RateLimitCounter(rest_rate_limits))
+
+def _sum_by_key(dicts):
+    # Jumlahkan statistik {key: angka} dari semua guild
+    total = {}
+    for values in dicts:
+        for key, value in values.items():
+            total[key] = total.get(key, 0) + value
+    return total
+
+def _lock_stat(field):
+    return lambda: _sum_by_key(
+        {ns: s[field] for ns, s in state.locks.snapshot().items()} for state in guild_states
+    )
+
+def _storage_written():
+    return _sum_by_key(
+        {**state.storage.io_stats()[1], POINTS_JOURNAL_FILE: state.ledger.journal.bytes_written}
+        for state in guild_states
+    )
+
+metrics.counter_fn("bot_lock_wait_seconds_total", "Waktu menunggu lock", _lock_stat("wait_total"), labels=("namespace",))
+metrics.counter_fn("bot_lock_hold_seconds_total", "Waktu lock dipegang", _lock_stat("hold_total"), labels=("namespace",))
+metrics.counter_fn(
+    "bot_lock_contended_total", "Pengambilan lock yang harus menunggu", _lock_stat("contended"), labels=("namespace",)
+)
+metrics.counter_fn(
+    "bot_storage_read_bytes_total", "Byte dibaca per store",
+    lambda: _sum_by_key(state.storage.io_stats()[0] for state in guild_states), labels=("store",),
+)
+metrics.counter_fn("bot_storage_written_bytes_total", "Byte ditulis per store", _storage_written, labels=("store",))
+metrics.counter_fn(
+    "bot_discord_writes_total", "Edit/kirim yang dilakukan komponen batch",
+    lambda: {
+        "role_edit": role_reconciler.edits,
+        "embed_edit": sum(state.render_queue.edits for state in guild_states),
+        "log_message": audit_log.sent,
+        "confirm_digest": confirm_digest.sent,
+    },
+    labels=("kind",),
+)
+metrics.gauge_fn(
+    "bot_guild_open_seconds", "Waktu membuka state guild per tahap (guild paling lambat)",
+    lambda: {
+        phase: max(state.startup_report.get(phase, 0) for state in guild_states)
+        for phase in ("snapshot", "engagements", "ledger", "indexes", "total")
+    } if len(guild_states) else {},
+    labels=("phase",),
+)
+metrics.counter_fn(
+    "bot_message_cache_lookups_total", "Pencarian pesan embed request yang direply",
+    lambda: _sum_by_key(state.messages.stats() for state in guild_states), labels=("result",),
+)
+metrics.gauge_fn("bot_guilds_loaded", "Guild yang state-nya sedang dibuka", lambda: len(guild_states))
+metrics.gauge_fn("bot_pending_confirmations", "Konfirmasi DM yang menunggu", lambda: len(pending_verifications))
+metrics.gauge_fn("bot_confirm_digest_buffered", "Klaim yang menunggu dikirim dalam DM gabungan", lambda: len(confirm_digest))
+metrics.gauge_fn("bot_is_leader", "1 jika proses ini memegang lease leader", lambda: int(coordinator.is_leader))
+metrics.gauge_fn(
+    "bot_scheduled_timers", "Timer terjadwal per scheduler",
+    lambda: {t.name: len(t) for t in (confirmation_timers, expiry_timers, mute_timers)}, labels=("scheduler",),
+)
+metrics.gauge_fn(
+    "bot_gateway_latency_seconds", "Latensi heartbeat gateway per shard",
+    lambda: {shard_id: latency for shard_id, latency in bot.latencies}, labels=("shard",),
+)
+
+def bot_healthy():
+    return bot.is_ready() and not bot.is_closed()
 
 # --- UTILITIES ---
 def make_engagement_key(user_id: int, link: str) -> str:
     return hashlib.sha256(f"{user_id}_{link}".encode()).hexdigest()[:16]
 
-async def has_engaged(user_id: int, link: str, task_type: str) -> bool:
-    log = await load_json('engagement_log.json', dict)
-    key = make_engagement_key(user_id, link)
-    return log.get(key, {}).get(task_type, False)
-
-async def mark_engaged(user_id: int, link: str, task_type: str):
-    log = await load_json('engagement_log.json', dict)
-    key = make_engagement_key(user_id, link)
-    if key not in log:
-        log[key] = {}
-    log[key][task_type] = True
-    await save_json('engagement_log.json', log)
-
-async def load_json(filename, default=None):
-    async with file_lock:
-        try:
-            if os.path.exists(filename):
-                with open(filename, 'r') as f:
-                    return json.load(f)
-            return default() if callable(default) else default
-        except Exception:
-            return default() if callable(default) else default
+def has_engaged(state, user_id: int, link: str, task_type: str) -> bool:
+    return state.engagement_index.contains(make_engagement_key(user_id, link), task_type)
+
+def mark_engaged(state, user_id: int, link: str, task_type: str):
+    # -> record untuk ledger.commit (tanda ikut journal), None jika sudah ada
+    return state.engagement_index.stage(make_engagement_key(user_id, link), task_type)
+
+def guild_data_paths(guild_id):
+    # (direktori data, path SQLite) milik guild
+    if LEGACY_GUILD_ID and int(LEGACY_GUILD_ID) == guild_id:
+        return ".", SQLITE_PATH
+    directory = os.path.join(GUILD_DATA_DIR, str(guild_id))
+    return directory, os.path.join(directory, "bot.db")
+
+def legacy_data_files():
+    # File data bot satu server (sebelum multi-guild) di direktori kerja
+    names = DOCUMENTS + (POINTS_JOURNAL_FILE, SNAPSHOT_FILE, SQLITE_PATH, f"{SQLITE_PATH}-wal", f"{SQLITE_PATH}-shm")
+    return [name for name in names if os.path.exists(name)]
+
+def adopt_legacy_data(guilds):
+    # Data lama tanpa LEGACY_GUILD_ID dipindahkan ke guild satu-satunya.
+    # False kalau tidak bisa dipetakan: bot tidak boleh jalan dengan saldo
+    # kosong sementara data lamanya diabaikan.
+    legacy = legacy_data_files()
+    if LEGACY_GUILD_ID or not legacy:
+        return True
+    found = ", ".join(legacy)
+    if len(guilds) != 1 or (bot.shard_count or 1) > 1:
+        print(f"❌ Data lama ditemukan ({found}) tapi bot ada di {len(guilds)} guild; atur LEGACY_GUILD_ID ke guild pemilik data tersebut.")
+        return False
+    guild_id = guilds[0].id
+    directory, sqlite_path = guild_data_paths(guild_id)
+    if os.path.exists(directory):
+        print(f"❌ Data lama ditemukan ({found}) tapi {directory} sudah ada; atur LEGACY_GUILD_ID atau pindahkan salah satunya.")
+        return False
+    os.makedirs(directory)
+    for name in legacy:
+        if name.startswith(SQLITE_PATH):
+            target = sqlite_path + name[len(SQLITE_PATH):]
+        else:
+            target = os.path.join(directory, name)
+        shutil.move(name, target)
+    print(f"📦 Data lama ({found}) dipindahkan ke {directory} untuk guild {guild_id}")
+    return True
+
+def guild_lease(guild_id):
+    return f"guild:{guild_id}"
+
+async def open_guild_state(guild_id):
+    # Data guild (dan timer expiry / auto-approve-nya) hanya dipegang satu
+    # proses: tunggu sampai lease guild didapat
+    name = guild_lease(guild_id)
+    await coordinator.acquire(name)
+    try:
+        return await load_guild_state(guild_id)
+    except BaseException:
+        # Lease jangan terus diperpanjang untuk guild yang gagal dibuka;
+        # proses lain (atau percobaan berikutnya) boleh mengambilnya
+        forget_guild_confirmations(guild_id)
+        await coordinator.release(name)
+        raise
+
+async def load_guild_state(guild_id):
+    directory, sqlite_path = guild_data_paths(guild_id)
+    state = GuildState(
+        guild_id,
+        directory,
+        # Embed memakai harga guild ini (state sudah ada saat render dipanggil)
+        lambda request: build_embed(request, state.settings["prices"]),
+        settings=GUILD_SETTINGS,
+        backend=STORAGE_BACKEND,
+        sqlite_path=sqlite_path,
+        ledger_flush_interval=LEDGER_FLUSH_INTERVAL,
+        ledger_flush_threshold=LEDGER_FLUSH_THRESHOLD,
+        ledger_compact_threshold=LEDGER_COMPACT_THRESHOLD,
+        settlement_window=SETTLEMENT_WINDOW,
+        engagement_bloom=ENGAGEMENT_BLOOM,
+        render_window=EMBED_RENDER_WINDOW,
+        render_interval=EMBED_RENDER_INTERVAL,
+        message_cache_size=MESSAGE_CACHE_SIZE,
+        snapshot_path=os.path.join(directory, SNAPSHOT_FILE) if STATE_SNAPSHOT else None,
+    )
+    try:
+        await state.open()
+        await arm_guild_timers(state)
+    except BaseException:
+        # Tanpa compaction: journal tetap utuh untuk percobaan berikutnya
+        await state.abandon()
+        raise
+    print(f"✅ State guild {guild_id} dibuka dari {directory}")
+    return state
+
+async def arm_guild_timers(state):
+    # Timer global, key-nya membawa guild
+    guild_id = state.guild_id
+    for dm_id, data in state.pending.all().items():
+        # Record lama tidak menyimpan guild_id
+        data.setdefault("guild_id", str(guild_id))
+        pending_verifications[dm_id] = data
+        if data.get("batched"):
+            # DM gabungan ikut hilang bersama proses sebelumnya: kirim ulang
+            confirm_digest.add(guild_id, data["requester_id"], dm_id)
+        else:
+            await shared.put("pending", dm_id, str(guild_id), expires=pending_route_expiry(data))
+        # Record lama tanpa deadline langsung jatuh tempo
+        confirmation_timers.schedule(dm_id, data.get("deadline", 0))
+    for msg_id, expiry_ts in state.requests.expiries():
+        expiry_timers.schedule((guild_id, str(msg_id)), expiry_ts)
+    for mute_key, data in (await state.storage.load_mutes()).items():
+        active_mutes[mute_key] = data
+        mute_timers.schedule(mute_key, data["expires"])
+
+guild_states = GuildStates(open_guild_state)
+
+async def get_state(guild):
+    return await guild_states.open(guild.id)
+
+async def close_guild_state(guild_id, release=True):
+    # Lease yang hilang berarti proses lain sudah memegang storage dan journal
+    # guild ini: state dibuang tanpa compaction / snapshot
+    if release:
+        await guild_states.close(guild_id)
+    else:
+        await guild_states.abandon(guild_id)
+    forget_guild_confirmations(guild_id)
+    if release:
+        await coordinator.release(guild_lease(guild_id))
+
+def forget_guild_confirmations(guild_id):
+    # Konfirmasi guild ini sekarang milik proses lain (atau menunggu dibuka lagi)
+    confirm_digest.discard_guild(guild_id)
+    for dm_id in [k for k, data in pending_verifications.items() if int(data["guild_id"]) == guild_id]:
+        claim_pending(dm_id)
+
+async def on_lease_lost(name):
+    if name.startswith("guild:"):
+        await close_guild_state(int(name.split(":", 1)[1]), release=False)
+
+coordinator = LeaseCoordinator(shared, PROCESS_ID, ttl=LEASE_TTL, on_lost=on_lease_lost)
+
+def pending_route_expiry(data):
+    # Rute DM disimpan sedikit lebih lama dari deadline auto-approve
+    return data.get("deadline", time.time()) + CONFIRM_TIMEOUT
+
+async def add_pending(state, dm_id, data, dm_channel=None):
+    # Deadline auto-approve ikut disimpan supaya bisa di-arm ulang setelah restart.
+    # Tanpa dm_channel (mode gabung) belum ada DM: dm_id adalah id klaim dan
+    # rute reaksinya dibuat saat DM gabungan dikirim.
+    data["guild_id"] = str(state.guild_id)
+    data["deadline"] = time.time() + CONFIRM_TIMEOUT
+    if dm_channel is not None:
+        data["dm_channel_id"] = str(dm_channel.id)
+    else:
+        data["batched"] = True
+    pending_verifications[dm_id] = data
+    # Satu baris journal; pending_dm ditulis ulang hanya saat compaction
+    await state.ledger.commit([], [state.pending.stage_put(dm_id, data)])
+    if dm_channel is not None:
+        await shared.put("pending", dm_id, str(state.guild_id), expires=pending_route_expiry(data))
+    confirmation_timers.schedule(dm_id, data["deadline"])
+
+def claim_pending(dm_id):
+    # Klaim lokal oleh pemilik guild; None jika sudah diproses.
+    # Record di storage dihapus bersama commit settlement.
+    confirmation_timers.cancel(str(dm_id))
+    return pending_verifications.pop(str(dm_id), None)
+
+async def decide_confirmation(guild_id, dm_id, approved):
+    # Keputusan (reaksi DM dari proses mana pun vs timeout di pemilik guild)
+    # ditulis sekali lewat compare-and-swap; yang kalah diabaikan. True jika
+    # keputusan ini yang dipakai.
+    dm_id = str(dm_id)
+    key = f"{guild_id}:{dm_id}"
+    if await shared.put("decision", key, approved, version=0, expires=time.time() + 2 * CONFIRM_TIMEOUT) is None:
+        return False
+    state = guild_states.get(guild_id)
+    if state is not None:
+        await settle_decision(key, dm_id, approved)
+    # Selain itu, pemilik guild mengambilnya lewat decision_inbox
+    return True
+
+async def settle_decision(key, dm_id, approved):
+    data = claim_pending(dm_id)
+    try:
+        if data is not None:
+            await process_payment(data, approved=approved, dm_id=dm_id)
+    finally:
+        await shared.delete("decision", key)
+        await shared.delete("pending", dm_id)
+    return data
+
+async def poll_decisions(_keys):
+    # Keputusan untuk guild milik proses ini yang ditulis proses lain
+    try:
+        for state in guild_states:
+            for key, record in await shared.scan("decision", prefix=f"{state.guild_id}:"):
+                await settle_decision(key, key.split(":", 1)[1], record.value)
+    finally:
+        decision_inbox.schedule("poll", time.time() + DECISION_POLL_INTERVAL)
 
-async def save_json(filename, data):
-    async with file_lock:
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=4)
+decision_inbox = Scheduler(poll_decisions, name="decision-inbox")
+
+async def delete_confirmation_dm(dm_id, data):
+    channel_id = data.get("dm_channel_id")
+    if channel_id is None:
+        return
+    try:
+        await bot.get_partial_messageable(int(channel_id)).get_partial_message(int(dm_id)).delete()
+    except discord.NotFound:
+        pass
+    except Exception as e:
+        print(f"⚠️ Gagal hapus DM setelah timeout: {e}")
+
+async def auto_approve_confirmations(dm_ids):
+    # Semua konfirmasi yang lewat batas waktu diproses sekaligus;
+    # settlement-nya masuk ke group commit yang sama.
+    claimed = [(dm_id, pending_verifications.get(dm_id)) for dm_id in dm_ids]
+    claimed = [(dm_id, data) for dm_id, data in claimed if data is not None]
+    results = await asyncio.gather(
+        *(decide_confirmation(int(data["guild_id"]), dm_id, True) for dm_id, data in claimed),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"❌ Error saat auto-approve: {result}")
+    await asyncio.gather(*(
+        delete_confirmation_dm(dm_id, data) for (dm_id, data), result in zip(claimed, results) if result is True
+    ))
+
+confirmation_timers = Scheduler(auto_approve_confirmations, name="auto-approve")
+
+# --- Konfirmasi gabungan ---
+def confirm_mode(state, user_id):
+    mode = state.preferences.get(str(user_id), {}).get("confirm_mode", state.settings["confirm_mode"])
+    return mode if mode in CONFIRM_MODES else "satuan"
+
+async def request_confirmation(state, guild, requester, data, text, failure):
+    # Mode satuan: DM + ✅/❌ per klaim seperti dulu. Mode gabung: klaim
+    # langsung jadi pending (auto-approve tetap berjalan dari waktu klaim)
+    # dan DM-nya menyusul lewat confirm_digest. Id klaim diturunkan dari
+    # request + jenis + penjual; tiap penjual hanya bisa mengklaim satu
+    # engagement per jenis di satu request.
+    if confirm_mode(state, requester.id) == "gabung":
+        claim_id = f"{data['request_id']}-{data['task_type']}-{data['seller_id']}"
+        await add_pending(state, claim_id, data)
+        confirm_digest.add(state.guild_id, requester.id, claim_id)
+        return
+    try:
+        confirm_msg = await requester.send(text)
+        await confirm_msg.add_reaction("✅")
+        await confirm_msg.add_reaction("❌")
+        await add_pending(state, str(confirm_msg.id), data, dm_channel=confirm_msg.channel)
+    except discord.Forbidden:
+        await notify_dm_failure(guild, requester, failure)
 
-async def load_pending():
-    return await load_json(PENDING_FILE, dict)
+DIGEST_TEXT_LIMIT = 1500  # daftar klaim per DM; sisanya untuk judul dan petunjuk
 
-async def save_pending(data):
-    await save_json(PENDING_FILE, data)
+def describe_claim(state, data):
+    request = state.requests.get(data["request_id"])
+    if data.get("is_comment"):
+        text = request["tasks"][data["task_idx"]]["text"] if request else ""
+        text = text if len(text) <= 80 else text[:79] + "…"
+        what = f"komentar _‘{text}’_"
+    else:
+        what = f"**{data['task_type'].capitalize()}**"
+    subsidy = round(data["price"] - data["user_pays"], 2)
+    subsidy_text = f" (subsidi sistem: {subsidy} poin)" if subsidy > 0 else ""
+    return f"<@{data['seller_id']}> — {what} · {data['price']} poin{subsidy_text}"
+
+def digest_pages(state, claims):
+    # claims: [(claim_id, data)] -> [(baris, [claim_id])]; dikelompokkan per
+    # link request, nomor klaim mulai dari 1 di tiap DM
+    pages = []
+    lines, page, used, current_link = [], [], 0, None
+    for claim_id, data in sorted(claims, key=lambda claim: str(claim[1]["request_id"])):
+        request = state.requests.get(data["request_id"])
+        link = request["link"] if request else "(request sudah kadaluarsa)"
+        text = describe_claim(state, data)
+        size = len(text) + 8 + (len(link) + 4 if link != current_link else 0)
+        if page and (used + size > DIGEST_TEXT_LIMIT or len(page) >= CONFIRM_BATCH_MAX):
+            pages.append((lines, page))
+            lines, page, used, current_link = [], [], 0, None
+        if link != current_link:
+            lines.append(f"🔗 {link}")
+            current_link = link
+        page.append(claim_id)
+        lines.append(f"`{len(page)}.` {text}")
+        used += size
+    if page:
+        pages.append((lines, page))
+    return pages
+
+async def send_confirmation_digest(guild_id, requester_id, claim_ids):
+    # Dipanggil confirm_digest; -> jumlah DM yang terkirim. Klaim yang sudah
+    # diputuskan (mis. auto-approve) tidak ikut.
+    state = guild_states.get(guild_id)
+    claims = [(claim_id, pending_verifications[claim_id]) for claim_id in claim_ids if claim_id in pending_verifications]
+    requester = bot.get_user(int(requester_id))
+    if state is None or not claims or requester is None:
+        return 0
+    guild = bot.get_guild(guild_id)
+    guild_name = guild.name if guild else "server"
+    sent = 0
+    for lines, page in digest_pages(state, claims):
+        text = (
+            f"📬 **{len(page)} klaim** menunggu konfirmasimu di **{guild_name}**:\n\n"
+            + "\n".join(lines)
+            + "\n\n✅ React untuk **menyetujui semua**, ❌ untuk **menolak semua**.\n"
+            "Per klaim: reply pesan ini dengan `!setuju 1 3` atau `!tolak 2`.\n"
+            f"⏳ Klaim yang tidak diputuskan dalam **{CONFIRM_TIMEOUT // 60} menit** sejak diklaim **dianggap sah**."
+        )
+        try:
+            digest_msg = await requester.send(text)
+        except discord.Forbidden:
+            if guild is not None:
+                await notify_dm_failure(guild, requester, f"Gagal kirim konfirmasi gabungan ({len(claims)} klaim).")
+            return sent
+        expires = max(pending_route_expiry(pending_verifications.get(claim_id, {})) for claim_id in page)
+        await shared.put("confirm_batch", str(digest_msg.id), {"guild_id": str(guild_id), "claims": page}, expires=expires)
+        await digest_msg.add_reaction("✅")
+        await digest_msg.add_reaction("❌")
+        sent += 1
+    return sent
+
+confirm_digest = ConfirmationDigest(send_confirmation_digest, window=CONFIRM_BATCH_WINDOW, max_claims=CONFIRM_BATCH_MAX)
+
+async def decide_digest(dm_id, approved, numbers=None):
+    # Putuskan klaim di DM gabungan; numbers = nomor klaim (1-based), None =
+    # semua. -> (diputuskan, sudah diputuskan sebelumnya, masih menunggu), atau
+    # None kalau DM gabungan tidak dikenal / sudah selesai. Keputusan per
+    # klaim tetap lewat decide_confirmation (CAS), jadi balapan dengan
+    # auto-approve atau reaksi lain aman.
+    record = await shared.get("confirm_batch", str(dm_id))
+    if record is None:
+        return None
+    batch = dict(record.value)
+    claims = batch["claims"] = list(batch["claims"])
+    if numbers:
+        invalid = [n for n in numbers if not 1 <= n <= len(claims)]
+        if invalid:
+            raise ValueError(f"Nomor klaim harus 1–{len(claims)}.")
+        positions = sorted({n - 1 for n in numbers})
+    else:
+        positions = range(len(claims))
+    chosen = [i for i in positions if claims[i] is not None]
+    results = await asyncio.gather(
+        *(decide_confirmation(int(batch["guild_id"]), claims[i], approved) for i in chosen),
+        return_exceptions=True,
+    )
+    decided = 0
+    for i, result in zip(chosen, results):
+        if isinstance(result, Exception):
+            print(f"❌ Error saat konfirmasi gabungan: {result}")
+            continue
+        decided += result is True
+        claims[i] = None
+    skipped = len(positions) - decided
+    remaining = sum(claim_id is not None for claim_id in claims)
+    if remaining:
+        # Gagal CAS = ada keputusan lain bersamaan; klaim yang sudah diputuskan tetap ditolak CAS "decision"
+        await shared.put("confirm_batch", str(dm_id), batch, version=record.version, expires=record.expires)
+    else:
+        await shared.delete("confirm_batch", str(dm_id))
+    return decided, skipped, remaining
 
 async def notify_dm_failure(guild, user: discord.User, message: str):
-    log_channel = discord.utils.get(guild.text_channels, name="bukti-transaksi")
-    if log_channel:
-        await log_channel.send(f"⚠️ Gagal kirim DM ke {user.mention}: {message}")
-
-async def update_user_role(member: discord.Member):
-    points_data = await load_json('points.json', dict)
-    points = points_data.get(str(member.id), 0)
-
-    # Hapus semua role tier lama
-    for _, role_name in ROLE_TIERS:
-        role = discord.utils.get(member.guild.roles, name=role_name)
-        if role and role in member.roles:
-            try:
-                await member.remove_roles(role)
-            except discord.Forbidden:
-                print(f"⚠️ Bot tidak punya izin untuk hapus role {role.name} dari {member}")
-            except Exception as e:
-                print(f"❌ Error saat hapus role {role.name}: {e}")
-
-    # Berikan role tier tertinggi yang memenuhi syarat
-    assigned = False
-    for threshold, role_name in ROLE_TIERS:
+    await audit_log.post(guild, f"⚠️ Gagal kirim DM ke {user.mention}: {message}")
+
+def tier_role_targets(member):
+    # Role yang seharusnya dimiliki member, dihitung dari ledger dan cache giver_stats guild-nya
+    state = guild_states.get(member.guild.id)
+    if state is None:
+        # State guild sudah ditutup (bot keluar): jangan ubah role
+        managed = managed_tier_roles(member.guild)
+        return {role for role in member.roles if role in managed}
+    target = set()
+
+    # Role tier tertinggi yang memenuhi syarat (hanya satu)
+    points = state.ledger.balance(member.id)
+    for threshold, role_key in state.settings["role_tiers"]:
         if points >= threshold:
-            role = discord.utils.get(member.guild.roles, name=role_name)
-            if role:
-                try:
-                    await member.add_roles(role)
-                    assigned = True
-                except discord.Forbidden:
-                    print(f"⚠️ Bot tidak punya izin untuk tambah role {role.name} ke {member}")
-                except Exception as e:
-                    print(f"❌ Error saat tambah role {role.name}: {e}")
-            break  # Hanya berikan satu role (tier tertinggi)
+            target.add(role_key)
+            break
 
     # --- Role Khusus: Dermawan (tidak termasuk tier) ---
-    giver_data = await load_json('giver_count.json', dict)
-    give_count = giver_data.get(str(member.id), 0)
-    total_given = giver_data.get(f"{member.id}_total", 0)
-    dermawan_role = discord.utils.get(member.guild.roles, name="Dermawan")
+    give_count, total_given = state.giver_stats.get(str(member.id), (0, 0))
+    if give_count >= 200 and total_given >= 2000:
+        target.add("dermawan")
+    return registry.roles(member.guild, target)
 
-    qualifies_dermawan = give_count >= 200 and total_given >= 2000
-    if qualifies_dermawan and dermawan_role and dermawan_role not in member.roles:
-        try:
-            await member.add_roles(dermawan_role)
-        except discord.Forbidden:
-            print(f"⚠️ Bot tidak punya izin untuk tambah role Dermawan ke {member}")
-        except Exception as e:
-            print(f"❌ Error saat tambah role Dermawan: {e}")
-    elif not qualifies_dermawan and dermawan_role and dermawan_role in member.roles:
-        try:
-            await member.remove_roles(dermawan_role)
-        except discord.Forbidden:
-            print(f"⚠️ Bot tidak punya izin untuk hapus role Dermawan dari {member}")
-        except Exception as e:
-            print(f"❌ Error saat hapus role Dermawan: {e}")
+def managed_tier_roles(guild):
+    return registry.roles(guild, MANAGED_ROLES)
+
+role_reconciler = RoleReconciler(tier_role_targets, managed_tier_roles, window=ROLE_SYNC_WINDOW)
+
+def update_user_role(member: discord.Member):
+    role_reconciler.request(member)
 
 async def award_point(user: discord.Member, amount: float, reason: str = "berkontribusi"):
-    points_data = await load_json('points.json', dict)
-    user_id = str(user.id)
-    current = points_data.get(user_id, 0)
-    new_balance = round(current + amount, 1)
-    points_data[user_id] = new_balance
-    await save_json('points.json', points_data)
-
-    log_channel = discord.utils.get(user.guild.text_channels, name="bukti-transaksi")
-    if log_channel:
-        await log_channel.send(f"✨ {user.mention} mendapatkan **{amount} poin** untuk {reason}! Saldo: **{new_balance}**")
-
-    await update_user_role(user)
-
-def can_give_point(giver_id):
-    now = asyncio.get_event_loop().time()
-    giver = daily_given[giver_id]
-    if giver["reset"] is None or now - giver["reset"] > 86400:
-        giver["count"] = 0
-        giver["reset"] = now
-    return giver["count"] < 3
-
-def use_give_point(giver_id):
-    daily_given[giver_id]["count"] += 1
-
-async def apply_mute(message, user):
-    muted_role = discord.utils.get(user.guild.roles, name="🔇 Muted")
-    if not muted_role:
-        muted_role = await user.guild.create_role(name="🔇 Muted", reason="Anti-spam")
-        for channel in user.guild.channels:
-            await channel.set_permissions(muted_role, send_messages=False, add_reactions=False)
+    state = await get_state(user.guild)
+    new_balance = state.ledger.credit(user.id, amount)
+
+    await audit_log.post(user.guild, f"✨ {user.mention} mendapatkan **{amount} poin** untuk {reason}! Saldo: **{new_balance}**")
+
+    update_user_role(user)
+
+async def can_give_point(guild_id, giver_id):
+    record = await shared.get("daily_given", shared_key(guild_id, giver_id))
+    return (record.value if record else 0) < 3
+
+async def use_give_point(guild_id, giver_id):
+    # Jatah direset 24 jam setelah pemberian pertama
+    await shared.update(
+        "daily_given", shared_key(guild_id, giver_id), lambda count: (count or 0) + 1, ttl=86400, refresh=False
+    )
+
+async def restrict_channels(guild, muted_role):
+    # Overwrite izin role Muted di semua channel, paralel terbatas
+    semaphore = asyncio.Semaphore(MUTE_SETUP_CONCURRENCY)
+
+    async def restrict(channel):
+        async with semaphore:
+            try:
+                await channel.set_permissions(muted_role, send_messages=False, add_reactions=False)
+            except Exception as e:
+                print(f"⚠️ Gagal atur izin Muted di #{channel}: {e}")
+
+    await asyncio.gather(*(restrict(channel) for channel in guild.channels))
+
+async def create_muted_role(guild):
+    try:
+        muted_role = await guild.create_role(name=ROLE_NAMES["muted"], reason="Anti-spam")
+    finally:
+        _muted_role_setup.pop(guild.id, None)
+    registry.role_created(muted_role)
+    # Izin channel diatur di background; mute tidak perlu menunggu
+    task = asyncio.create_task(restrict_channels(guild, muted_role))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return muted_role
+
+async def get_muted_role(guild):
+    muted_role = registry.role(guild, "muted")
+    if muted_role:
+        return muted_role
+    # Beberapa mute bersamaan cukup membuat satu role
+    task = _muted_role_setup.get(guild.id)
+    if task is None:
+        task = _muted_role_setup[guild.id] = asyncio.create_task(create_muted_role(guild))
+    return await asyncio.shield(task)
+
+async def apply_mute(state, message, user):
+    # Mute disimpan sebagai record dengan waktu berakhir; mute_timers yang
+    # mencabutnya, termasuk setelah restart. Handler tidak menunggu durasi mute.
+    mute_key = f"{user.guild.id}:{user.id}"
+    if mute_key in active_mutes:
+        return
+    muted_role = await get_muted_role(user.guild)
 
     if muted_role not in user.roles:
-        level = user_mute_level[user.id]
+        level_record = await shared.get("mute_level", shared_key(user.guild.id, user.id))
+        level = level_record.value if level_record else 0
         mute_duration = 20 * (level + 1)
+        data = {
+            "guild_id": str(user.guild.id),
+            "user_id": str(user.id),
+            "role_id": str(muted_role.id),
+            "level": level,
+            "expires": time.time() + mute_duration * 60,
+        }
+        active_mutes[mute_key] = data
+        await state.storage.put_mute(mute_key, data)
+        mute_timers.schedule(mute_key, data["expires"])
         await user.add_roles(muted_role)
         await message.channel.send(f"⚠️ {user.mention} di-mute karena spam! Durasi: {mute_duration} menit.", delete_after=5)
-        await asyncio.sleep(mute_duration * 60)
-        if muted_role in user.roles:
-            await user.remove_roles(muted_role)
-            user_mute_level[user.id] += 1
-        else:
-            user_mute_level[user.id] = 0
 
-def build_embed(request):
+async def lift_mute(mute_key):
+    data = active_mutes.pop(mute_key, None)
+    if data is None:
+        return
+    guild_id = int(data["guild_id"])
+    state = guild_states.get(guild_id)
+    if state is not None:
+        await state.storage.pop_mute(mute_key)
+    user_id = int(data["user_id"])
+    guild = bot.get_guild(guild_id)
+    member = guild.get_member(user_id) if guild else None
+    muted_role = guild.get_role(int(data["role_id"])) if guild else None
+    if member and muted_role and muted_role in member.roles:
+        await member.remove_roles(muted_role)
+        await shared.put(
+            "mute_level", shared_key(guild_id, user_id), data.get("level", 0) + 1, expires=time.time() + MUTE_LEVEL_TTL
+        )
+    else:
+        # Mute sudah dicabut manual sebelum waktunya
+        await shared.delete("mute_level", shared_key(guild_id, user_id))
+
+async def lift_mutes(mute_keys):
+    results = await asyncio.gather(*(lift_mute(mute_key) for mute_key in mute_keys), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"❌ Error saat cabut mute: {result}")
+
+mute_timers = Scheduler(lift_mutes, name="mute-expiry")
+
+def build_embed(request, prices=ENGAGEMENT_PRICES):
     comments = []
     for task in request["tasks"]:
         if task["type"] == "comment":
@@ -202,9 +847,9 @@ def build_embed(request):
     if comments:
         description += "**Komentar yang Dibutuhkan:**\n" + "\n".join(comments) + "\n\n"
 
-    description += f"[{len(liked_by)}] ❤️ Like (**0.5 poin**)\n"
-    description += f"[{len(retweeted_by)}] 🔁 Retweet (**1.5 poin**)\n"
-    description += f"[{len(followed_by)}] 👥 Follow (**2.0 poin**)\n\n"
+    description += f"[{len(liked_by)}] ❤️ Like (**{prices['like']} poin**)\n"
+    description += f"[{len(retweeted_by)}] 🔁 Retweet (**{prices['retweet']} poin**)\n"
+    description += f"[{len(followed_by)}] 👥 Follow (**{prices['follow']} poin**)\n\n"
     description += "ℹ️ **Petunjuk:** Reply ke embed ini dengan `!ambil [nomor]` untuk ambil komentar."
 
     embed = discord.Embed(
@@ -215,82 +860,79 @@ def build_embed(request):
     embed.set_footer(text=f"Total: {len([t for t in request['tasks'] if t['type'] == 'comment'])} komentar")
     return embed
 
-async def cleanup_expired_requests():
-    while True:
-        try:
-            req_data = await load_json('requests.json', dict)
-            now = datetime.utcnow().timestamp()
-            to_delete = []
-            for msg_id, request in req_data.items():
-                if now > request.get("expiry_timestamp", 0):
-                    to_delete.append(msg_id)
-                    escrow_key = f"escrow_{msg_id}"
-                    points_data = await load_json('points.json', dict)
-                    escrow = points_data.get(escrow_key, 0)
-                    if escrow > 0:
-                        requester_id = request["requester_id"]
-                        current = points_data.get(requester_id, 0)
-                        points_data[requester_id] = round(current + escrow, 1)
-                        del points_data[escrow_key]
-                        await save_json('points.json', points_data)
-                        requester = bot.get_user(int(requester_id))
-                        if requester:
-                            try:
-                                await requester.send(f"⏰ Request engagement-mu telah kadaluarsa. **{escrow} poin** dikembalikan.")
-                            except:
-                                pass
-
-            for msg_id in to_delete:
-                del req_data[msg_id]
-            if to_delete:
-                await save_json('requests.json', req_data)
+def request_message(request):
+    # Handle pesan embed tanpa fetch_message; edit cukup pakai id
+    channel = bot.get_partial_messageable(int(request["channel_id"]))
+    return channel.get_partial_message(int(request["message_id"]))
 
-        except Exception as e:
-            print(f"Error in cleanup: {e}")
-
-        await asyncio.sleep(3600)
+async def notify_expired(requester_id, escrow):
+    requester = bot.get_user(int(requester_id))
+    if requester:
+        try:
+            await requester.send(f"⏰ Request engagement-mu telah kadaluarsa. **{escrow} poin** dikembalikan.")
+        except:
+            pass
 
-async def process_payment(data, approved):
-    request_id = data["request_id"]
+async def expire_guild_requests(state, msg_ids):
+    # Semua refund escrow dan penghapusan request satu guild dalam batch
+    # di-commit sekali ke ledger guild tersebut.
+    legs = []
+    records = []
+    refunds = []
+    async with state.locks.hold(*(("request", msg_id) for msg_id in msg_ids)):
+        requests = state.requests.get_many(msg_ids)
+        for msg_id, request in requests.items():
+            escrow_key = request.get("escrow_key", f"escrow_{msg_id}")
+            escrow, escrow_legs = state.ledger.stage_release_escrow(escrow_key, request["requester_id"])
+            legs.extend(escrow_legs)
+            records.append(state.requests.stage_delete(msg_id))
+            state.render_queue.forget(msg_id)
+            if escrow > 0:
+                refunds.append((request["requester_id"], escrow))
+        if records:
+            await state.ledger.commit(legs, records)
+    return refunds
+
+async def expire_requests(keys):
+    # Dipanggil scheduler tepat saat request jatuh tempo; key = (guild_id, msg_id)
+    by_guild = {}
+    for guild_id, msg_id in keys:
+        by_guild.setdefault(guild_id, []).append(msg_id)
+    refunds = []
+    for guild_id, msg_ids in by_guild.items():
+        state = guild_states.get(guild_id)
+        if state is None:
+            continue  # dijadwalkan ulang saat state guild dibuka lagi
+        refunds.extend(await expire_guild_requests(state, msg_ids))
+    await asyncio.gather(*(notify_expired(requester_id, escrow) for requester_id, escrow in refunds))
+
+expiry_timers = Scheduler(expire_requests, name="request-expiry")
+
+async def process_payment(data, approved, dm_id=None):
+    state = guild_states.get(data["guild_id"])
+    if state is None:
+        print(f"⚠️ process_payment: state guild {data['guild_id']} tidak terbuka → {data}")
+        return
     task_type = data.get("task_type", "unknown")
     if task_type == "unknown":
         print(f"⚠️ process_payment: data tidak valid → {data}")
+        if dm_id is not None:
+            await state.ledger.commit([], [state.pending.stage_delete(dm_id)])
         return
 
     seller_id = data["seller_id"]
     requester_id = data["requester_id"]
     price = data["price"]
     user_pays = data["user_pays"]
-    is_comment = data.get("is_comment", False)
-    task_idx = data.get("task_idx")
 
-    req_data = await load_json('requests.json', dict)
-    if request_id not in req_data:
+    # Debit/kredit, status task, dan hapus pending di-commit sebagai satu unit
+    result = await state.settlements.submit(data, approved, dm_id)
+    if result.status == "missing":
         return
+    request = result.request
 
-    request = req_data[request_id]
-    points_data = await load_json('points.json', dict)
-
-    if not approved:
-        if is_comment and task_idx is not None:
-            if task_idx < len(request["tasks"]):
-                task = request["tasks"][task_idx]
-                if task["assigned_to"] == str(seller_id):
-                    task["status"] = "open"
-                    task["assigned_to"] = None
-        else:
-            pass
-
-        req_data[request_id] = request
-        await save_json('requests.json', req_data)
-
-        channel = bot.get_channel(int(request["channel_id"]))
-        if channel:
-            try:
-                msg = await channel.fetch_message(int(request["message_id"]))
-                await msg.edit(embed=build_embed(request))
-            except:
-                pass
+    if result.status == "rejected":
+        state.render_queue.mark_dirty(request_message(request))
 
         seller = bot.get_user(seller_id)
         if seller:
@@ -302,8 +944,7 @@ async def process_payment(data, approved):
                 pass
         return
 
-    requester_bal = points_data.get(requester_id, 0)
-    if requester_bal < user_pays:
+    if result.status == "insufficient":
         seller = bot.get_user(seller_id)
         if seller:
             try:
@@ -312,74 +953,135 @@ async def process_payment(data, approved):
                 pass
         return
 
-    points_data[requester_id] = round(requester_bal - user_pays, 1)
-    seller_bal = points_data.get(str(seller_id), 0)
-    points_data[str(seller_id)] = round(seller_bal + price, 1)
-    await save_json('points.json', points_data)
-
-    if is_comment and task_idx is not None:
-        if task_idx < len(request["tasks"]):
-            task = request["tasks"][task_idx]
-            if task["assigned_to"] == str(seller_id):
-                task["status"] = "confirmed"
-
-    req_data[request_id] = request
-    await save_json('requests.json', req_data)
+    state.render_queue.mark_dirty(request_message(request))
 
-    channel = bot.get_channel(int(request["channel_id"]))
-    if channel:
-        try:
-            msg = await channel.fetch_message(int(request["message_id"]))
-            await msg.edit(embed=build_embed(request))
-        except:
-            pass
+    guild = bot.get_guild(state.guild_id)
+    if guild is None:
+        return
 
-    log_channel = discord.utils.get(bot.guilds[0].text_channels, name="bukti-transaksi")
-    if log_channel:
-        subsidy = price - user_pays
-        subsidy_msg = f" (subsidi bot: {subsidy} poin)" if subsidy > 0 else ""
-        await log_channel.send(
-            f"✅ **Transaksi Berhasil!**\n"
-            f"• Pembeli: <@{requester_id}>\n"
-            f"• Penjual: <@{seller_id}>\n"
-            f"• Jenis: {task_type}\n"
-            f"• Dibayar user: {user_pays} poin{subsidy_msg}\n"
-            f"• Total diterima penjual: {price} poin"
-        )
+    subsidy = price - user_pays
+    subsidy_msg = f" (subsidi bot: {subsidy} poin)" if subsidy > 0 else ""
+    await audit_log.post(
+        guild,
+        f"✅ **Transaksi Berhasil!**\n"
+        f"• Pembeli: <@{requester_id}>\n"
+        f"• Penjual: <@{seller_id}>\n"
+        f"• Jenis: {task_type}\n"
+        f"• Dibayar user: {user_pays} poin{subsidy_msg}\n"
+        f"• Total diterima penjual: {price} poin"
+    )
 
-    seller_member = bot.guilds[0].get_member(seller_id)
+    seller_member = guild.get_member(seller_id)
     if seller_member:
-        await update_user_role(seller_member)
+        update_user_role(seller_member)
 
 # --- EVENTS ---
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def record_command_latency(ctx):
+    command_latency.observe(time.perf_counter() - ctx.started_at, command=ctx.command.qualified_name)
+
 @bot.event
 async def on_ready():
-    global pending_verifications
-    print(f"✅ Bot aktif sebagai {bot.user}")
-    pending_verifications.update(await load_pending())
-    bot.loop.create_task(cleanup_expired_requests())
+    global _started, metrics_server, exit_code
+    print(f"✅ Bot aktif sebagai {bot.user} ({bot.shard_count or 1} shard, {len(bot.guilds)} guild)")
+    if _started:
+        return  # on_ready bisa terpanggil lagi setelah reconnect
+    _started = True
+    if not adopt_legacy_data(bot.guilds):
+        exit_code = 1
+        await bot.close()
+        return
+    coordinator.start()
+    started = time.perf_counter()
+    results = await asyncio.gather(*(get_state(guild) for guild in bot.guilds), return_exceptions=True)
+    for guild, result in zip(bot.guilds, results):
+        if isinstance(result, Exception):
+            print(f"❌ Gagal membuka state guild {guild.id}: {result}")
+    print(f"⏱️ {len(guild_states)} guild siap dalam {time.perf_counter() - started:.2f} detik")
+    confirmation_timers.start()
+    confirm_digest.start()
+    decision_inbox.schedule("poll", time.time() + DECISION_POLL_INTERVAL)
+    decision_inbox.start()
+    expiry_timers.start()
+    mute_timers.start()
+    audit_log.start()
+    if METRICS_PORT:
+        try:
+            metrics_server = await keep_alive(metrics, bot_healthy, METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            print(f"⚠️ Endpoint metrik gagal dibuka: {e}")
+
+@bot.event
+async def on_guild_channel_create(channel):
+    registry.channel_created(channel)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    registry.channel_deleted(channel)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    registry.channel_updated(before, after)
+
+@bot.event
+async def on_guild_role_create(role):
+    registry.role_created(role)
+
+@bot.event
+async def on_guild_role_delete(role):
+    registry.role_deleted(role)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    registry.role_updated(before, after)
+
+@bot.event
+async def on_guild_join(guild):
+    await get_state(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    registry.forget_guild(guild)
+    # Data tetap di disk; dibuka lagi kalau bot diundang kembali
+    await close_guild_state(guild.id)
+
+@bot.event
+async def on_raw_message_delete(payload):
+    # Embed request yang dihapus tidak boleh dipakai lagi dari cache
+    state = guild_states.get(payload.guild_id) if payload.guild_id else None
+    if state is not None:
+        state.render_queue.forget(payload.message_id)
 
 @bot.event
 async def on_member_join(member):
     await award_point(member, 10, "selamat datang!")
-    await update_user_role(member)
+    update_user_role(member)
 
 @bot.event
+@timed(event_latency, event="on_message")
 async def on_message(message):
     if message.author == bot.user:
         return
+    if message.guild is None:
+        # Di DM hanya command konfirmasi gabungan yang dilayani
+        ctx = await bot.get_context(message)
+        if ctx.command is not None and ctx.command.name in DM_COMMANDS:
+            await bot.invoke(ctx)
+        return
+    state = await get_state(message.guild)
 
     if message.channel.name == "general":
         user_id = str(message.author.id)
-        now = asyncio.get_event_loop().time()
-        last_time = last_daily_reward.get(user_id, 0)
-        if now - last_time >= 86400:
-            points_data = await load_json('points.json', dict)
-            current = points_data.get(user_id, 0)
-            if current < 5:
-                points_data[user_id] = round(current + 2, 1)
-                await save_json('points.json', points_data)
-                last_daily_reward[user_id] = now
+        reward_key = shared_key(message.guild.id, user_id)
+        if state.ledger.balance(user_id) < 5 and await shared.get("daily_reward", reward_key) is None:
+            now = time.time()
+            # Hanya yang berhasil menulis penanda harian yang memberi hadiah
+            if await shared.put("daily_reward", reward_key, now, version=0, expires=now + 86400) is not None:
+                state.ledger.credit(user_id, 2)
                 try:
                     await message.author.send("🎁 Kamu mendapatkan **2 poin** dari aktivitas di #general! (Hanya berlaku jika saldo < 5)")
                 except:
@@ -403,7 +1105,7 @@ async def on_message(message):
                     pass
                 return
         elif message.channel.name == "jual-beli":
-            if message.content.startswith("!beli") or message.content.startswith("!ambil"):
+            if message.content.startswith(("!beli", "!ambil", "!konfirmasi")):
                 is_allowed = True
             else:
                 await message.delete()
@@ -417,31 +1119,29 @@ async def on_message(message):
             await message.delete()
             return
 
-    if message.channel.name in ["jual-beli", "bukti-transaksi", "general"]:
-        user_id = message.author.id
-        now = message.created_at.timestamp()
-        user_message_count[user_id] = [t for t in user_message_count[user_id] if now - t < 60]
-        user_message_count[user_id].append(now)
-        if len(user_message_count[user_id]) > 7:
-            await apply_mute(message, message.author)
+    limiter = spam_limiters.get(message.channel.name)
+    if limiter is not None:
+        if limiter.hit((message.guild.id, message.author.id), message.created_at.timestamp()):
+            await apply_mute(state, message, message.author)
             return
 
     await bot.process_commands(message)
 
 @bot.event
+@timed(event_latency, event="on_reaction_add")
 async def on_reaction_add(reaction, user):
     if user == bot.user:
         return
 
     if isinstance(reaction.message.channel, discord.DMChannel):
         msg_id = str(reaction.message.id)
-        pending_data = await load_pending()
-        if msg_id in pending_data:
-            data = pending_data.pop(msg_id)
-            await save_pending(pending_data)
+        # DM masuk ke shard 0; guild pemiliknya bisa dipegang proses lain
+        route = await shared.get("pending", msg_id)
+        if route is not None:
             emoji = str(reaction.emoji)
             approved = (emoji == "✅")
-            await process_payment(data, approved=approved)
+            if not await decide_confirmation(int(route.value), msg_id, approved):
+                return
 
             try:
                 if reaction.message.author == bot.user:
@@ -450,6 +1150,21 @@ async def on_reaction_add(reaction, user):
                 pass
             except Exception as e:
                 print(f"⚠️ Gagal hapus DM: {e}")
+            return
+
+        # DM gabungan: ✅ setujui semua, ❌ tolak semua; emoji lain diabaikan
+        emoji = str(reaction.emoji)
+        if emoji not in ("✅", "❌"):
+            return
+        result = await decide_digest(msg_id, emoji == "✅")
+        if result is None:
+            return
+        try:
+            await reaction.message.delete()
+        except discord.NotFound:
+            pass
+        except Exception as e:
+            print(f"⚠️ Gagal hapus DM gabungan: {e}")
         return
 
     if reaction.message.author != bot.user or reaction.message.channel.name != "jual-beli":
@@ -465,12 +1180,13 @@ async def on_reaction_add(reaction, user):
             pass
         return
 
-    req_data = await load_json('requests.json', dict)
+    guild = reaction.message.guild
+    state = await get_state(guild)
     msg_id = str(reaction.message.id)
-    if msg_id not in req_data:
+    request = state.requests.get(msg_id)
+    if request is None:
         return
 
-    request = req_data[msg_id]
     requester_id = request["requester_id"]
     if str(user.id) == requester_id:
         await reaction.message.remove_reaction(emoji_str, user)
@@ -481,9 +1197,8 @@ async def on_reaction_add(reaction, user):
         return
 
     # 🔒 CEK MUTUAL FOLLOW WAJIB
-    global_follows = await load_json('global_follows.json', dict)
-    follow_key = f"{user.id}_{requester_id}"
-    if follow_key not in global_follows:
+    is_following = state.follow_graph.is_following(user.id, requester_id)
+    if not is_following:
         await reaction.message.remove_reaction(emoji_str, user)
         try:
             await user.send(f"🔒 Kamu harus follow <@{requester_id}> dan selesaikan verifikasi terlebih dahulu sebelum membantu engagement-nya.")
@@ -496,7 +1211,7 @@ async def on_reaction_add(reaction, user):
 
     # 🔒 CEK ANTI-SPAM PERMANEN (SEKALI SEUMUR HIDUP)
     if task_type in ("like", "retweet"):
-        if await has_engaged(user.id, request['link'], task_type):
+        if has_engaged(state, user.id, request['link'], task_type):
             await reaction.message.remove_reaction(emoji_str, user)
             try:
                 await user.send(f"❌ Kamu sudah pernah {task_type} postingan ini sebelumnya.")
@@ -504,60 +1219,45 @@ async def on_reaction_add(reaction, user):
                 pass
             return
     elif task_type == "follow":
-        if follow_key in global_follows:
+        if is_following:
             await reaction.message.remove_reaction(emoji_str, user)
             try:
                 await user.send("❌ Kamu sudah pernah follow akun ini sebelumnya (sekali seumur hidup).")
             except:
                 pass
             return
-        global_follows[follow_key] = True
-        await save_json('global_follows.json', global_follows)
+        if state.follow_graph.add(user.id, requester_id):
+            await state.storage.add_follow(user.id, requester_id)
 
     # Simpan ke log hanya untuk like/retweet (per link)
-    if task_type in ("like", "retweet"):
-        await mark_engaged(user.id, request['link'], task_type)
-
-    user_id_str = str(user.id)
-    if task_type == "like":
-        if user_id_str not in request.get("liked_by", []):
-            request.setdefault("liked_by", []).append(user_id_str)
-    elif task_type == "retweet":
-        if user_id_str not in request.get("retweeted_by", []):
-            request.setdefault("retweeted_by", []).append(user_id_str)
-    elif task_type == "follow":
-        if user_id_str not in request.get("followed_by", []):
-            request.setdefault("followed_by", []).append(user_id_str)
-
-    req_data[msg_id] = request
-    await save_json('requests.json', req_data)
-    await reaction.message.edit(embed=build_embed(request))
+    engaged = mark_engaged(state, user.id, request['link'], task_type) if task_type in ("like", "retweet") else None
+
+    async with state.locks.hold(("request", msg_id)):
+        # Cek ulang di bawah lock: request bisa kadaluarsa saat menunggu.
+        # Yang ditulis hanya satu operasi "tambah reactor" (+ tanda engagement)
+        # dalam satu baris journal, bukan seluruh request.
+        if msg_id not in state.requests:
+            if engaged is not None:
+                await state.ledger.commit([], [engaged])
+            return
+        record = state.requests.stage_add_reactor(msg_id, REACTOR_FIELDS[task_type], user.id)
+        if record is not None or engaged is not None:
+            await state.ledger.commit([], [record, engaged])
+    state.render_queue.mark_dirty(reaction.message)
 
     requester = bot.get_user(int(requester_id))
     if not requester:
         return
 
-    price = ENGAGEMENT_PRICES[task_type]
-    requester_member = bot.guilds[0].get_member(int(requester_id))
-    dermawan_role = discord.utils.get(bot.guilds[0].roles, name="Dermawan")
+    price = state.settings["prices"][task_type]
+    requester_member = guild.get_member(int(requester_id))
+    dermawan_role = registry.role(guild, "dermawan")
     is_dermawan = requester_member and dermawan_role and dermawan_role in requester_member.roles
     user_pays = round(price * 0.5, 1) if is_dermawan else price
 
-    try:
-        confirm_msg = await requester.send(
-            f"💬 <@{user.id}> mengklaim sudah menyelesaikan: **{task_type.capitalize()}**\n"
-            f"Link: {request['link']}\n"
-            f"Harga: **{price} poin**\n"
-            f"{'(subsidi sistem: ' + str(price - user_pays) + ' poin)' if (price - user_pays) > 0 else ''}\n\n"
-            f"✅ **React ini jika TUGAS BENAR**\n"
-            f"❌ **React ini jika TUGAS SALAH/TIDAK DILAKUKAN**\n"
-            f"⏳ Jika tidak ada reaksi dalam **15 menit**, transaksi **dianggap sah**.\n\n"
-            f"(request_id={msg_id},task_type={task_type},seller_id={user.id})"
-        )
-        await confirm_msg.add_reaction("✅")
-        await confirm_msg.add_reaction("❌")
-        pending_data = await load_pending()
-        pending_data[str(confirm_msg.id)] = {
+    await request_confirmation(
+        state, guild, requester,
+        {
             "request_id": msg_id,
             "task_type": task_type,
             "seller_id": user.id,
@@ -565,29 +1265,17 @@ async def on_reaction_add(reaction, user):
             "price": price,
             "user_pays": user_pays,
             "is_comment": False
-        }
-        await save_pending(pending_data)
-
-        async def timeout_handler():
-            await asyncio.sleep(900)
-            pending_data = await load_pending()
-            key = str(confirm_msg.id)
-            if key in pending_data:
-                data = pending_data.pop(key)
-                await save_pending(pending_data)
-                await process_payment(data, approved=True)
-                try:
-                    if confirm_msg.author == bot.user:
-                        await confirm_msg.delete()
-                except discord.NotFound:
-                    pass
-                except Exception as e:
-                    print(f"⚠️ Gagal hapus DM setelah timeout: {e}")
-
-        bot.loop.create_task(timeout_handler())
-
-    except discord.Forbidden:
-        await notify_dm_failure(bot.guilds[0], requester, f"Gagal kirim konfirmasi {task_type} oleh <@{user.id}>.")
+        },
+        f"💬 <@{user.id}> mengklaim sudah menyelesaikan: **{task_type.capitalize()}**\n"
+        f"Link: {request['link']}\n"
+        f"Harga: **{price} poin**\n"
+        f"{'(subsidi sistem: ' + str(price - user_pays) + ' poin)' if (price - user_pays) > 0 else ''}\n\n"
+        f"✅ **React ini jika TUGAS BENAR**\n"
+        f"❌ **React ini jika TUGAS SALAH/TIDAK DILAKUKAN**\n"
+        f"⏳ Jika tidak ada reaksi dalam **15 menit**, transaksi **dianggap sah**.\n\n"
+        f"(request_id={msg_id},task_type={task_type},seller_id={user.id})",
+        f"Gagal kirim konfirmasi {task_type} oleh <@{user.id}>.",
+    )
 
 @bot.event
 async def on_reaction_remove(reaction, user):
@@ -620,23 +1308,21 @@ async def buy_engagement(ctx, days: int, link: str, *, comments_raw: str = ""):
         await ctx.message.delete()
         return
 
-    tasks = [{"type": "comment", "text": text, "price": ENGAGEMENT_PRICES["comment"], "assigned_to": None, "status": "open"} for text in comment_lines]
-    total_price = len(tasks)
-    points_data = await load_json('points.json', dict)
+    state = await get_state(ctx.guild)
+    price = state.settings["prices"]["comment"]
+    tasks = [{"type": "comment", "text": text, "price": price, "assigned_to": None, "status": "open"} for text in comment_lines]
+    total_price = round(price * len(tasks), 1)
     user_id_str = str(ctx.author.id)
-    current_points = points_data.get(user_id_str, 0)
+    current_points = state.ledger.balance(user_id_str)
     if current_points < total_price:
         await ctx.send(f"❌ Kamu butuh **{total_price} poin**. Saldo: **{current_points}**.", delete_after=5)
         await ctx.message.delete()
         return
 
-    points_data[user_id_str] = round(current_points - total_price, 1)
     escrow_key = f"escrow_{ctx.message.id}"
-    points_data[escrow_key] = total_price
-    await save_json('points.json', points_data)
+    state.ledger.hold_escrow(user_id_str, escrow_key, total_price)
 
-    expiry = datetime.utcnow() + timedelta(days=days)
-    expiry_ts = int(expiry.timestamp())
+    expiry_ts = int(time.time() + timedelta(days=days).total_seconds())
     new_request = {
         "requester_id": user_id_str,
         "link": link,
@@ -645,16 +1331,17 @@ async def buy_engagement(ctx, days: int, link: str, *, comments_raw: str = ""):
         "liked_by": [],
         "retweeted_by": [],
         "followed_by": [],
-        "expiry_timestamp": expiry_ts
+        "expiry_timestamp": expiry_ts,
+        "escrow_key": escrow_key
     }
 
-    embed = build_embed(new_request)
+    embed = build_embed(new_request, state.settings["prices"])
     msg = await ctx.send(embed=embed)
     new_request["message_id"] = str(msg.id)
 
-    req_data = await load_json('requests.json', dict)
-    req_data[str(msg.id)] = new_request
-    await save_json('requests.json', req_data)
+    await state.ledger.commit([], [state.requests.stage_put(msg.id, new_request)])
+    expiry_timers.schedule((state.guild_id, str(msg.id)), expiry_ts)
+    state.render_queue.track(msg)
 
     for emoji in ["❤️", "🔁", "👥"]:
         await msg.add_reaction(emoji)
@@ -673,26 +1360,29 @@ async def take_task(ctx, task_number: int):
         await ctx.message.delete()
         return
 
-    try:
-        referenced_msg = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-    except discord.NotFound:
-        await ctx.send("❌ Pesan yang direply tidak ditemukan.", delete_after=5)
-        await ctx.message.delete()
-        return
-
-    if referenced_msg.author != bot.user or not referenced_msg.embeds:
-        await ctx.send("❌ Reply harus ke embed request dari bot.", delete_after=5)
+    # Validasi lewat index request lokal: hanya embed bot yang punya request.
+    # Handle pesan diambil dari reference.resolved / cache; fetch hanya saat miss.
+    state = await get_state(ctx.guild)
+    reference = ctx.message.reference
+    msg_id = str(reference.message_id)
+    request = state.requests.get(msg_id)
+    if request is None:
+        resolved = reference.resolved
+        if isinstance(resolved, discord.Message) and (resolved.author != bot.user or not resolved.embeds):
+            error = "❌ Reply harus ke embed request dari bot."
+        else:
+            error = "❌ Request tidak ditemukan atau sudah kadaluarsa."
+        await ctx.send(error, delete_after=5)
         await ctx.message.delete()
         return
 
-    req_data = await load_json('requests.json', dict)
-    msg_id = str(referenced_msg.id)
-    if msg_id not in req_data:
-        await ctx.send("❌ Request tidak ditemukan atau sudah kadaluarsa.", delete_after=5)
+    try:
+        referenced_msg = await state.messages.resolve(ctx.channel, reference)
+    except discord.NotFound:
+        await ctx.send("❌ Pesan yang direply tidak ditemukan.", delete_after=5)
         await ctx.message.delete()
         return
 
-    request = req_data[msg_id]
     requester_id = request["requester_id"]
     if str(ctx.author.id) == requester_id:
         await ctx.send("❌ Kamu tidak bisa mengambil request milikmu sendiri.", delete_after=5)
@@ -700,9 +1390,7 @@ async def take_task(ctx, task_number: int):
         return
 
     # 🔒 CEK MUTUAL FOLLOW WAJIB
-    global_follows = await load_json('global_follows.json', dict)
-    follow_key = f"{ctx.author.id}_{requester_id}"
-    if follow_key not in global_follows:
+    if not state.follow_graph.is_following(ctx.author.id, requester_id):
         await ctx.send(
             f"🔒 Kamu harus follow <@{requester_id}> dan selesaikan verifikasi terlebih dahulu sebelum mengambil komentar.",
             delete_after=10
@@ -710,56 +1398,52 @@ async def take_task(ctx, task_number: int):
         await ctx.message.delete()
         return
 
-    if await has_engaged(ctx.author.id, request['link'], "comment"):
-        await ctx.send("❌ Kamu sudah pernah ambil komentar untuk postingan ini.", delete_after=5)
-        await ctx.message.delete()
-        return
-
-    open_comments = [(idx, task) for idx, task in enumerate(request["tasks"]) if task["type"] == "comment" and task["status"] == "open"]
-    if not open_comments:
-        await ctx.send("❌ Tidak ada komentar tersedia.", delete_after=5)
-        await ctx.message.delete()
-        return
+    # Klaim di bawah lock request: dua !ambil bersamaan tidak bisa mendapat task yang sama
+    error = None
+    async with state.locks.hold(("request", msg_id)):
+        request = state.requests.get(msg_id)
+        open_comments = []
+        if request is None:
+            error = "❌ Request tidak ditemukan atau sudah kadaluarsa."
+        elif has_engaged(state, ctx.author.id, request['link'], "comment"):
+            error = "❌ Kamu sudah pernah ambil komentar untuk postingan ini."
+        else:
+            open_comments = state.requests.open_comments(msg_id)
+            if not open_comments:
+                error = "❌ Tidak ada komentar tersedia."
+            elif not (1 <= task_number <= len(open_comments)):
+                error = f"❌ Nomor tugas harus 1–{len(open_comments)}."
+
+        if error is None:
+            # Hanya field task yang diklaim (dan tanda engagement-nya) yang masuk journal
+            task_idx = open_comments[task_number - 1]
+            task = request["tasks"][task_idx]
+            await state.ledger.commit([], [
+                state.requests.stage_task(msg_id, task_idx, assigned_to=str(ctx.author.id), status="claimed"),
+                mark_engaged(state, ctx.author.id, request['link'], "comment"),
+            ])
 
-    if not (1 <= task_number <= len(open_comments)):
-        await ctx.send(f"❌ Nomor tugas harus 1–{len(open_comments)}.", delete_after=5)
+    if error is not None:
+        await ctx.send(error, delete_after=5)
         await ctx.message.delete()
         return
 
-    task_idx, task = open_comments[task_number - 1]
-    task["assigned_to"] = str(ctx.author.id)
-    task["status"] = "claimed"
-    req_data[msg_id] = request
-    await save_json('requests.json', req_data)
-    await referenced_msg.edit(embed=build_embed(request))
+    state.render_queue.mark_dirty(referenced_msg)
     await ctx.message.delete()
 
-    await mark_engaged(ctx.author.id, request['link'], "comment")
-
     requester = bot.get_user(int(requester_id))
     if not requester:
         return
 
     price = task["price"]
-    requester_member = bot.guilds[0].get_member(int(requester_id))
-    dermawan_role = discord.utils.get(bot.guilds[0].roles, name="Dermawan")
+    requester_member = ctx.guild.get_member(int(requester_id))
+    dermawan_role = registry.role(ctx.guild, "dermawan")
     is_dermawan = requester_member and dermawan_role and dermawan_role in requester_member.roles
     user_pays = round(price * 0.5, 1) if is_dermawan else price
 
-    try:
-        confirm_msg = await requester.send(
-            f"💬 <@{ctx.author.id}> telah mengambil dan mengklaim menyelesaikan komentar: _‘{task['text']}’_\n"
-            f"Link: {request['link']}\n"
-            f"Harga: **{price} poin**\n"
-            f"{'(subsidi sistem: ' + str(price - user_pays) + ' poin)' if (price - user_pays) > 0 else ''}\n\n"
-            f"✅ **React ini jika TUGAS BENAR**\n"
-            f"❌ **React ini jika TUGAS SALAH/TIDAK DILAKUKAN**\n"
-            f"⏳ Jika tidak ada reaksi dalam **15 menit**, transaksi **dianggap sah**."
-        )
-        await confirm_msg.add_reaction("✅")
-        await confirm_msg.add_reaction("❌")
-        pending_data = await load_pending()
-        pending_data[str(confirm_msg.id)] = {
+    await request_confirmation(
+        state, ctx.guild, requester,
+        {
             "request_id": msg_id,
             "task_idx": task_idx,
             "seller_id": ctx.author.id,
@@ -768,36 +1452,131 @@ async def take_task(ctx, task_number: int):
             "user_pays": user_pays,
             "is_comment": True,
             "task_type": "comment"
-        }
-        await save_pending(pending_data)
-
-        async def timeout_handler():
-            await asyncio.sleep(900)
-            pending_data = await load_pending()
-            key = str(confirm_msg.id)
-            if key in pending_data:
-                data = pending_data.pop(key)
-                await save_pending(pending_data)
-                await process_payment(data, approved=True)
-                try:
-                    if confirm_msg.author == bot.user:
-                        await confirm_msg.delete()
-                except discord.NotFound:
-                    pass
-                except Exception as e:
-                    print(f"⚠️ Gagal hapus DM setelah timeout: {e}")
+        },
+        f"💬 <@{ctx.author.id}> telah mengambil dan mengklaim menyelesaikan komentar: _‘{task['text']}’_\n"
+        f"Link: {request['link']}\n"
+        f"Harga: **{price} poin**\n"
+        f"{'(subsidi sistem: ' + str(price - user_pays) + ' poin)' if (price - user_pays) > 0 else ''}\n\n"
+        f"✅ **React ini jika TUGAS BENAR**\n"
+        f"❌ **React ini jika TUGAS SALAH/TIDAK DILAKUKAN**\n"
+        f"⏳ Jika tidak ada reaksi dalam **15 menit**, transaksi **dianggap sah**.",
+        f"Gagal kirim konfirmasi komentar oleh <@{ctx.author.id}>.",
+    )
 
-        bot.loop.create_task(timeout_handler())
+@bot.command(name="konfirmasi")
+async def confirmation_mode(ctx, mode: str = None):
+    # !konfirmasi [satuan|gabung] — cara menerima konfirmasi klaim di request milikmu
+    state = await get_state(ctx.guild)
+    current = confirm_mode(state, ctx.author.id)
+    if mode is None:
+        await ctx.send(
+            f"📬 Mode konfirmasimu: **{current}**. Ganti dengan `!konfirmasi satuan` (satu DM per klaim) "
+            f"atau `!konfirmasi gabung` (klaim dalam {int(CONFIRM_BATCH_WINDOW)} detik digabung ke satu DM).",
+            delete_after=15,
+        )
+        await ctx.message.delete()
+        return
+    mode = mode.lower()
+    if mode not in CONFIRM_MODES:
+        await ctx.send("❌ Mode harus `satuan` atau `gabung`.", delete_after=5)
+        await ctx.message.delete()
+        return
 
-    except discord.Forbidden:
-        await notify_dm_failure(ctx.guild, requester, f"Gagal kirim konfirmasi komentar oleh <@{ctx.author.id}>.")
+    user_id = str(ctx.author.id)
+    preferences = dict(state.preferences.get(user_id, {}), confirm_mode=mode)
+    state.preferences[user_id] = preferences
+    await state.storage.put_preferences(user_id, preferences)
+    # Klaim yang sudah menunggu tetap memakai DM yang sudah/akan dikirim
+    await ctx.send(f"✅ Mode konfirmasi {ctx.author.mention} sekarang **{mode}**.", delete_after=10)
+    await ctx.message.delete()
+
+async def decide_digest_command(ctx, numbers, approved):
+    reference = ctx.message.reference
+    if reference is None or reference.message_id is None:
+        await ctx.send("❌ Reply ke DM konfirmasi gabungan, mis. `!tolak 2 5` atau `!setuju` untuk semua.")
+        return
+    try:
+        result = await decide_digest(reference.message_id, approved, numbers)
+    except ValueError as e:
+        await ctx.send(f"❌ {e}")
+        return
+    if result is None:
+        await ctx.send("❌ Konfirmasi ini sudah selesai atau kedaluwarsa.")
+        return
+
+    decided, skipped, remaining = result
+    lines = [f"✅ {decided} klaim disetujui." if approved else f"❌ {decided} klaim ditolak."]
+    if skipped:
+        lines.append(f"ℹ️ {skipped} klaim sudah diputuskan sebelumnya (atau otomatis sah).")
+    if remaining:
+        lines.append(f"⏳ {remaining} klaim lain masih menunggu.")
+    else:
+        try:
+            await ctx.channel.get_partial_message(reference.message_id).delete()
+        except discord.NotFound:
+            pass
+        except Exception as e:
+            print(f"⚠️ Gagal hapus DM gabungan: {e}")
+    await ctx.send("\n".join(lines))
+
+@bot.command(name="setuju")
+@commands.dm_only()
+async def approve_claims(ctx, *numbers: int):
+    # Reply DM gabungan: !setuju = semua, !setuju 1 3 = nomor tertentu
+    await decide_digest_command(ctx, numbers, True)
+
+@bot.command(name="tolak")
+@commands.dm_only()
+async def reject_claims(ctx, *numbers: int):
+    # Reply DM gabungan: !tolak = semua, !tolak 2 5 = nomor tertentu
+    await decide_digest_command(ctx, numbers, False)
 
 @bot.command(name="saldo")
 async def check_balance(ctx):
-    pts = (await load_json('points.json', dict)).get(str(ctx.author.id), 0)
+    state = await get_state(ctx.guild)
+    pts = state.ledger.balance(ctx.author.id)
     await ctx.send(f"💰 **{ctx.author.display_name}** memiliki **{pts} poin**.")
     await ctx.message.delete()
 
+@bot.command(name="top")
+async def leaderboard_top(ctx, count: int = LEADERBOARD_PAGE_SIZE, page: int = 1):
+    # Dibaca dari index peringkat guild, tanpa memuat atau mengurutkan ledger
+    count = max(1, min(count, LEADERBOARD_MAX_PAGE_SIZE))
+    page = max(1, page)
+    state = await get_state(ctx.guild)
+    board = state.leaderboard
+    await board.wait_ready()
+    offset = (page - 1) * count
+    rows = board.top(count, offset=offset)
+    if not rows:
+        await ctx.send("📭 Belum ada user di peringkat ini.", delete_after=10)
+        return
+    lines = [
+        f"**{offset + i}.** <@{user_id}> — {balance} poin"
+        for i, (user_id, balance) in enumerate(rows, start=1)
+    ]
+    tiers = " · ".join(
+        f"{ROLE_NAMES[role_key]}: {board.tier_counts[role_key]}" for _, role_key in state.settings["role_tiers"]
+    )
+    embed = discord.Embed(title="🏆 Peringkat Poin", description="\n".join(lines), color=0xf1c40f)
+    embed.set_footer(text=f"{len(board)} user · {tiers}")
+    await ctx.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
+@bot.command(name="rank")
+async def leaderboard_rank(ctx, member: typing.Optional[discord.Member] = None):
+    member = member or ctx.author
+    state = await get_state(ctx.guild)
+    board = state.leaderboard
+    await board.wait_ready()
+    result = board.rank(member.id)
+    if result is None:
+        await ctx.send(f"📭 **{member.display_name}** belum punya poin.", delete_after=10)
+        return
+    position, balance = result
+    tier = board.tier(balance)
+    tier_text = f" · {ROLE_NAMES[tier]}" if tier else ""
+    await ctx.send(f"🏅 **{member.display_name}** peringkat **#{position}** dari {len(board)} user dengan **{balance} poin**{tier_text}.")
+
 @bot.command(name="givepoint")
 async def give_point(ctx, member: discord.Member, amount: int = 1):
     if ctx.channel.name != "bukti-transaksi":
@@ -813,34 +1592,30 @@ async def give_point(ctx, member: discord.Member, amount: int = 1):
         await ctx.message.delete()
         return
 
+    state = await get_state(ctx.guild)
     giver_id = str(ctx.author.id)
-    if not can_give_point(giver_id):
-        await ctx.send("❌ Maksimal 3 poin/hari.", delete_after=5)
-        await ctx.message.delete()
-        return
-
     tax = 1 if amount < 10 else max(1, round(amount * 0.2, 1))
     total_cost = amount + tax
-    points_data = await load_json('points.json', dict)
-    giver_bal = points_data.get(giver_id, 0)
-    if giver_bal < total_cost:
-        await ctx.send(f"❌ Saldo tidak cukup. Butuh **{total_cost} poin** (termasuk pajak {tax} poin).", delete_after=5)
+    error = None
+    # Cek jatah + saldo dan transfer sebagai satu unit per pasangan user
+    async with state.locks.hold(("user", giver_id), ("user", member.id)):
+        if not await can_give_point(ctx.guild.id, giver_id):
+            error = "❌ Maksimal 3 poin/hari."
+        elif state.ledger.balance(giver_id) < total_cost:
+            error = f"❌ Saldo tidak cukup. Butuh **{total_cost} poin** (termasuk pajak {tax} poin)."
+        else:
+            # Transfer dan statistik pemberi = satu baris journal
+            legs = state.ledger.stage_transfer(giver_id, member.id, amount, tax=tax)
+            await state.ledger.commit(legs, [state.giver_stats.stage_add(giver_id, amount)])
+            await use_give_point(ctx.guild.id, giver_id)
+
+    if error is not None:
+        await ctx.send(error, delete_after=5)
         await ctx.message.delete()
         return
 
-    points_data[giver_id] = round(giver_bal - total_cost, 1)
-    receiver_id = str(member.id)
-    points_data[receiver_id] = points_data.get(receiver_id, 0) + amount
-    await save_json('points.json', points_data)
-
-    giver_count = await load_json('giver_count.json', dict)
-    giver_count[giver_id] = giver_count.get(giver_id, 0) + 1
-    giver_count[f"{giver_id}_total"] = giver_count.get(f"{giver_id}_total", 0) + amount
-    await save_json('giver_count.json', giver_count)
-
-    use_give_point(giver_id)
-    await update_user_role(member)
-    await update_user_role(ctx.author)
+    update_user_role(member)
+    update_user_role(ctx.author)
     await ctx.send(f"✨ {ctx.author.mention} memberi **{amount} poin** ke {member.mention}! (Pajak: {tax} poin)")
     await ctx.message.delete()
 
@@ -850,19 +1625,83 @@ async def addpoint(ctx, member: discord.Member, amount: float):
     if not (-20 <= amount <= 20):
         await ctx.send("❌ Jumlah harus antara -20 hingga 20.")
         return
-    data = await load_json('points.json', dict)
-    user_id = str(member.id)
-    old_balance = data.get(user_id, 0)
-    new_balance = round(old_balance + amount, 1)
-    data[user_id] = new_balance
-    await save_json('points.json', data)
+    state = await get_state(ctx.guild)
+    new_balance = state.ledger.credit(member.id, amount)
     action = "ditambahkan" if amount > 0 else "dikurangi"
     await ctx.send(f"✅ Poin {member.mention} {action} sebesar {abs(amount)}. Saldo baru: **{new_balance}**")
 
+async def convert_bulk_target(ctx, text):
+    # Mention / id / nama -> Member atau Role, None kalau tidak dikenal
+    for converter in (commands.MemberConverter(), commands.RoleConverter()):
+        try:
+            return await converter.convert(ctx, text)
+        except commands.BadArgument:
+            continue
+    return None
+
+@bot.command(name="bulkpoint")
+@commands.has_role("🛡️ Peacekeeper")
+async def bulk_point(ctx, amount: typing.Optional[float] = None, *targets: str):
+    # !bulkpoint <jumlah> @user @user ...   |   !bulkpoint <jumlah> @Role
+    # !bulkpoint [jumlah default] + lampiran CSV "user,jumlah"
+    # Semua baris divalidasi dulu; kalau ada yang salah tidak ada yang diterapkan.
+    # Target dikonversi di sini, bukan lewat anotasi, supaya target yang
+    # salah ikut dilaporkan bersama error lain.
+    started = time.perf_counter()
+    batch = BulkAdjustment(BULK_POINT_LIMIT, BULK_POINT_MAX_TARGETS)
+    for text in targets:
+        target = await convert_bulk_target(ctx, text)
+        if target is None:
+            batch.errors.append(f"`{text}`: bukan member atau role server ini")
+        elif isinstance(target, discord.Role):
+            for member in target.members:
+                batch.add(member, amount, f"@{target.name}")
+        else:
+            batch.add(target, amount, str(target))
+
+    for attachment in ctx.message.attachments:
+        if not attachment.filename.lower().endswith(".csv"):
+            batch.errors.append(f"{attachment.filename}: bukan file CSV")
+            continue
+        rows, errors = parse_csv((await attachment.read()).decode("utf-8-sig", errors="replace"))
+        batch.errors.extend(f"{attachment.filename} {error}" for error in errors)
+        for line_no, user_id, row_amount in rows:
+            member = ctx.guild.get_member(user_id)
+            batch.add(member, row_amount if row_amount is not None else amount, f"{attachment.filename} baris {line_no}")
+
+    if not batch.validate():
+        shown = "\n".join(f"• {error}" for error in batch.errors[:10])
+        more = f"\n…dan {len(batch.errors) - 10} error lain" if len(batch.errors) > 10 else ""
+        await ctx.send(f"❌ Bulk poin dibatalkan, tidak ada poin yang diubah:\n{shown}{more}")
+        return
+
+    # Semua penyesuaian = satu baris journal, satu fsync
+    state = await get_state(ctx.guild)
+    async with state.locks.hold(*(("user", user_id) for user_id in batch.amounts)):
+        legs = []
+        for user_id, delta in batch.amounts.items():
+            legs.extend(state.ledger.stage_adjust(user_id, delta))
+        await state.ledger.commit(legs)
+
+    edited, unchanged, failed = await role_reconciler.reconcile_many(
+        list(batch.members.values()), concurrency=BULK_ROLE_CONCURRENCY
+    )
+
+    report = (
+        f"📋 **Bulk poin selesai** oleh {ctx.author.mention}\n"
+        f"• Member: **{len(batch.amounts)}** (ditambah {batch.credited} poin, dikurangi {batch.debited} poin)\n"
+        f"• Dilewati: {batch.bots} bot, {batch.duplicates} duplikat\n"
+        f"• Role: {edited} diperbarui, {unchanged} tetap, {failed} gagal\n"
+        f"• Waktu: {time.perf_counter() - started:.1f} detik"
+    )
+    await ctx.send(report)
+    await audit_log.post(ctx.guild, report)
+
 # --- Run ---
 if __name__ == "__main__":
     token = os.getenv("DISCORD_TOKEN")
     if token:
         bot.run(token)
+        sys.exit(exit_code)
     else:
         print("❌ ERROR: DISCORD_TOKEN tidak ditemukan!")
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+
+
+class MessageCache:
+    # Handle pesan embed request yang masih hidup, dibatasi `capacity` (LRU).
+    # Diisi saat request dibuat dan dari `reference.resolved` gateway, jadi
+    # !ambil dan render embed jarang perlu fetch_message. Pesan yang dihapus
+    # dibuang lewat forget().
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._messages = OrderedDict()  # msg_id -> Message / PartialMessage
+        self.hits = 0
+        self.resolved = 0  # diambil dari reference.resolved
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._messages)
+
+    def put(self, message):
+        msg_id = str(message.id)
+        self._messages.pop(msg_id, None)
+        while len(self._messages) >= self.capacity:
+            self._messages.popitem(last=False)
+        self._messages[msg_id] = message
+
+    def add(self, message):
+        # Simpan kalau belum ada; handle lengkap tidak ditimpa PartialMessage
+        if str(message.id) in self._messages:
+            self._messages.move_to_end(str(message.id))
+        else:
+            self.put(message)
+
+    def peek(self, msg_id):
+        # Tanpa menghitung hit/miss (dipakai render queue)
+        return self._messages.get(str(msg_id))
+
+    def forget(self, msg_id):
+        self._messages.pop(str(msg_id), None)
+
+    async def resolve(self, channel, reference):
+        # Handle pesan yang direply: reference.resolved, lalu cache, baru
+        # fetch_message kalau benar-benar miss. NotFound diteruskan.
+        msg_id = str(reference.message_id)
+        resolved = getattr(reference, "resolved", None)
+        if resolved is not None and hasattr(resolved, "embeds"):
+            self.resolved += 1
+            self.put(resolved)
+            return resolved
+        message = self._messages.get(msg_id)
+        if message is not None:
+            self.hits += 1
+            self._messages.move_to_end(msg_id)
+            return message
+        self.misses += 1
+        message = await channel.fetch_message(int(msg_id))
+        self.put(message)
+        return message
+
+    def stats(self):
+        return {"hit": self.hits, "resolved": self.resolved, "miss": self.misses}
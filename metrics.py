@@ -0,0 +1,157 @@
+import bisect
+import logging
+import math
+import time
+from functools import wraps
+
+# Batas bucket histogram latensi handler (detik)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in self._values.items():
+            yield f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label -> [hitungan per bucket..., +Inf], sum
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        names = self.labels + ("le",)
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {cumulative}"
+
+
+class CallbackMetric:
+    # Nilai dibaca saat scrape: fn() -> {tuple label: nilai} atau angka
+    def __init__(self, name, help, kind, fn, labels=()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+        self.labels = tuple(labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            if not isinstance(key, tuple):
+                key = (key,)
+            yield f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+
+
+class MetricsRegistry:
+    # Registry metrik format teks Prometheus, tanpa dependensi tambahan.
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_fn(self, name, help, fn, labels=()):
+        metric = CallbackMetric(name, help, "gauge", fn, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def counter_fn(self, name, help, fn, labels=()):
+        metric = CallbackMetric(name, help, "counter", fn, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# ERROR {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+def timed(histogram, **labels):
+    # Dekorator coroutine: catat durasi ke histogram, termasuk saat error
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+class RateLimitCounter(logging.Handler):
+    # discord.py menangani HTTP 429 sendiri dan hanya menulis log peringatan;
+    # handler ini menghitung log tersebut per jenis (route / global).
+
+    def __init__(self, counter):
+        super().__init__(level=logging.WARNING)
+        self.counter = counter
+
+    def emit(self, record):
+        message = record.getMessage()
+        if "Global rate limit" in message:
+            self.counter.inc(scope="global")
+        elif "429" in message:
+            self.counter.inc(scope="route")
@@ -0,0 +1,69 @@
+from storage import PENDING_FILE
+
+
+class PendingStore:
+    # Konfirmasi yang menunggu keputusan requester di satu guild
+    # (dm_message_id / id klaim gabungan -> data klaim), resident di memori
+    # seperti RequestStore. stage_*() langsung mengubah memori dan
+    # mengembalikan record yang harus diteruskan ke PointsLedger.commit();
+    # pending_dm baru ditulis ke storage saat ledger compaction, itu pun hanya
+    # key yang berubah. Format record sama dengan yang dulu diterapkan
+    # langsung ke storage, jadi journal lama tetap bisa di-replay.
+
+    def __init__(self):
+        self._pending = {}  # dm_id -> data
+        self._changed = set()  # dm_id yang berubah sejak compaction terakhir
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, dm_id):
+        return str(dm_id) in self._pending
+
+    def load(self, pending):
+        # pending: {dm_id: data} (format pending_dm.json)
+        self._pending = {str(dm_id): data for dm_id, data in pending.items()}
+        self._changed = set()
+
+    def get(self, dm_id):
+        return self._pending.get(str(dm_id))
+
+    def all(self):
+        # -> {dm_id: salinan data}
+        return {dm_id: dict(data) for dm_id, data in self._pending.items()}
+
+    # --- Writes ---
+    def stage_put(self, dm_id, data):
+        dm_id = str(dm_id)
+        self._pending[dm_id] = dict(data)
+        self._changed.add(dm_id)
+        return {"store": PENDING_FILE, "key": dm_id, "value": data}
+
+    def stage_delete(self, dm_id):
+        # -> record, atau None jika sudah tidak ada
+        dm_id = str(dm_id)
+        if self._pending.pop(dm_id, None) is None:
+            return None
+        self._changed.add(dm_id)
+        return {"store": PENDING_FILE, "key": dm_id, "value": None}
+
+    # --- Replay / compaction ---
+    def apply(self, record):
+        dm_id = str(record["key"])
+        if record["value"] is None:
+            self._pending.pop(dm_id, None)
+        else:
+            self._pending[dm_id] = dict(record["value"])
+        self._changed.add(dm_id)
+
+    def take_changes(self):
+        # -> {dm_id: data | None} sejak compaction terakhir
+        changed, self._changed = self._changed, set()
+        return {
+            dm_id: dict(self._pending[dm_id]) if dm_id in self._pending else None
+            for dm_id in changed
+        }
+
+    def restore_changes(self, changes):
+        # Compaction gagal: tandai ulang supaya ikut compaction berikutnya
+        self._changed |= set(changes)
@@ -0,0 +1,80 @@
+from array import array
+from collections import OrderedDict
+
+_NEVER = float("-inf")
+
+
+class SlidingWindowLimiter:
+    # Anti-spam "lebih dari `limit` pesan dalam `window` detik", O(1) per
+    # pesan. Tiap key mendapat ring buffer berisi `limit + 1` timestamp
+    # terakhir di satu array('d') bersama; batas terlampaui kalau timestamp
+    # tertua di ring masih di dalam window.
+    #
+    # Key yang idle lebih lama dari `window` dibuang (state-nya sama dengan
+    # kosong) dan slot-nya dipakai ulang, jadi memori mengikuti jumlah user
+    # aktif, bukan jumlah user yang pernah bicara. `capacity` membatasi
+    # jumlah key sekaligus; kalau penuh, key yang paling lama tidak aktif
+    # dikorbankan.
+
+    def __init__(self, limit, window, capacity=100000):
+        self.limit = limit
+        self.window = window
+        self.capacity = capacity
+        self._width = limit + 1
+        self._times = array('d')
+        self._pos = array('H')
+        self._slots = OrderedDict()  # key -> slot, urutan dari yang paling lama idle
+        self._free = []
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _last(self, slot):
+        return self._times[slot * self._width + (self._pos[slot] - 1) % self._width]
+
+    def _expire(self, now):
+        slots = self._slots
+        while slots:
+            key = next(iter(slots))
+            slot = slots[key]
+            if now - self._last(slot) < self.window:
+                break
+            del slots[key]
+            self._free.append(slot)
+
+    def _alloc(self):
+        if self._free:
+            slot = self._free.pop()
+        elif len(self._slots) >= self.capacity:
+            _, slot = self._slots.popitem(last=False)
+            self.evicted += 1
+        else:
+            slot = len(self._pos)
+            self._times.extend(array('d', [_NEVER]) * self._width)
+            self._pos.append(0)
+            return slot
+        base = slot * self._width
+        self._times[base:base + self._width] = array('d', [_NEVER]) * self._width
+        self._pos[slot] = 0
+        return slot
+
+    def hit(self, key, now):
+        # Catat satu pesan; True jika batas terlampaui
+        self._expire(now)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = self._alloc()
+        else:
+            self._slots.move_to_end(key)
+        width = self._width
+        base = slot * width
+        pos = self._pos[slot]
+        self._times[base + pos] = now
+        pos = (pos + 1) % width
+        self._pos[slot] = pos
+        return now - self._times[base + pos] < self.window
+
+    def memory_bytes(self):
+        size = self._times.itemsize * len(self._times) + self._pos.itemsize * len(self._pos)
+        return size + len(self._slots) * 100  # perkiraan kasar entri OrderedDict
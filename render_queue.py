@@ -0,0 +1,88 @@
+import asyncio
+
+import discord
+
+from message_cache import MessageCache
+
+
+class EmbedRenderQueue:
+    # Render ulang embed request secara debounce. Perubahan cukup menandai
+    # pesan sebagai dirty; setelah `window` detik state terbaru dibaca lewat
+    # `load_request` dan di-render sekali. Tiap pesan paling banyak diedit
+    # sekali per `interval` detik, jadi request ramai tidak menghabiskan
+    # rate limit edit per channel.
+    #
+    # Handle Message diambil dari MessageCache guild (dibagi dengan !ambil)
+    # sehingga edit tidak perlu fetch_message dulu.
+
+    def __init__(self, load_request, render, window=0.5, interval=2.0, messages=None):
+        self.load_request = load_request  # fn(msg_id) -> request | None, mis. RequestStore.get
+        self.render = render  # fn(request) -> Embed
+        self.window = window
+        self.interval = interval
+        self.messages = messages if messages is not None else MessageCache()
+        self._dirty = {}  # msg_id -> (task, handle cadangan kalau sudah keluar dari cache)
+        self._last_edit = {}  # msg_id -> loop.time() edit terakhir
+        self.edits = 0
+        self.coalesced = 0
+
+    def track(self, message):
+        self.messages.put(message)
+
+    def forget(self, msg_id):
+        msg_id = str(msg_id)
+        self.messages.forget(msg_id)
+        self._last_edit.pop(msg_id, None)
+        pending = self._dirty.pop(msg_id, None)
+        if pending is not None:
+            pending[0].cancel()
+
+    def mark_dirty(self, message):
+        msg_id = str(message.id)
+        self.messages.add(message)
+        if msg_id in self._dirty:
+            self.coalesced += 1
+            return
+        loop = asyncio.get_running_loop()
+        delay = self.window
+        last = self._last_edit.get(msg_id)
+        if last is not None:
+            delay = max(delay, last + self.interval - loop.time())
+        self._dirty[msg_id] = (loop.create_task(self._delayed(msg_id, message, delay)), message)
+
+    async def _delayed(self, msg_id, message, delay):
+        await asyncio.sleep(delay)
+        self._dirty.pop(msg_id, None)
+        await self.render_now(msg_id, message)
+
+    async def render_now(self, msg_id, message=None):
+        message = self.messages.peek(msg_id) or message
+        if message is None:
+            return
+        request = self.load_request(msg_id)
+        if request is None:
+            self.forget(msg_id)
+            return
+        self._last_edit[msg_id] = asyncio.get_running_loop().time()
+        try:
+            await message.edit(embed=self.render(request))
+            self.edits += 1
+        except discord.NotFound:
+            self.forget(msg_id)
+        except Exception as e:
+            print(f"⚠️ Gagal update embed {msg_id}: {e}")
+
+    async def abandon(self):
+        # Edit yang menunggu dibatalkan; embed di-render oleh pemilik guild yang baru
+        pending, self._dirty = self._dirty, {}
+        for task, _ in pending.values():
+            task.cancel()
+        await asyncio.gather(*(task for task, _ in pending.values()), return_exceptions=True)
+
+    async def close(self):
+        # Render segera semua pesan yang masih menunggu jendela
+        pending, self._dirty = self._dirty, {}
+        for task, _ in pending.values():
+            task.cancel()
+        await asyncio.gather(*(task for task, _ in pending.values()), return_exceptions=True)
+        await asyncio.gather(*(self.render_now(msg_id, message) for msg_id, (_, message) in pending.items()))
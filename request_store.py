@@ -0,0 +1,195 @@
+import bisect
+
+from storage import REQUESTS_FILE
+
+# Jenis engagement lewat reaksi -> field daftar user di request
+REACTOR_FIELDS = {"like": "liked_by", "retweet": "retweeted_by", "follow": "followed_by"}
+
+
+def _copy(request):
+    # Salinan bagian yang bisa diubah stage_*() (task dan daftar reactor),
+    # supaya storage bisa menulisnya di thread lain
+    copy = dict(request)
+    copy["tasks"] = [dict(task) for task in request.get("tasks", ())]
+    for field in REACTOR_FIELDS.values():
+        if field in request:
+            copy[field] = list(request[field])
+    return copy
+
+
+class RequestStore:
+    # Request aktif satu guild, resident di memori dan dialamatkan lewat
+    # message id. Perubahan di-stage seperti leg ledger: memori langsung
+    # berubah, lalu record yang dikembalikan harus diteruskan ke
+    # PointsLedger.commit() supaya tercatat di journal yang sama dengan
+    # perpindahan poin (urutan replay tetap benar). Record berisi operasi per
+    # field (klaim task, tambah reactor), bukan seluruh request; storage baru
+    # ditulis saat ledger compaction, itu pun hanya request yang berubah.
+    #
+    # Index sekunder: request per requester, dan task komentar yang masih
+    # open per request (urut indeks task, sama seperti nomor di !ambil).
+    #
+    # Request yang dikembalikan get() adalah objek live: jangan diubah
+    # langsung, pakai stage_*().
+
+    def __init__(self):
+        self._requests = {}  # msg_id -> request
+        self._by_requester = {}  # requester_id -> set(msg_id)
+        self._open_comments = {}  # msg_id -> [indeks task komentar open], terurut
+        self._changed = set()  # msg_id yang berubah sejak compaction terakhir
+
+    def __len__(self):
+        return len(self._requests)
+
+    def __contains__(self, msg_id):
+        return str(msg_id) in self._requests
+
+    # --- Build ---
+    def load(self, requests):
+        # requests: {msg_id: request} (format requests.json)
+        self._requests = {}
+        self._by_requester = {}
+        self._open_comments = {}
+        self._changed = set()
+        for msg_id, request in requests.items():
+            self._insert(str(msg_id), request)
+
+    def _insert(self, msg_id, request):
+        self._requests[msg_id] = request
+        self._by_requester.setdefault(str(request["requester_id"]), set()).add(msg_id)
+        open_tasks = [
+            idx for idx, task in enumerate(request.get("tasks", ()))
+            if task["type"] == "comment" and task["status"] == "open"
+        ]
+        if open_tasks:
+            self._open_comments[msg_id] = open_tasks
+
+    def _remove(self, msg_id):
+        request = self._requests.pop(msg_id, None)
+        if request is None:
+            return None
+        owned = self._by_requester.get(str(request["requester_id"]))
+        if owned is not None:
+            owned.discard(msg_id)
+            if not owned:
+                del self._by_requester[str(request["requester_id"])]
+        self._open_comments.pop(msg_id, None)
+        return request
+
+    # --- Query ---
+    def get(self, msg_id):
+        return self._requests.get(str(msg_id))
+
+    def get_many(self, msg_ids):
+        # -> {msg_id: request} untuk id yang ada
+        return {str(m): self._requests[str(m)] for m in msg_ids if str(m) in self._requests}
+
+    def by_requester(self, requester_id):
+        return sorted(self._by_requester.get(str(requester_id), ()))
+
+    def open_comments(self, msg_id):
+        # -> [indeks task] komentar yang masih open; nomor !ambil = posisi + 1
+        return list(self._open_comments.get(str(msg_id), ()))
+
+    def with_open_comments(self):
+        # -> msg_id request yang masih punya komentar open
+        return list(self._open_comments)
+
+    def expiries(self):
+        return [(msg_id, request.get("expiry_timestamp", 0)) for msg_id, request in self._requests.items()]
+
+    def all(self):
+        # -> {msg_id: salinan request}
+        return {msg_id: _copy(request) for msg_id, request in self._requests.items()}
+
+    # --- Writes ---
+    def _record(self, msg_id, **fields):
+        self._changed.add(msg_id)
+        return {"store": REQUESTS_FILE, "key": msg_id, **fields}
+
+    def stage_put(self, msg_id, request):
+        msg_id = str(msg_id)
+        self._remove(msg_id)
+        self._insert(msg_id, request)
+        return self._record(msg_id, value=request)
+
+    def stage_delete(self, msg_id):
+        # -> record, atau None jika request tidak ada
+        msg_id = str(msg_id)
+        if self._remove(msg_id) is None:
+            return None
+        return self._record(msg_id, value=None)
+
+    def stage_task(self, msg_id, task_idx, **fields):
+        # Ubah field satu task (mis. klaim: assigned_to + status)
+        msg_id = str(msg_id)
+        ops = [["task", task_idx, fields]]
+        self._apply_ops(msg_id, ops)
+        return self._record(msg_id, ops=ops)
+
+    def stage_add_reactor(self, msg_id, field, user_id):
+        # -> record, atau None jika user sudah tercatat
+        msg_id = str(msg_id)
+        request = self._requests[msg_id]
+        if str(user_id) in request.get(field, ()):
+            return None
+        ops = [["add", field, str(user_id)]]
+        self._apply_ops(msg_id, ops)
+        return self._record(msg_id, ops=ops)
+
+    def _apply_ops(self, msg_id, ops):
+        request = self._requests.get(msg_id)
+        if request is None:
+            return
+        for op in ops:
+            if op[0] == "task":
+                _, task_idx, fields = op
+                task = request["tasks"][task_idx]
+                task.update(fields)
+                self._reindex_task(msg_id, task_idx, task)
+            elif op[0] == "add":
+                _, field, value = op
+                values = request.setdefault(field, [])
+                if value not in values:
+                    values.append(value)
+            else:
+                raise ValueError(f"Operasi request tidak dikenal: {op[0]}")
+
+    def _reindex_task(self, msg_id, task_idx, task):
+        open_tasks = self._open_comments.get(msg_id, [])
+        i = bisect.bisect_left(open_tasks, task_idx)
+        present = i < len(open_tasks) and open_tasks[i] == task_idx
+        is_open = task["type"] == "comment" and task["status"] == "open"
+        if is_open and not present:
+            open_tasks.insert(i, task_idx)
+            self._open_comments[msg_id] = open_tasks
+        elif present and not is_open:
+            del open_tasks[i]
+            if not open_tasks:
+                self._open_comments.pop(msg_id, None)
+
+    # --- Replay / compaction ---
+    def apply(self, record):
+        # Terapkan record dari journal ledger. Record lama berisi "value"
+        # (request utuh / None), record baru bisa berisi "ops".
+        msg_id = str(record["key"])
+        if "ops" in record:
+            self._apply_ops(msg_id, record["ops"])
+        elif record["value"] is None:
+            self._remove(msg_id)
+        else:
+            self._remove(msg_id)
+            self._insert(msg_id, record["value"])
+        self._changed.add(msg_id)
+
+    def take_changes(self):
+        # -> {msg_id: request | None} sejak compaction terakhir
+        changed, self._changed = self._changed, set()
+        return {
+            msg_id: _copy(self._requests[msg_id]) if msg_id in self._requests else None
+            for msg_id in changed
+        }
+
+    def restore_changes(self, changes):
+        # Compaction gagal: tandai ulang supaya ikut compaction berikutnya
+        self._changed |= set(changes)
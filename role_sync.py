@@ -0,0 +1,75 @@
+import asyncio
+
+import discord
+
+
+class RoleReconciler:
+    # Menyamakan role member dengan target yang dihitung dari state cache.
+    # Hanya role yang dikelola bot (`managed_roles`) yang disentuh; selisihnya
+    # diterapkan dalam satu member.edit(roles=...). Permintaan untuk member
+    # yang sama dalam `window` detik digabung jadi satu rekonsiliasi.
+
+    def __init__(self, target_roles, managed_roles, window=2.0):
+        self.target_roles = target_roles  # fn(member) -> set[Role]
+        self.managed_roles = managed_roles  # fn(guild) -> set[Role]
+        self.window = window
+        self._pending = {}  # (guild_id, member_id) -> (task, member)
+        self.edits = 0
+        self.skipped = 0
+
+    def request(self, member):
+        key = (member.guild.id, member.id)
+        if key in self._pending:
+            return
+        task = asyncio.get_running_loop().create_task(self._delayed(key, member))
+        self._pending[key] = (task, member)
+
+    async def _delayed(self, key, member):
+        await asyncio.sleep(self.window)
+        self._pending.pop(key, None)
+        await self.reconcile(member)
+
+    async def reconcile(self, member):
+        # -> "edited", "unchanged", atau "failed" untuk member ini.
+        # Ambil objek member terbaru dari cache (role bisa berubah selama jendela)
+        member = member.guild.get_member(member.id) or member
+        managed = self.managed_roles(member.guild)
+        current = set(member.roles)
+        desired = (current - managed) | self.target_roles(member)
+        if desired == current:
+            self.skipped += 1
+            return "unchanged"
+        try:
+            await member.edit(roles=[r for r in desired if not r.is_default()], reason="Sinkronisasi role poin")
+            self.edits += 1
+            return "edited"
+        except discord.Forbidden:
+            print(f"⚠️ Bot tidak punya izin untuk ubah role {member}")
+        except Exception as e:
+            print(f"❌ Error saat sinkronisasi role {member}: {e}")
+        return "failed"
+
+    async def reconcile_many(self, members, concurrency=5):
+        # Rekonsiliasi segera untuk banyak member, paling banyak `concurrency`
+        # edit berjalan bersamaan. -> (diedit, tidak berubah, gagal)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(member):
+            pending = self._pending.pop((member.guild.id, member.id), None)
+            if pending is not None:
+                pending[0].cancel()
+            async with semaphore:
+                return await self.reconcile(member)
+
+        # Hasil per member, bukan selisih counter bersama: reconcile lain
+        # bisa berjalan bersamaan
+        results = await asyncio.gather(*(run(member) for member in members))
+        return results.count("edited"), results.count("unchanged"), results.count("failed")
+
+    async def close(self):
+        # Jalankan segera rekonsiliasi yang masih menunggu jendela
+        pending, self._pending = list(self._pending.values()), {}
+        for task, _ in pending:
+            task.cancel()
+        await asyncio.gather(*(task for task, _ in pending), return_exceptions=True)
+        await asyncio.gather(*(self.reconcile(member) for _, member in pending))
@@ -0,0 +1,93 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class Scheduler:
+    # Satu task untuk banyak deadline. Min-heap (deadline, seq, key) dengan
+    # lazy deletion: cancel() hanya menandai entri, jadi O(1). Semua entri
+    # yang sudah jatuh tempo diambil sekaligus dan diserahkan ke `handler`
+    # sebagai satu batch list key.
+    #
+    # Deadline memakai jam dinding (time.time) supaya bisa disimpan ke disk
+    # dan di-arm ulang setelah restart.
+
+    def __init__(self, handler, name="scheduler", clock=time.time):
+        self.handler = handler
+        self.name = name
+        self.clock = clock
+        self._heap = []
+        self._entries = {}  # key -> [deadline, seq, key, aktif]
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._task = None
+        self._closing = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def deadline(self, key):
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def schedule(self, key, deadline):
+        self.cancel(key)
+        entry = [deadline, next(self._seq), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wake.set()
+
+    def cancel(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[3] = False
+        # Bersihkan heap kalau entri mati sudah mendominasi
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [e for e in self._heap if e[3]]
+            heapq.heapify(self._heap)
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def _pop_due(self, now):
+        due = []
+        heap = self._heap
+        while heap and (not heap[0][3] or heap[0][0] <= now):
+            entry = heapq.heappop(heap)
+            if entry[3]:
+                entry[3] = False
+                del self._entries[entry[2]]
+                due.append(entry[2])
+        return due
+
+    async def _run(self):
+        while not self._closing:
+            due = self._pop_due(self.clock())
+            if due:
+                try:
+                    await self.handler(due)
+                except Exception as e:
+                    print(f"❌ Error di {self.name}: {e}")
+                continue
+
+            timeout = self._heap[0][0] - self.clock() if self._heap else None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,111 @@
+import asyncio
+
+
+class SettlementResult:
+    def __init__(self, status, request=None):
+        self.status = status  # "approved", "rejected", "insufficient", "missing"
+        self.request = request
+
+
+class SettlementQueue:
+    # Settlement = debit pembeli + kredit penjual + perubahan status task +
+    # penghapusan pending, ditulis sebagai satu baris journal ledger.
+    # Settlement yang datang dalam `window` detik digabung (group commit)
+    # sehingga cukup satu fsync untuk semuanya. Perubahan task dicatat per
+    # field lewat RequestStore, bukan menulis ulang request.
+
+    def __init__(self, ledger, requests, pending, locks, window=0.05, max_batch=500):
+        self.ledger = ledger
+        self.requests = requests
+        self.pending = pending  # PendingStore guild
+        self.locks = locks
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = []
+        self._task = None
+
+    async def submit(self, data, approved, dm_id=None):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((data, approved, dm_id, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+        return await future
+
+    async def close(self):
+        if self._task is not None:
+            await self._task
+
+    async def abandon(self):
+        # Settlement yang belum di-commit digagalkan; batch yang sedang
+        # berjalan gagal sendiri karena journal ledger sudah ditinggalkan
+        queued, self._queue = self._queue, []
+        for *_, future in queued:
+            if not future.done():
+                future.set_exception(RuntimeError("state guild sudah ditutup"))
+        await self.close()
+
+    async def _drain(self):
+        while self._queue:
+            await asyncio.sleep(self.window)
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            try:
+                results = await self._commit(batch)
+            except Exception as e:
+                print(f"❌ Error saat settlement batch: {e}")
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (*_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _commit(self, batch):
+        # Request yang disentuh batch dikunci selama baca-ubah-tulis
+        request_ids = {data["request_id"] for data, *_ in batch}
+        async with self.locks.hold(*(("request", request_id) for request_id in request_ids)):
+            return await self._commit_locked(batch)
+
+    async def _commit_locked(self, batch):
+        legs = []
+        records = []
+        results = []
+        for data, approved, dm_id, _ in batch:
+            if dm_id is not None:
+                records.append(self.pending.stage_delete(dm_id))
+
+            request_id = str(data["request_id"])
+            request = self.requests.get(request_id)
+            if request is None:
+                results.append(SettlementResult("missing"))
+                continue
+
+            results.append(self._apply(data, approved, request_id, request, legs, records))
+
+        await self.ledger.commit(legs, records)
+        return results
+
+    def _apply(self, data, approved, request_id, request, legs, records):
+        seller_id = data["seller_id"]
+        requester_id = data["requester_id"]
+        task_idx = data.get("task_idx")
+        task = None
+        if data.get("is_comment", False) and task_idx is not None and task_idx < len(request["tasks"]):
+            task = request["tasks"][task_idx]
+            if task["assigned_to"] != str(seller_id):
+                task = None
+
+        if not approved:
+            if task is not None:
+                records.append(self.requests.stage_task(request_id, task_idx, status="open", assigned_to=None))
+            return SettlementResult("rejected", request)
+
+        user_pays = data["user_pays"]
+        if self.ledger.balance(requester_id) < user_pays:
+            return SettlementResult("insufficient", request)
+
+        subsidy = round(data["price"] - user_pays, 1)
+        legs.extend(self.ledger.stage_transfer(requester_id, seller_id, user_pays, subsidy=subsidy))
+        if task is not None:
+            records.append(self.requests.stage_task(request_id, task_idx, status="confirmed"))
+        return SettlementResult("approved", request)
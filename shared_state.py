@@ -0,0 +1,352 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StateConflict(Exception):
+    # update() tetap kalah compare-and-swap setelah semua percobaan
+    pass
+
+
+class Record:
+    __slots__ = ("value", "version", "expires")
+
+    def __init__(self, value, version, expires=None):
+        self.value = value
+        self.version = version
+        self.expires = expires  # time.time() saat record hilang, None = permanen
+
+
+class SharedStateStore:
+    # State bersama antar proses bot: record (namespace, key) -> value JSON
+    # dengan nomor versi. Tulis bersyarat (compare-and-swap) lewat `version`:
+    #   None -> tulis tanpa syarat
+    #   0    -> hanya kalau record belum ada
+    #   n    -> hanya kalau versi sekarang masih n
+    # Record yang lewat `expires` dianggap tidak ada. Waktu memakai jam dinding
+    # karena dibandingkan antar proses.
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+
+    async def get(self, ns, key):
+        raise NotImplementedError
+
+    async def put(self, ns, key, value, version=None, expires=None):
+        # Versi baru, atau None kalau syarat versi tidak terpenuhi
+        raise NotImplementedError
+
+    async def delete(self, ns, key, version=None):
+        raise NotImplementedError
+
+    async def scan(self, ns, prefix=""):
+        # [(key, Record)] untuk key berawalan `prefix`
+        raise NotImplementedError
+
+    async def purge_expired(self):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    # --- Operasi turunan ---
+    async def update(self, ns, key, fn, ttl=None, refresh=True, attempts=20):
+        # Baca-ubah-tulis dengan retry CAS. fn(value lama atau None) -> value baru.
+        # refresh=False mempertahankan waktu kedaluwarsa record yang sudah ada.
+        for _ in range(attempts):
+            record = await self.get(ns, key)
+            value = fn(record.value if record else None)
+            if record is not None and not refresh:
+                expires = record.expires
+            else:
+                expires = self.clock() + ttl if ttl else None
+            version = record.version if record else 0
+            if await self.put(ns, key, value, version=version, expires=expires) is not None:
+                return value
+        raise StateConflict(f"{ns}/{key}")
+
+    async def take(self, ns, key, attempts=20):
+        # Ambil dan hapus record; hanya satu pemanggil yang mendapat value-nya
+        for _ in range(attempts):
+            record = await self.get(ns, key)
+            if record is None:
+                return None
+            if await self.delete(ns, key, version=record.version):
+                return record.value
+        raise StateConflict(f"{ns}/{key}")
+
+    async def acquire_lease(self, name, owner, ttl):
+        # Ambil atau perpanjang lease; gagal kalau dipegang owner lain
+        record = await self.get("lease", name)
+        if record is not None and record.value != owner:
+            return False
+        version = record.version if record else 0
+        return await self.put("lease", name, owner, version=version, expires=self.clock() + ttl) is not None
+
+    async def release_lease(self, name, owner):
+        record = await self.get("lease", name)
+        if record is not None and record.value == owner:
+            await self.delete("lease", name, version=record.version)
+
+
+class InProcessStateStore(SharedStateStore):
+    # Pengganti lokal untuk satu proses. Hanya namespace di `bounded` (state
+    # cache seperti jatah harian) yang dibatasi `capacity` record (LRU);
+    # namespace lain (rute pending, keputusan CAS, lease) tidak pernah dibuang
+    # karena kapasitas, hanya lewat `expires` / purge_expired().
+
+    def __init__(self, capacity=100000, bounded=(), clock=time.time):
+        super().__init__(clock)
+        self.capacity = capacity
+        self.bounded = frozenset(bounded)
+        self._namespaces = {}  # ns -> OrderedDict key -> Record
+
+    def _live(self, ns, key):
+        records = self._namespaces.get(ns)
+        record = records.get(key) if records else None
+        if record is not None and record.expires is not None and record.expires <= self.clock():
+            del records[key]
+            return None, record.version
+        return record, record.version if record else 0
+
+    async def get(self, ns, key):
+        record, _ = self._live(ns, key)
+        if record is not None:
+            self._namespaces[ns].move_to_end(key)
+        return record
+
+    async def put(self, ns, key, value, version=None, expires=None):
+        record, last_version = self._live(ns, key)
+        if version is not None and version != (record.version if record else 0):
+            return None
+        records = self._namespaces.setdefault(ns, OrderedDict())
+        # Simpan salinan supaya perubahan objek pemanggil tidak bocor ke store
+        records[key] = Record(json.loads(json.dumps(value)), last_version + 1, expires)
+        records.move_to_end(key)
+        if ns in self.bounded:
+            while len(records) > self.capacity:
+                records.popitem(last=False)
+        return last_version + 1
+
+    async def delete(self, ns, key, version=None):
+        record, _ = self._live(ns, key)
+        if record is None or (version is not None and version != record.version):
+            return False
+        del self._namespaces[ns][key]
+        return True
+
+    async def scan(self, ns, prefix=""):
+        now = self.clock()
+        return [
+            (key, record)
+            for key, record in list(self._namespaces.get(ns, {}).items())
+            if key.startswith(prefix) and (record.expires is None or record.expires > now)
+        ]
+
+    async def purge_expired(self):
+        now = self.clock()
+        for records in self._namespaces.values():
+            for key in [k for k, r in records.items() if r.expires is not None and r.expires <= now]:
+                del records[key]
+
+
+SHARED_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_state (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    expires REAL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_shared_state_expires ON shared_state (expires);
+"""
+
+
+class SqliteStateStore(SharedStateStore):
+    # State bersama untuk beberapa proses di satu host (file SQLite WAL).
+    # Tiap tulis bersyarat berjalan dalam BEGIN IMMEDIATE, jadi cek versi dan
+    # tulis atomik terhadap proses lain. Akses lewat satu thread worker seperti
+    # SqliteStorage.
+
+    def __init__(self, path, clock=time.time, busy_timeout=5.0):
+        super().__init__(clock)
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SHARED_STATE_SCHEMA)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def close(self):
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+    def _row(self, ns, key):
+        return self._conn.execute(
+            "SELECT value, version, expires FROM shared_state WHERE ns = ? AND key = ?", (ns, key)
+        ).fetchone()
+
+    def _get(self, ns, key):
+        row = self._row(ns, key)
+        if row is None or (row[2] is not None and row[2] <= self.clock()):
+            return None
+        return Record(json.loads(row[0]), row[1], row[2])
+
+    def _put(self, ns, key, value, version, expires):
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._row(ns, key)
+            last_version = row[1] if row else 0
+            live = row is not None and (row[2] is None or row[2] > self.clock())
+            if version is not None and version != (last_version if live else 0):
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_state VALUES (?, ?, ?, ?, ?)",
+                (ns, key, json.dumps(value), last_version + 1, expires),
+            )
+            conn.execute("COMMIT")
+            return last_version + 1
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _delete(self, ns, key, version):
+        now = self.clock()
+        sql = "DELETE FROM shared_state WHERE ns = ? AND key = ? AND (expires IS NULL OR expires > ?)"
+        params = (ns, key, now)
+        if version is not None:
+            sql += " AND version = ?"
+            params += (version,)
+        return self._conn.execute(sql, params).rowcount > 0
+
+    def _scan(self, ns, prefix):
+        rows = self._conn.execute(
+            "SELECT key, value, version, expires FROM shared_state"
+            " WHERE ns = ? AND key >= ? AND key < ? AND (expires IS NULL OR expires > ?)",
+            (ns, prefix, prefix + "\U0010ffff", self.clock()),
+        )
+        return [(key, Record(json.loads(value), version, expires)) for key, value, version, expires in rows]
+
+    def _purge(self):
+        self._conn.execute("DELETE FROM shared_state WHERE expires IS NOT NULL AND expires <= ?", (self.clock(),))
+
+    async def get(self, ns, key):
+        return await self._run(self._get, ns, key)
+
+    async def put(self, ns, key, value, version=None, expires=None):
+        return await self._run(self._put, ns, key, value, version, expires)
+
+    async def delete(self, ns, key, version=None):
+        return await self._run(self._delete, ns, key, version)
+
+    async def scan(self, ns, prefix=""):
+        return await self._run(self._scan, ns, prefix)
+
+    async def purge_expired(self):
+        await self._run(self._purge)
+
+
+def open_shared_state(path=None, capacity=100000, bounded=()):
+    # Tanpa path: satu proses, state di memori; `capacity` hanya berlaku untuk
+    # namespace di `bounded`
+    if path:
+        return SqliteStateStore(path)
+    return InProcessStateStore(capacity=capacity, bounded=bounded)
+
+
+class LeaseCoordinator:
+    # Kepemilikan tugas yang hanya boleh dijalankan satu proses (mis. data satu
+    # guild beserta timer expiry / auto-approve-nya). Lease diperpanjang tiap
+    # ttl/3 detik; kalau perpanjangan gagal (proses lain mengambil alih setelah
+    # kita macet), `on_lost(name)` dipanggil supaya pemiliknya berhenti.
+    #
+    # Lease "leader" dikampanyekan terus-menerus; pemegangnya membersihkan
+    # record yang kedaluwarsa di store.
+
+    LEADER = "leader"
+
+    def __init__(self, store, owner, ttl=30.0, on_lost=None):
+        self.store = store
+        self.owner = owner
+        self.ttl = ttl
+        self.on_lost = on_lost
+        self._held = set()
+        self._wake = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self._lost_tasks = set()
+
+    @property
+    def is_leader(self):
+        return self.LEADER in self._held
+
+    def holds(self, name):
+        return name in self._held
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def acquire(self, name, wait=True):
+        # Tunggu sampai lease didapat (pemilik lama melepas atau lease-nya habis)
+        warned = False
+        while not self._closing:
+            if await self.store.acquire_lease(name, self.owner, self.ttl):
+                self._held.add(name)
+                return True
+            if not wait:
+                return False
+            if not warned:
+                print(f"⏳ Menunggu lease {name} dilepas proses lain")
+                warned = True
+            await asyncio.sleep(self.ttl / 3)
+        return False
+
+    async def release(self, name):
+        if name in self._held:
+            self._held.discard(name)
+            await self.store.release_lease(name, self.owner)
+
+    async def close(self):
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        for name in list(self._held):
+            await self.release(name)
+
+    async def _tick(self):
+        for name in list(self._held):
+            if not await self.store.acquire_lease(name, self.owner, self.ttl):
+                self._held.discard(name)
+                print(f"⚠️ Lease {name} diambil alih proses lain")
+                if self.on_lost is not None:
+                    task = asyncio.create_task(self.on_lost(name))
+                    self._lost_tasks.add(task)
+                    task.add_done_callback(self._lost_tasks.discard)
+        if not self.is_leader:
+            await self.acquire(self.LEADER, wait=False)
+        if self.is_leader:
+            await self.store.purge_expired()
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await self._tick()
+            except Exception as e:
+                print(f"❌ Error saat memperpanjang lease: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.ttl / 3)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,284 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from engagement_index import TASK_BITS, EngagementIndex
+from follow_graph import FollowGraph
+from journal import Journal
+from storage import (
+    ENGAGEMENT_FILE, FOLLOWS_FILE, GIVER_FILE, MUTES_FILE, PENDING_FILE, POINTS_FILE, POINTS_JOURNAL_FILE,
+    PREFERENCES_FILE, REQUESTS_FILE, JsonStorage, replay_balances, replay_engagements, replay_giver_stats,
+    replay_pending, replay_requests,
+)
+
+SNAPSHOT_FILE = 'state.snap'
+
+# Header: magic, versi, jumlah section; lalu tabel section (nama, typecode
+# array, 's' untuk daftar string per baris atau 'j' untuk JSON, offset,
+# panjang byte). Data tiap section disejajarkan 8 byte dari awal file.
+MAGIC = b"EBSNAP\0\0"
+VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<16sc7xQQ")
+_ALIGN = 8
+
+# Section array sejajar, dikelompokkan per bagian state
+BALANCE_SECTIONS = ("balance_keys", "balance_values")
+ENGAGEMENT_SECTIONS = ("engagement_keys", "engagement_masks")
+FOLLOW_SECTIONS = ("follow_out_src", "follow_out_dst", "follow_in_src", "follow_in_dst")
+GIVER_SECTIONS = ("giver_ids", "giver_counts", "giver_totals")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def write_snapshot(path, sections):
+    # sections: [(nama, typecode, data)]; data berupa array/bytearray untuk
+    # typecode array, list string untuk 's', atau objek JSON untuk 'j'.
+    # Ditulis ke file sementara lalu di-rename, jadi pembaca tidak pernah
+    # melihat snapshot setengah jadi.
+    blobs = []
+    for name, typecode, data in sections:
+        if typecode == 'j':
+            blob = json.dumps(data, separators=(",", ":")).encode()
+        elif typecode == 's':
+            blob = "\n".join(data).encode()
+        else:
+            blob = bytes(data)
+        blobs.append((name.encode(), typecode.encode(), blob))
+
+    offset = _HEADER.size + _ENTRY.size * len(blobs)
+    table = []
+    for name, typecode, blob in blobs:
+        offset += -offset % _ALIGN
+        table.append(_ENTRY.pack(name, typecode, offset, len(blob)))
+        offset += len(blob)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(blobs)))
+        f.write(b"".join(table))
+        for _, _, blob in blobs:
+            f.write(b"\0" * (-f.tell() % _ALIGN))
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+class Snapshot:
+    # Snapshot yang dibuka dengan mmap. Hanya header dan tabel section yang
+    # dibaca saat dibuka; tiap section baru di-decode saat diminta lalu
+    # di-cache. `timings` mencatat lama decode per section.
+
+    def __init__(self, path):
+        self.path = path
+        self.timings = {}
+        self._decoded = {}
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError(f"{path}: file kosong")
+        try:
+            magic, version, count = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise SnapshotError(f"{path}: bukan file snapshot")
+            if version != VERSION:
+                raise SnapshotError(f"{path}: versi {version} tidak didukung (butuh {VERSION})")
+            self.sections = {}
+            for i in range(count):
+                name, typecode, offset, length = _ENTRY.unpack_from(self._map, _HEADER.size + i * _ENTRY.size)
+                if offset + length > len(self._map):
+                    raise SnapshotError(f"{path}: section {name!r} terpotong")
+                self.sections[name.rstrip(b"\0").decode()] = (typecode.decode(), offset, length)
+        except (struct.error, SnapshotError):
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def get(self, name, default=None):
+        # -> array (salinan dari mmap), list string, atau objek JSON
+        if name in self._decoded:
+            return self._decoded[name]
+        if name not in self.sections:
+            return default
+        typecode, offset, length = self.sections[name]
+        start = time.perf_counter()
+        if typecode == 'j':
+            value = json.loads(self._map[offset:offset + length])
+        elif typecode == 's':
+            value = str(self._map[offset:offset + length], 'utf-8').split("\n") if length else []
+        elif typecode == 'B':
+            value = bytearray(self._map[offset:offset + length])
+        else:
+            value = array(typecode)
+            value.frombytes(self._map[offset:offset + length])
+        self.timings[name] = time.perf_counter() - start
+        self._decoded[name] = value
+        return value
+
+    def require(self, *names):
+        missing = [name for name in names if name not in self.sections]
+        if missing:
+            raise SnapshotError(f"{self.path}: section tidak ada: {', '.join(missing)}")
+        return [self.get(name) for name in names]
+
+    # --- State ---
+    def meta(self):
+        return self.get("meta", {})
+
+    def balances(self):
+        # -> {key: saldo} termasuk key non-user (escrow_*). Key disimpan
+        # sebagai teks supaya tidak perlu str() per user saat start.
+        keys, values = self.require(*BALANCE_SECTIONS)
+        start = time.perf_counter()
+        balances = dict(zip(keys, values.tolist()))
+        self.timings["balances"] = time.perf_counter() - start
+        return balances
+
+    def engagements(self):
+        # -> (keys, masks), terurut seperti EngagementIndex.load_arrays
+        return self.require(*ENGAGEMENT_SECTIONS)
+
+    def follows(self):
+        # -> (out_src, out_dst, in_src, in_dst) untuk FollowGraph.load_arrays
+        return self.require(*FOLLOW_SECTIONS)
+
+    def giver_stats(self):
+        ids, counts, totals = self.require(*GIVER_SECTIONS)
+        return {str(user_id): (count, total) for user_id, count, total in zip(ids, counts, totals)}
+
+
+def build_sections(balances, engagements, follows, giver_stats, requests, pending, mutes, preferences=None, meta=None):
+    # engagements: (keys, masks) terurut; follows: empat array FollowGraph.arrays()
+    balance_keys = sorted(balances)
+    givers = sorted((int(user_id), count, total) for user_id, (count, total) in giver_stats.items())
+    arrays = [
+        ("balance_keys", 's', balance_keys),
+        ("balance_values", 'd', array('d', (balances[key] for key in balance_keys))),
+        ("engagement_keys", 'Q', engagements[0]),
+        ("engagement_masks", 'B', engagements[1]),
+        *zip(FOLLOW_SECTIONS, 'QQQQ', follows),
+        ("giver_ids", 'Q', array('Q', (g[0] for g in givers))),
+        ("giver_counts", 'q', array('q', (int(g[1]) for g in givers))),
+        ("giver_totals", 'd', array('d', (g[2] for g in givers))),
+    ]
+    return [
+        ("meta", 'j', dict(meta or {}, created=time.time())),
+        *arrays,
+        ("requests", 'j', requests),
+        ("pending", 'j', pending),
+        ("mutes", 'j', mutes),
+        ("preferences", 'j', preferences or {}),
+    ]
+
+
+# --- Ekspor / impor file JSON lama ---
+def export_json(json_dir, path):
+    # File JSON (+ journal poin yang belum dipadatkan) -> snapshot. Sidik
+    # storage ikut disimpan, jadi bot langsung memakai snapshot ini selama
+    # file JSON belum berubah.
+    source = JsonStorage(json_dir)
+    journal = Journal(os.path.join(json_dir, POINTS_JOURNAL_FILE)).read()
+    balances = replay_balances(source._read(POINTS_FILE, dict), journal)
+    index = EngagementIndex()
+    index.load(replay_engagements(source._read(ENGAGEMENT_FILE, dict), journal))
+    graph = FollowGraph()
+    graph.load(tuple(int(part) for part in key.split("_", 1)) for key in source._read(FOLLOWS_FILE, dict))
+    giver_doc = replay_giver_stats(source._read(GIVER_FILE, dict), journal)
+    giver_stats = {k: (v, giver_doc.get(f"{k}_total", 0)) for k, v in giver_doc.items() if not k.endswith("_total")}
+    sections = build_sections(
+        balances, index.arrays(), graph.arrays(), giver_stats,
+        replay_requests(source._read(REQUESTS_FILE, dict), journal),
+        replay_pending(source._read(PENDING_FILE, dict), journal),
+        source._read(MUTES_FILE, dict), source._read(PREFERENCES_FILE, dict),
+        meta={"fingerprint": source.fingerprint()},
+    )
+    return write_snapshot(path, sections)
+
+
+def import_json(path, json_dir):
+    # Snapshot -> file JSON lama. Menulis ulang file JSON mengubah sidik
+    # storage, jadi snapshot ini tidak lagi dipakai saat start.
+    target = JsonStorage(json_dir)
+    os.makedirs(json_dir, exist_ok=True)
+    with Snapshot(path) as snap:
+        keys, masks = snap.engagements()
+        out_src, out_dst, _, _ = snap.follows()
+        giver_doc = {}
+        for user_id, (count, total) in snap.giver_stats().items():
+            giver_doc[user_id] = count
+            giver_doc[f"{user_id}_total"] = total
+        documents = {
+            POINTS_FILE: snap.balances(),
+            ENGAGEMENT_FILE: {
+                f"{key:016x}": {task: True for task, bit in TASK_BITS.items() if mask & bit}
+                for key, mask in zip(keys, masks)
+            },
+            FOLLOWS_FILE: {f"{f}_{t}": True for f, t in zip(out_src, out_dst)},
+            GIVER_FILE: giver_doc,
+            REQUESTS_FILE: snap.get("requests", {}),
+            PENDING_FILE: snap.get("pending", {}),
+            MUTES_FILE: snap.get("mutes", {}),
+            PREFERENCES_FILE: snap.get("preferences", {}),
+        }
+    for name, data in documents.items():
+        target._write(name, data)
+        print(f"✅ {name}: {len(data)} entri ditulis")
+    # Journal lama sudah termasuk di snapshot
+    Journal(os.path.join(json_dir, POINTS_JOURNAL_FILE))._truncate()
+
+
+def print_info(path):
+    start = time.perf_counter()
+    with Snapshot(path) as snap:
+        opened = time.perf_counter() - start
+        print(f"📦 {path}: {os.path.getsize(path) / 1e6:.1f} MB, {len(snap.sections)} section, dibuka dalam {opened * 1000:.1f} ms")
+        for name, (typecode, _, length) in snap.sections.items():
+            snap.get(name)
+            print(f"  {name:<18} {typecode}  {length / 1e6:>9.2f} MB  decode {snap.timings[name] * 1000:>8.1f} ms")
+        snap.balances()
+        print(f"  {'(dict saldo)':<18}    {'':>12}  bangun  {snap.timings['balances'] * 1000:>8.1f} ms")
+        print(f"  total {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot biner state bot engagement")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Buat snapshot dari file JSON lama")
+    export.add_argument("--json-dir", default=".")
+    export.add_argument("--out", default=SNAPSHOT_FILE)
+    restore = sub.add_parser("import", help="Tulis ulang file JSON lama dari snapshot")
+    restore.add_argument("--snapshot", default=SNAPSHOT_FILE)
+    restore.add_argument("--json-dir", default=".")
+    info = sub.add_parser("info", help="Tampilkan section dan waktu decode snapshot")
+    info.add_argument("--snapshot", default=SNAPSHOT_FILE)
+    args = parser.parse_args()
+    if args.command == "export":
+        size = export_json(args.json_dir, args.out)
+        print(f"✅ Snapshot {args.out} ditulis ({size / 1e6:.1f} MB)")
+    elif args.command == "import":
+        import_json(args.snapshot, args.json_dir)
+    elif args.command == "info":
+        print_info(args.snapshot)
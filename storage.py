@@ -0,0 +1,676 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from journal import Journal
+from locks import LockManager
+
+# --- Nama file / dokumen ---
+POINTS_FILE = 'points.json'
+POINTS_JOURNAL_FILE = 'points.journal'
+REQUESTS_FILE = 'requests.json'
+FOLLOWS_FILE = 'global_follows.json'
+ENGAGEMENT_FILE = 'engagement_log.json'
+GIVER_FILE = 'giver_count.json'
+PENDING_FILE = 'pending_dm.json'
+MUTES_FILE = 'mutes.json'
+PREFERENCES_FILE = 'preferences.json'
+
+DOCUMENTS = (
+    POINTS_FILE, REQUESTS_FILE, FOLLOWS_FILE, ENGAGEMENT_FILE, GIVER_FILE, PENDING_FILE, MUTES_FILE, PREFERENCES_FILE,
+)
+
+
+def file_fingerprint(paths):
+    # File yang tidak ada atau kosong (mis. -wal setelah checkpoint) dilewati
+    result = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if st.st_size:
+            result[os.path.basename(path)] = [st.st_size, st.st_mtime_ns]
+    return result
+
+
+class Storage:
+    # Antarmuka penyimpanan. load()/save() bekerja per dokumen (format file
+    # JSON lama), method lain adalah query per record untuk jalur panas.
+
+    async def close(self):
+        pass
+
+    # --- Dokumen utuh ---
+    async def load(self, name, default=None):
+        raise NotImplementedError
+
+    async def save(self, name, data):
+        raise NotImplementedError
+
+    # --- Saldo ---
+    async def load_balances(self):
+        raise NotImplementedError
+
+    async def save_balances(self, balances, changed=None):
+        # `changed` berisi key -> saldo (None = dihapus) sejak snapshot terakhir
+        raise NotImplementedError
+
+    # --- Request ---
+    async def load_requests(self):
+        # -> {msg_id: request} (format requests.json)
+        raise NotImplementedError
+
+    async def save_requests(self, requests, changed=None):
+        # `changed` berisi msg_id -> request (None = dihapus) sejak snapshot terakhir
+        raise NotImplementedError
+
+    # --- Follow ---
+    async def add_follow(self, follower_id, target_id):
+        # True jika edge baru ditambahkan, False jika sudah ada
+        raise NotImplementedError
+
+    async def load_follows(self):
+        # -> [(follower_id, target_id)] sebagai int
+        raise NotImplementedError
+
+    # --- Engagement ---
+    async def mark_engaged_many(self, items):
+        # items: [(key, task_type)]
+        raise NotImplementedError
+
+    async def load_engagements(self):
+        # -> {key: {task_type: True}} (format engagement_log.json)
+        raise NotImplementedError
+
+    # --- Statistik pemberi poin ---
+    async def load_giver_stats(self):
+        # -> {user_id: (jumlah pemberian, total poin diberikan)}
+        raise NotImplementedError
+
+    async def save_giver_stats(self, stats, changed=None):
+        # `changed` berisi user_id -> (jumlah, total) sejak snapshot terakhir
+        raise NotImplementedError
+
+    # --- Konfirmasi pending ---
+    async def load_pending(self):
+        raise NotImplementedError
+
+    async def save_pending(self, pending, changed=None):
+        # `changed` berisi dm_id -> data (None = dihapus) sejak snapshot terakhir
+        raise NotImplementedError
+
+    # --- Mute aktif ---
+    async def load_mutes(self):
+        raise NotImplementedError
+
+    async def put_mute(self, key, data):
+        raise NotImplementedError
+
+    async def pop_mute(self, key):
+        raise NotImplementedError
+
+    # --- Preferensi user (mis. mode konfirmasi) ---
+    async def load_preferences(self):
+        # -> {user_id: {nama: nilai}}
+        raise NotImplementedError
+
+    async def put_preferences(self, user_id, data):
+        raise NotImplementedError
+
+    # --- Snapshot ---
+    def fingerprint(self):
+        # -> {path: [ukuran, mtime_ns]} file yang menyimpan data; snapshot
+        # hanya dipakai kalau sidik ini sama dengan saat snapshot ditulis
+        return {}
+
+    # --- Metrik ---
+    def io_stats(self):
+        # -> ({dokumen: byte dibaca}, {dokumen: byte ditulis}); kosong jika tidak dilacak
+        return {}, {}
+
+    # --- Batch ---
+    async def apply_records(self, records):
+        # records: [{"store": REQUESTS_FILE|PENDING_FILE, "key": ..., "value": dict|None}]
+        # Idempotent, karena bisa diterapkan ulang saat replay journal.
+        raise NotImplementedError
+
+
+class JsonStorage(Storage):
+    # Implementasi file JSON (format lama, satu file per dokumen). Tiap
+    # dokumen punya lock sendiri, jadi baca points.json tidak menunggu
+    # tulis requests.json.
+
+    def __init__(self, directory='.', locks=None):
+        self.directory = directory
+        self.locks = locks if locks is not None else LockManager()
+        self.bytes_read = {}
+        self.bytes_written = {}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read(self, name, default=None):
+        path = self._path(name)
+        try:
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                    self.bytes_read[name] = self.bytes_read.get(name, 0) + f.tell()
+                    return data
+        except Exception as e:
+            print(f"❌ Error saat baca {path}: {e}")
+        return default() if callable(default) else default
+
+    def _write(self, name, data):
+        path = self._path(name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+            self.bytes_written[name] = self.bytes_written.get(name, 0) + f.tell()
+        os.replace(tmp_path, path)
+
+    def io_stats(self):
+        return dict(self.bytes_read), dict(self.bytes_written)
+
+    def fingerprint(self):
+        return file_fingerprint(self._path(name) for name in DOCUMENTS)
+
+    async def load(self, name, default=None):
+        async with self.locks.hold(("store", name)):
+            return await asyncio.to_thread(self._read, name, default)
+
+    async def save(self, name, data):
+        async with self.locks.hold(("store", name)):
+            await asyncio.to_thread(self._write, name, data)
+
+    async def _update(self, name, fn):
+        # Read-modify-write satu dokumen di bawah lock dokumen tersebut
+        async with self.locks.hold(("store", name)):
+            doc = await asyncio.to_thread(self._read, name, dict)
+            result = fn(doc)
+            await asyncio.to_thread(self._write, name, doc)
+            return result
+
+    async def load_balances(self):
+        return await self.load(POINTS_FILE, dict)
+
+    async def save_balances(self, balances, changed=None):
+        await self.save(POINTS_FILE, balances)
+
+    async def load_requests(self):
+        return await self.load(REQUESTS_FILE, dict)
+
+    async def save_requests(self, requests, changed=None):
+        await self.save(REQUESTS_FILE, requests)
+
+    async def add_follow(self, follower_id, target_id):
+        def fn(doc):
+            key = f"{follower_id}_{target_id}"
+            if key in doc:
+                return False
+            doc[key] = True
+            return True
+        return await self._update(FOLLOWS_FILE, fn)
+
+    async def load_follows(self):
+        doc = await self.load(FOLLOWS_FILE, dict)
+        return [tuple(int(part) for part in key.split("_", 1)) for key in doc]
+
+    async def mark_engaged_many(self, items):
+        def fn(doc):
+            for key, task_type in items:
+                doc.setdefault(key, {})[task_type] = True
+        await self._update(ENGAGEMENT_FILE, fn)
+
+    async def load_engagements(self):
+        return await self.load(ENGAGEMENT_FILE, dict)
+
+    async def load_giver_stats(self):
+        doc = await self.load(GIVER_FILE, dict)
+        return {k: (v, doc.get(f"{k}_total", 0)) for k, v in doc.items() if not k.endswith("_total")}
+
+    async def save_giver_stats(self, stats, changed=None):
+        doc = {}
+        for user_id, (count, total) in stats.items():
+            doc[user_id] = count
+            doc[f"{user_id}_total"] = total
+        await self.save(GIVER_FILE, doc)
+
+    async def load_pending(self):
+        return await self.load(PENDING_FILE, dict)
+
+    async def save_pending(self, pending, changed=None):
+        await self.save(PENDING_FILE, pending)
+
+    async def load_mutes(self):
+        return await self.load(MUTES_FILE, dict)
+
+    async def put_mute(self, key, data):
+        def fn(doc):
+            doc[key] = data
+        await self._update(MUTES_FILE, fn)
+
+    async def pop_mute(self, key):
+        return await self._update(MUTES_FILE, lambda doc: doc.pop(key, None))
+
+    async def load_preferences(self):
+        return await self.load(PREFERENCES_FILE, dict)
+
+    async def put_preferences(self, user_id, data):
+        def fn(doc):
+            doc[str(user_id)] = data
+        await self._update(PREFERENCES_FILE, fn)
+
+    async def apply_records(self, records):
+        # Satu kali tulis per dokumen yang tersentuh
+        by_store = {}
+        for record in records:
+            by_store.setdefault(record["store"], []).append(record)
+        for name, items in by_store.items():
+            def fn(doc, items=items):
+                for record in items:
+                    if record["value"] is None:
+                        doc.pop(str(record["key"]), None)
+                    else:
+                        doc[str(record["key"])] = record["value"]
+            await self._update(name, fn)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS balances (
+    user_id TEXT PRIMARY KEY,
+    balance REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS requests (
+    message_id TEXT PRIMARY KEY,
+    requester_id TEXT NOT NULL,
+    expiry_timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_requests_expiry ON requests (expiry_timestamp);
+
+CREATE TABLE IF NOT EXISTS follows (
+    follower_id INTEGER NOT NULL,
+    target_id INTEGER NOT NULL,
+    PRIMARY KEY (follower_id, target_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_follows_target ON follows (target_id, follower_id);
+
+CREATE TABLE IF NOT EXISTS engagements (
+    engagement_key TEXT NOT NULL,
+    task_type TEXT NOT NULL,
+    PRIMARY KEY (engagement_key, task_type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS giver_stats (
+    user_id TEXT PRIMARY KEY,
+    give_count INTEGER NOT NULL DEFAULT 0,
+    total_given REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS pending (
+    dm_message_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS mutes (
+    mute_key TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SqliteStorage(Storage):
+    # Implementasi SQLite (WAL). Semua akses lewat satu thread worker supaya
+    # koneksi tidak dipakai bersamaan dan event loop tidak ikut terblokir.
+
+    def __init__(self, path='bot.db'):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SQLITE_SCHEMA)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def fingerprint(self):
+        return file_fingerprint((self.path, f"{self.path}-wal"))
+
+    async def close(self):
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+    # --- Dokumen utuh (format JSON lama) ---
+    def _load_doc(self, name):
+        conn = self._conn
+        if name == POINTS_FILE:
+            return dict(conn.execute("SELECT user_id, balance FROM balances"))
+        if name == REQUESTS_FILE:
+            return {msg_id: json.loads(data) for msg_id, data in conn.execute("SELECT message_id, data FROM requests")}
+        if name == FOLLOWS_FILE:
+            return {f"{f}_{t}": True for f, t in conn.execute("SELECT follower_id, target_id FROM follows")}
+        if name == ENGAGEMENT_FILE:
+            doc = {}
+            for key, task_type in conn.execute("SELECT engagement_key, task_type FROM engagements"):
+                doc.setdefault(key, {})[task_type] = True
+            return doc
+        if name == GIVER_FILE:
+            doc = {}
+            for user_id, count, total in conn.execute("SELECT user_id, give_count, total_given FROM giver_stats"):
+                doc[user_id] = count
+                doc[f"{user_id}_total"] = total
+            return doc
+        if name == PENDING_FILE:
+            return {dm_id: json.loads(data) for dm_id, data in conn.execute("SELECT dm_message_id, data FROM pending")}
+        if name == MUTES_FILE:
+            return {key: json.loads(data) for key, data in conn.execute("SELECT mute_key, data FROM mutes")}
+        if name == PREFERENCES_FILE:
+            return {user_id: json.loads(data) for user_id, data in conn.execute("SELECT user_id, data FROM preferences")}
+        raise KeyError(f"Dokumen tidak dikenal: {name}")
+
+    def _save_doc(self, name, data):
+        with self._conn as conn:
+            if name == POINTS_FILE:
+                conn.execute("DELETE FROM balances")
+                conn.executemany("INSERT INTO balances VALUES (?, ?)", data.items())
+            elif name == REQUESTS_FILE:
+                conn.execute("DELETE FROM requests")
+                conn.executemany("INSERT INTO requests VALUES (?, ?, ?, ?)", (self._request_row(k, v) for k, v in data.items()))
+            elif name == FOLLOWS_FILE:
+                conn.execute("DELETE FROM follows")
+                rows = (tuple(int(part) for part in key.split("_", 1)) for key in data)
+                conn.executemany("INSERT OR IGNORE INTO follows VALUES (?, ?)", rows)
+            elif name == ENGAGEMENT_FILE:
+                conn.execute("DELETE FROM engagements")
+                rows = ((key, t) for key, types in data.items() for t, done in types.items() if done)
+                conn.executemany("INSERT OR IGNORE INTO engagements VALUES (?, ?)", rows)
+            elif name == GIVER_FILE:
+                conn.execute("DELETE FROM giver_stats")
+                rows = ((k, v, data.get(f"{k}_total", 0)) for k, v in data.items() if not k.endswith("_total"))
+                conn.executemany("INSERT INTO giver_stats VALUES (?, ?, ?)", rows)
+            elif name == PENDING_FILE:
+                conn.execute("DELETE FROM pending")
+                conn.executemany("INSERT INTO pending VALUES (?, ?)", ((k, json.dumps(v)) for k, v in data.items()))
+            elif name == MUTES_FILE:
+                conn.execute("DELETE FROM mutes")
+                conn.executemany("INSERT INTO mutes VALUES (?, ?)", ((k, json.dumps(v)) for k, v in data.items()))
+            elif name == PREFERENCES_FILE:
+                conn.execute("DELETE FROM preferences")
+                conn.executemany("INSERT INTO preferences VALUES (?, ?)", ((k, json.dumps(v)) for k, v in data.items()))
+            else:
+                raise KeyError(f"Dokumen tidak dikenal: {name}")
+
+    @staticmethod
+    def _request_row(msg_id, request):
+        return (str(msg_id), str(request["requester_id"]), int(request.get("expiry_timestamp", 0)), json.dumps(request))
+
+    async def load(self, name, default=None):
+        return await self._run(self._load_doc, name)
+
+    async def save(self, name, data):
+        await self._run(self._save_doc, name, data)
+
+    # --- Saldo ---
+    async def load_balances(self):
+        return await self.load(POINTS_FILE)
+
+    def _save_balances(self, balances, changed):
+        if changed is None:
+            self._save_doc(POINTS_FILE, balances)
+            return
+        with self._conn as conn:
+            conn.executemany(
+                "INSERT INTO balances VALUES (?, ?) ON CONFLICT(user_id) DO UPDATE SET balance = excluded.balance",
+                ((k, v) for k, v in changed.items() if v is not None),
+            )
+            conn.executemany("DELETE FROM balances WHERE user_id = ?", ((k,) for k, v in changed.items() if v is None))
+
+    async def save_balances(self, balances, changed=None):
+        await self._run(self._save_balances, balances, changed)
+
+    # --- Request ---
+    def _save_requests(self, requests, changed):
+        if changed is None:
+            self._save_doc(REQUESTS_FILE, requests)
+            return
+        with self._conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO requests VALUES (?, ?, ?, ?)",
+                (self._request_row(k, v) for k, v in changed.items() if v is not None),
+            )
+            conn.executemany("DELETE FROM requests WHERE message_id = ?", ((k,) for k, v in changed.items() if v is None))
+
+    async def load_requests(self):
+        return await self.load(REQUESTS_FILE)
+
+    async def save_requests(self, requests, changed=None):
+        await self._run(self._save_requests, requests, changed)
+
+    # --- Follow ---
+    def _add_follow(self, follower_id, target_id):
+        with self._conn as conn:
+            cur = conn.execute("INSERT OR IGNORE INTO follows VALUES (?, ?)", (int(follower_id), int(target_id)))
+            return cur.rowcount > 0
+
+    async def add_follow(self, follower_id, target_id):
+        return await self._run(self._add_follow, follower_id, target_id)
+
+    async def load_follows(self):
+        return await self._run(lambda: self._conn.execute("SELECT follower_id, target_id FROM follows").fetchall())
+
+    # --- Engagement ---
+    def _mark_engaged_many(self, items):
+        with self._conn as conn:
+            conn.executemany("INSERT OR IGNORE INTO engagements VALUES (?, ?)", items)
+
+    async def mark_engaged_many(self, items):
+        await self._run(self._mark_engaged_many, list(items))
+
+    async def load_engagements(self):
+        return await self.load(ENGAGEMENT_FILE)
+
+    # --- Statistik pemberi poin ---
+    def _save_giver_stats(self, stats, changed):
+        with self._conn as conn:
+            if changed is None:
+                conn.execute("DELETE FROM giver_stats")
+                changed = stats
+            conn.executemany(
+                "INSERT OR REPLACE INTO giver_stats VALUES (?, ?, ?)",
+                ((user_id, count, total) for user_id, (count, total) in changed.items()),
+            )
+
+    async def load_giver_stats(self):
+        rows = await self._run(lambda: self._conn.execute("SELECT user_id, give_count, total_given FROM giver_stats").fetchall())
+        return {user_id: (count, total) for user_id, count, total in rows}
+
+    async def save_giver_stats(self, stats, changed=None):
+        await self._run(self._save_giver_stats, stats, changed)
+
+    # --- Konfirmasi pending ---
+    def _save_pending(self, pending, changed):
+        if changed is None:
+            self._save_doc(PENDING_FILE, pending)
+            return
+        with self._conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pending VALUES (?, ?)",
+                ((k, json.dumps(v)) for k, v in changed.items() if v is not None),
+            )
+            conn.executemany("DELETE FROM pending WHERE dm_message_id = ?", ((k,) for k, v in changed.items() if v is None))
+
+    async def load_pending(self):
+        return await self.load(PENDING_FILE)
+
+    async def save_pending(self, pending, changed=None):
+        await self._run(self._save_pending, pending, changed)
+
+    # --- Mute aktif ---
+    def _put_mute(self, key, data):
+        with self._conn as conn:
+            conn.execute("INSERT OR REPLACE INTO mutes VALUES (?, ?)", (key, json.dumps(data)))
+
+    def _pop_mute(self, key):
+        with self._conn as conn:
+            row = conn.execute("SELECT data FROM mutes WHERE mute_key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM mutes WHERE mute_key = ?", (key,))
+            return json.loads(row[0])
+
+    async def load_mutes(self):
+        return await self.load(MUTES_FILE)
+
+    async def put_mute(self, key, data):
+        await self._run(self._put_mute, key, data)
+
+    async def pop_mute(self, key):
+        return await self._run(self._pop_mute, key)
+
+    # --- Preferensi user ---
+    def _put_preferences(self, user_id, data):
+        with self._conn as conn:
+            conn.execute("INSERT OR REPLACE INTO preferences VALUES (?, ?)", (str(user_id), json.dumps(data)))
+
+    async def load_preferences(self):
+        return await self.load(PREFERENCES_FILE)
+
+    async def put_preferences(self, user_id, data):
+        await self._run(self._put_preferences, user_id, data)
+
+    # --- Batch ---
+    def _apply_records(self, records):
+        # Semua record dalam satu transaksi
+        with self._conn as conn:
+            for record in records:
+                key, value = str(record["key"]), record["value"]
+                if record["store"] == REQUESTS_FILE:
+                    if value is None:
+                        conn.execute("DELETE FROM requests WHERE message_id = ?", (key,))
+                    else:
+                        conn.execute("INSERT OR REPLACE INTO requests VALUES (?, ?, ?, ?)", self._request_row(key, value))
+                elif record["store"] == PENDING_FILE:
+                    if value is None:
+                        conn.execute("DELETE FROM pending WHERE dm_message_id = ?", (key,))
+                    else:
+                        conn.execute("INSERT OR REPLACE INTO pending VALUES (?, ?)", (key, json.dumps(value)))
+                else:
+                    raise KeyError(f"Store tidak dikenal: {record['store']}")
+
+    async def apply_records(self, records):
+        await self._run(self._apply_records, list(records))
+
+
+def open_storage(backend='json', json_dir='.', sqlite_path='bot.db', locks=None):
+    if backend == 'sqlite':
+        return SqliteStorage(sqlite_path)
+    if backend == 'json':
+        return JsonStorage(json_dir, locks=locks)
+    raise ValueError(f"Storage backend tidak dikenal: {backend}")
+
+
+# --- Replay journal ledger di luar bot ---
+def replay_balances(balances, journal_records):
+    # Terapkan transaksi yang belum dipadatkan ke snapshot saldo
+    for record in journal_records:
+        for leg in record["legs"]:
+            if leg["balance"] is None:
+                balances.pop(leg["key"], None)
+            else:
+                balances[leg["key"]] = leg["balance"]
+    return balances
+
+
+def replay_engagements(log, journal_records):
+    # Tanda engagement dari klaim ada di journal sampai compaction
+    for record in journal_records:
+        for item in record.get("records", ()):
+            if item["store"] == ENGAGEMENT_FILE:
+                log.setdefault(item["key"], {})[item["task"]] = True
+    return log
+
+
+def replay_pending(pending, journal_records):
+    # Konfirmasi pending yang dibuat / diselesaikan ada di journal sampai compaction
+    for record in journal_records:
+        for item in record.get("records", ()):
+            if item["store"] == PENDING_FILE:
+                if item["value"] is None:
+                    pending.pop(str(item["key"]), None)
+                else:
+                    pending[str(item["key"])] = item["value"]
+    return pending
+
+
+def replay_giver_stats(doc, journal_records):
+    # Statistik !givepoint ada di journal sampai compaction; doc berformat
+    # giver_count.json ({user_id: jumlah, "<user_id>_total": total})
+    for record in journal_records:
+        for item in record.get("records", ()):
+            if item["store"] == GIVER_FILE:
+                count, total = item["value"]
+                doc[str(item["key"])] = count
+                doc[f"{item['key']}_total"] = total
+    return doc
+
+
+def replay_requests(requests, journal_records):
+    # Perubahan request (klaim, reaksi, settlement) ada di journal sampai compaction
+    from request_store import RequestStore
+    store = RequestStore()
+    store.load(requests)
+    for record in journal_records:
+        for item in record.get("records", ()):
+            if item["store"] == REQUESTS_FILE:
+                store.apply(item)
+    return store.all()
+
+
+# --- Migrasi JSON -> SQLite ---
+def migrate_json_to_sqlite(json_dir, sqlite_path):
+    source = JsonStorage(json_dir)
+    target = SqliteStorage(sqlite_path)
+    journal = Journal(os.path.join(json_dir, POINTS_JOURNAL_FILE)).read()
+    try:
+        for name in DOCUMENTS:
+            data = source._read(name, dict)
+            if name == POINTS_FILE:
+                data = replay_balances(data, journal)
+            elif name == REQUESTS_FILE:
+                data = replay_requests(data, journal)
+            elif name == ENGAGEMENT_FILE:
+                data = replay_engagements(data, journal)
+            elif name == PENDING_FILE:
+                data = replay_pending(data, journal)
+            elif name == GIVER_FILE:
+                data = replay_giver_stats(data, journal)
+            target._save_doc(name, data)
+            print(f"✅ {name}: {len(data)} entri diimpor")
+    finally:
+        target._conn.close()
+        target._executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Utilitas storage bot engagement")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Impor file JSON lama ke database SQLite")
+    migrate.add_argument("--json-dir", default=".")
+    migrate.add_argument("--db", default="bot.db")
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_json_to_sqlite(args.json_dir, args.db)
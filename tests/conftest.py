@@ -0,0 +1,31 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Modul bot ada di root repo (lihat juga benchmarks/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+class FakeClock:
+    # Jam dinding palsu untuk store / lease: maju hanya lewat advance()
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def run():
+    # Test ditulis sinkron; coroutine dijalankan di event loop baru
+    return asyncio.run
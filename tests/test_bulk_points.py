@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+from discord.ext import commands
+
+import main
+from bulk_points import BulkAdjustment, parse_csv, parse_user_id
+
+
+def member(user_id, bot=False):
+    return SimpleNamespace(id=user_id, bot=bot)
+
+
+def apply_rows(text, default=None, limit=20, max_targets=100):
+    rows, errors = parse_csv(text)
+    batch = BulkAdjustment(limit, max_targets)
+    batch.errors.extend(errors)
+    for line_no, user_id, amount in rows:
+        batch.add(member(user_id), amount if amount is not None else default, f"baris {line_no}")
+    return batch
+
+
+def test_parse_user_id():
+    assert parse_user_id(" <@123> ") == 123
+    assert parse_user_id("<@!123>") == 123
+    assert parse_user_id("123") == 123
+    assert parse_user_id("<@abc>") is None
+    assert parse_user_id("-5") is None
+
+
+def test_bad_amount_reports_row():
+    rows, errors = parse_csv("user,jumlah\n<@1>,5\n2,lima\n<@x>,3\n\n4,\n")
+    assert rows == [(2, 1, 5.0), (6, 4, None)]
+    assert errors == ["baris 3: jumlah `lima` bukan angka", "baris 4: user `<@x>` tidak valid"]
+
+    batch = apply_rows("1,5\n2,25\n3,0\n4,\n")
+    assert not batch.validate()
+    assert batch.errors == [
+        "baris 2: jumlah harus antara -20 hingga 20 dan bukan 0",
+        "baris 3: jumlah harus antara -20 hingga 20 dan bukan 0",
+        "baris 4: jumlah poin tidak diisi",
+    ]
+
+
+def test_duplicate_user_counted_once():
+    batch = apply_rows("<@1>,5\n1,7\n<@!1>,2\n2\n", default=3)
+    assert batch.validate()
+    assert batch.amounts == {1: 5.0, 2: 3}
+    assert batch.duplicates == 2
+
+
+def test_negative_total():
+    batch = apply_rows("1,-5\n2,-7.5\n3,2\n")
+    assert batch.validate()
+    assert batch.credited == 2.0
+    assert batch.debited == 12.5
+    assert batch.credited - batch.debited == -10.5
+
+    batch = apply_rows("1,-21\n")
+    assert not batch.validate()
+    assert batch.errors == ["baris 1: jumlah harus antara -20 hingga 20 dan bukan 0"]
+
+
+def test_bots_and_missing_members_and_target_limit():
+    batch = BulkAdjustment(20, 2)
+    batch.add(member(1, bot=True), 5, "baris 1")
+    batch.add(None, 5, "baris 2")
+    assert batch.bots == 1
+    assert batch.errors == ["baris 2: bukan member server ini"]
+
+    batch = apply_rows("1,1\n2,1\n3,1\n", max_targets=2)
+    assert not batch.validate()
+    assert batch.errors == ["terlalu banyak target (3, maksimal 2)"]
+    assert not BulkAdjustment(20, 2).validate()
+
+
+def test_unknown_target_reported_instead_of_raised(monkeypatch, run):
+    async def not_member(self, ctx, argument):
+        raise commands.MemberNotFound(argument)
+
+    async def not_role(self, ctx, argument):
+        raise commands.RoleNotFound(argument)
+
+    monkeypatch.setattr(commands.MemberConverter, "convert", not_member)
+    monkeypatch.setattr(commands.RoleConverter, "convert", not_role)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    ctx = SimpleNamespace(message=SimpleNamespace(attachments=[]), send=send)
+    run(main.bulk_point.callback(ctx, 5.0, "<@999>"))
+    assert sent == ["❌ Bulk poin dibatalkan, tidak ada poin yang diubah:\n• `<@999>`: bukan member atau role server ini"]
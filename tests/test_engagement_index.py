@@ -0,0 +1,88 @@
+import os
+import random
+
+from engagement_index import EngagementIndex
+from journal import Journal
+from ledger import PointsLedger
+from storage import POINTS_JOURNAL_FILE, JsonStorage
+
+
+def test_bloom_grows_with_small_index():
+    # Guild baru: filter awal 1024 key harus diperbesar sebelum merge
+    rng = random.Random(1)
+    index = EngagementIndex(bloom=True, merge_threshold=65536)
+    index.load({})
+    added = [f"{rng.getrandbits(64):016x}" for _ in range(20000)]
+    for key in added:
+        index.add(key, "like")
+
+    assert index._delta  # belum ada merge
+    assert index._bloom.capacity >= len(index)
+    assert all(index.contains(key, "like") for key in added)
+
+    misses = [f"{rng.getrandbits(64):016x}" for _ in range(20000)]
+    false_positives = sum(index._bloom.might_contain(int(key, 16)) for key in misses)
+    assert false_positives / len(misses) < 0.05
+
+
+async def open_guild(directory, storage=None):
+    storage = storage or JsonStorage(directory)
+    index = EngagementIndex(flush_interval=3600)
+    await index.open(storage)
+    ledger = PointsLedger(
+        storage, os.path.join(directory, POINTS_JOURNAL_FILE), flush_interval=3600, engagements=index
+    )
+    await ledger.open()
+    return storage, index, ledger
+
+
+def crash(*components):
+    for component in components:
+        component._closing = True
+        component._task.cancel()
+
+
+def test_marks_survive_crash_before_flush(tmp_path, run):
+    directory = str(tmp_path)
+    key = "00000000000000ab"
+
+    async def claim():
+        _, index, ledger = await open_guild(directory)
+        await ledger.commit([ledger._leg("reward", "5", 1.0)], [index.stage(key, "like")])
+        assert index.stage(key, "like") is None  # sudah ditandai
+        crash(index, ledger)
+
+    async def reopen():
+        storage, index, ledger = await open_guild(directory)
+        marked = index.contains(key, "like")
+        await ledger.close()
+        await index.close()
+        return marked, await storage.load_engagements()
+
+    run(claim())
+    # Belum pernah di-flush ke engagement_log.json
+    assert run(JsonStorage(directory).load_engagements()) == {}
+    marked, saved = run(reopen())
+    assert marked
+    # Replay di open() dipadatkan: tanda tersimpan, journal kosong
+    assert saved == {key: {"like": True}}
+    assert Journal(os.path.join(directory, POINTS_JOURNAL_FILE)).read() == []
+
+
+class FailingStorage(JsonStorage):
+    async def mark_engaged_many(self, items):
+        raise OSError("disk penuh")
+
+
+def test_journal_kept_when_marks_not_flushed(tmp_path, run):
+    directory = str(tmp_path)
+
+    async def scenario():
+        _, index, ledger = await open_guild(directory, FailingStorage(directory))
+        await ledger.commit([], [index.stage("00000000000000cd", "retweet")])
+        await ledger.compact()
+        crash(index, ledger)
+
+    run(scenario())
+    records = Journal(os.path.join(directory, POINTS_JOURNAL_FILE)).read()
+    assert [item["key"] for record in records for item in record["records"]] == ["00000000000000cd"]
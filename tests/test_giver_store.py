@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from giver_store import GiverStore
+from journal import Journal
+from ledger import PointsLedger
+from storage import GIVER_FILE, POINTS_JOURNAL_FILE, JsonStorage, SqliteStorage, migrate_json_to_sqlite
+
+
+async def open_ledger(storage, directory):
+    givers = GiverStore()
+    givers.load(await storage.load_giver_stats())
+    ledger = PointsLedger(
+        storage, os.path.join(directory, POINTS_JOURNAL_FILE), flush_interval=3600, givers=givers
+    )
+    await ledger.open()
+    return givers, ledger
+
+
+async def give(ledger, givers, giver_id, receiver_id, amount):
+    legs = ledger.stage_transfer(giver_id, receiver_id, amount, tax=0.5)
+    await ledger.commit(legs, [givers.stage_add(giver_id, amount)])
+
+
+async def give_and_crash(storage, directory):
+    givers, ledger = await open_ledger(storage, directory)
+    await ledger.commit(ledger.stage_adjust("1", 20))
+    await give(ledger, givers, "1", "2", 3)
+    await give(ledger, givers, "1", "3", 1)
+    await give(ledger, givers, "2", "1", 2)
+    ledger._closing = True
+    ledger._task.cancel()
+    return givers.all()
+
+
+EXPECTED = {"1": (2, 4), "2": (1, 2)}
+
+
+def open_storage(backend, tmp_path):
+    if backend == "sqlite":
+        return SqliteStorage(str(tmp_path / "bot.db"))
+    return JsonStorage(str(tmp_path))
+
+
+def test_stats_share_journal_line_with_transfer(tmp_path, run):
+    directory = str(tmp_path)
+    assert run(give_and_crash(JsonStorage(directory), directory)) == EXPECTED
+    records = Journal(os.path.join(directory, POINTS_JOURNAL_FILE)).read()
+    assert len(records) == 4
+    assert [item["store"] for item in records[1]["records"]] == [GIVER_FILE]
+    assert [leg["key"] for leg in records[1]["legs"]] == ["1", "2", "1"]
+    # giver_count.json baru ditulis saat compaction
+    assert not os.path.exists(os.path.join(directory, GIVER_FILE))
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_stats_recovered_and_compacted_after_crash(tmp_path, run, backend):
+    directory = str(tmp_path)
+
+    async def scenario():
+        await give_and_crash(open_storage(backend, tmp_path), directory)
+        storage = open_storage(backend, tmp_path)
+        givers, ledger = await open_ledger(storage, directory)
+        recovered = givers.all()
+        # Perubahan setelah replay hanya menulis user yang berubah
+        await give(ledger, givers, "3", "1", 1)
+        await ledger.close()
+        saved = await storage.load_giver_stats()
+        await storage.close()
+        return recovered, saved
+
+    recovered, saved = run(scenario())
+    assert recovered == EXPECTED
+    assert saved == {**EXPECTED, "3": (1, 1)}
+    assert Journal(os.path.join(directory, POINTS_JOURNAL_FILE)).read() == []
+
+
+def test_migrate_replays_stats_from_journal(tmp_path, run):
+    directory = str(tmp_path / "json")
+    os.makedirs(directory)
+    run(give_and_crash(JsonStorage(directory), directory))
+    db_path = str(tmp_path / "bot.db")
+    migrate_json_to_sqlite(directory, db_path)
+
+    async def load():
+        storage = SqliteStorage(db_path)
+        try:
+            return await storage.load_giver_stats()
+        finally:
+            await storage.close()
+
+    assert run(load()) == EXPECTED
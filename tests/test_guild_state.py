@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from guild_state import SETTINGS_FILE, GuildState, load_settings
+from journal import Journal
+from shared_state import InProcessStateStore, LeaseCoordinator
+from storage import POINTS_JOURNAL_FILE, JsonStorage
+
+
+def make_state(directory):
+    return GuildState(1, directory, render=lambda request: None, ledger_flush_interval=3600)
+
+
+def test_lost_lease_does_not_overwrite_new_owner(tmp_path, clock, run):
+    directory = str(tmp_path)
+    journal_path = os.path.join(directory, POINTS_JOURNAL_FILE)
+
+    async def scenario():
+        store = InProcessStateStore(clock=clock)
+        old = make_state(directory)
+
+        async def on_lost(name):
+            await old.abandon()
+
+        first = LeaseCoordinator(store, "proses-a", ttl=30, on_lost=on_lost)
+        second = LeaseCoordinator(store, "proses-b", ttl=30)
+        assert await first.acquire("guild:1")
+        await old.open()
+        await old.ledger.commit(old.ledger.stage_adjust("5", 10))
+        old.ledger.credit("6", 1)  # belum di-fsync saat lease hilang
+
+        # Proses A macet melewati TTL; B mengambil alih dan me-replay journal A
+        clock.advance(31)
+        assert await second.acquire("guild:1", wait=False)
+        new = make_state(directory)
+        await new.open()
+        await new.ledger.commit(new.ledger.stage_adjust("7", 3))
+        assert len(Journal(journal_path).read()) == 1
+
+        # A sadar lease-nya hilang dan membuang state-nya
+        await first._tick()
+        await asyncio.gather(*first._lost_tasks)
+        with pytest.raises(RuntimeError):
+            await old.ledger.commit(old.ledger.stage_adjust("5", 1))
+
+        # Journal dan storage milik B tidak disentuh A
+        assert len(Journal(journal_path).read()) == 1
+        saved = await JsonStorage(directory).load_balances()
+        await new.close()
+        return saved, await JsonStorage(directory).load_balances()
+
+    saved, closed = run(scenario())
+    assert saved == {"5": 10.0}
+    assert closed == {"5": 10.0, "7": 3.0}
+    assert Journal(journal_path).read() == []
+
+
+def test_settings_override_defaults_per_guild(tmp_path):
+    defaults = {
+        "prices": {"like": 0.5, "comment": 1.0},
+        "role_tiers": [(100, "whale"), (5, "donasi")],
+        "confirm_mode": "satuan",
+    }
+    (tmp_path / "1").mkdir()
+    (tmp_path / "1" / SETTINGS_FILE).write_text(json.dumps({
+        "prices": {"like": 1.0, "baru": 9},
+        "role_tiers": {"donasi": 200},
+        "confirm_mode": "gabung",
+    }))
+
+    settings = load_settings(str(tmp_path / "1"), defaults)
+    assert settings == {
+        "prices": {"like": 1.0, "comment": 1.0},
+        "role_tiers": [(200, "donasi"), (100, "whale")],
+        "confirm_mode": "gabung",
+    }
+    # Guild lain tanpa settings.json memakai default
+    assert load_settings(str(tmp_path / "2"), defaults) == defaults
@@ -0,0 +1,99 @@
+import bisect
+import random
+
+import pytest
+
+from leaderboard import IndexableSkipList, Leaderboard
+
+TIERS = [(100, "whale"), (50, "sultan"), (9, "menengah"), (5, "donasi")]
+
+
+def check_skip_list(ranks, oracle, rng):
+    assert len(ranks) == len(oracle)
+    assert [ranks[i] for i in range(len(oracle))] == oracle
+    for _ in range(50):
+        start, count = rng.randrange(len(oracle) + 2), rng.randrange(12)
+        assert ranks.slice(start, count) == oracle[start:start + count]
+        probe = (rng.randrange(-5, 25), rng.randrange(30))
+        assert ranks.bisect_left(probe) == bisect.bisect_left(oracle, probe)
+    with pytest.raises(IndexError):
+        ranks[len(oracle)]
+
+
+@pytest.mark.parametrize("built", [False, True])
+def test_skip_list_matches_sorted_oracle(built):
+    # Skor sempit (0..19) supaya banyak nilai sama; id membedakan item
+    rng = random.Random(7)
+    oracle = sorted({(rng.randrange(20), rng.randrange(30)) for _ in range(200)})
+    ranks = IndexableSkipList(rng=random.Random(1))
+    if built:
+        ranks.build(oracle)
+    else:
+        for value in rng.sample(oracle, len(oracle)):
+            ranks.insert(value)
+    check_skip_list(ranks, oracle, rng)
+
+    for _ in range(300):
+        if oracle and rng.random() < 0.5:
+            value = oracle.pop(rng.randrange(len(oracle)))
+            ranks.remove(value)
+        else:
+            value = (rng.randrange(20), rng.randrange(30))
+            if value in oracle:
+                continue
+            bisect.insort(oracle, value)
+            ranks.insert(value)
+    check_skip_list(ranks, oracle, rng)
+    with pytest.raises(KeyError):
+        ranks.remove((99, 99))
+
+
+def expected_top(balances):
+    return [(int(key), balance) for key, balance in sorted(balances.items(), key=lambda kv: (-kv[1], int(kv[0])))]
+
+
+def expected_tiers(board, balances):
+    counts = {key: 0 for _, key in TIERS}
+    counts[None] = 0
+    for balance in balances.values():
+        counts[board.tier(balance)] += 1
+    return counts
+
+
+def test_leaderboard_rank_range_and_updates_match_oracle(run):
+    rng = random.Random(3)
+    balances = {str(user_id): float(rng.randrange(0, 120, 5)) for user_id in range(1, 150)}
+
+    async def scenario():
+        board = Leaderboard(TIERS)
+        loading = board.load({**balances, "escrow_77": 30.0})
+        # Perubahan selama build di thread ditahan lalu diterapkan
+        board.update("1", 500.0)
+        balances["1"] = 500.0
+        await loading
+        return board
+
+    board = run(scenario())
+    for _ in range(400):
+        key = str(rng.randrange(1, 200))
+        if key in balances and rng.random() < 0.1:
+            board.update(key, None)
+            del balances[key]
+        else:
+            # Kelipatan 5: banyak user dengan saldo sama
+            balance = float(rng.randrange(0, 120, 5))
+            board.update(key, balance)
+            balances[key] = balance
+        board.update(f"escrow_{key}", 10.0)
+
+    top = expected_top(balances)
+    assert len(board) == len(balances)
+    assert board.top(len(balances) + 5) == top
+    for offset in (0, 1, 10, len(top) - 3, len(top)):
+        assert board.top(10, offset=offset) == top[offset:offset + 10]
+    for key, balance in balances.items():
+        # Saldo sama = peringkat sama: 1 + jumlah user dengan saldo lebih tinggi
+        assert board.rank(key) == (1 + sum(other > balance for other in balances.values()), balance)
+    assert board.rank("escrow_1") is None
+    assert board.rank("999") is None
+    assert board.tier_counts == expected_tiers(board, balances)
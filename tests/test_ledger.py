@@ -0,0 +1,133 @@
+import os
+
+from journal import Journal
+from ledger import PointsLedger
+from storage import POINTS_JOURNAL_FILE, JsonStorage, replay_balances
+
+
+async def open_ledger(directory, storage=None):
+    storage = storage or JsonStorage(directory)
+    ledger = PointsLedger(storage, os.path.join(directory, POINTS_JOURNAL_FILE), flush_interval=3600)
+    await ledger.open()
+    return storage, ledger
+
+
+def crash(ledger):
+    ledger._closing = True
+    ledger._task.cancel()
+
+
+async def trade(ledger):
+    await ledger.commit(ledger.stage_adjust("1", 20))
+    await ledger.commit(ledger.stage_transfer("1", "2", 5, tax=1, subsidy=0.5))
+    ledger.hold_escrow("2", "escrow_9", 3)
+    await ledger.commit(ledger.stage_release_escrow("escrow_9", "2")[1])
+    await ledger.commit(ledger.stage_transfer("2", "1", 1.5))
+
+
+EXPECTED = {"1": 15.5, "2": 4.0}
+
+
+def test_reopen_after_crash_restores_balances(tmp_path, run):
+    directory = str(tmp_path)
+
+    async def scenario():
+        _, ledger = await open_ledger(directory)
+        await trade(ledger)
+        crash(ledger)
+        storage, ledger = await open_ledger(directory)
+        balances = dict(ledger.balances)
+        await ledger.close()
+        return balances, await storage.load_balances()
+
+    balances, saved = run(scenario())
+    assert balances == EXPECTED
+    assert saved == EXPECTED
+    assert Journal(os.path.join(directory, POINTS_JOURNAL_FILE)).read() == []
+
+
+def test_torn_last_line_ignored_and_repaired(tmp_path, run):
+    directory = str(tmp_path)
+    path = os.path.join(directory, POINTS_JOURNAL_FILE)
+
+    async def commit_and_crash():
+        _, ledger = await open_ledger(directory)
+        await trade(ledger)
+        crash(ledger)
+
+    run(commit_and_crash())
+    # Crash di tengah menulis baris berikutnya
+    with open(path, "a") as f:
+        f.write('{"ts": 1, "legs": [{"type": "credit", "key": "1", "amo')
+
+    journal = Journal(path)
+    assert len(journal.read()) == 5
+    assert journal.torn
+
+    class NoCompaction(JsonStorage):
+        async def save_balances(self, balances, changed=None):
+            raise OSError("disk penuh")
+
+    async def reopen():
+        # Compaction gagal: journal harus tetap bisa ditambah tanpa
+        # tersambung ke baris yang terpotong
+        _, ledger = await open_ledger(directory, NoCompaction(directory))
+        await ledger.commit(ledger.stage_adjust("3", 2))
+        crash(ledger)
+        _, ledger = await open_ledger(directory)
+        balances = dict(ledger.balances)
+        await ledger.close()
+        return balances
+
+    assert run(reopen()) == {**EXPECTED, "3": 2.0}
+
+
+def test_replay_twice_is_idempotent(tmp_path, run):
+    directory = str(tmp_path)
+
+    async def commit_and_crash():
+        _, ledger = await open_ledger(directory)
+        await trade(ledger)
+        crash(ledger)
+
+    run(commit_and_crash())
+    records = Journal(os.path.join(directory, POINTS_JOURNAL_FILE)).read()
+    # Leg menyimpan saldo akhir, bukan selisih
+    assert replay_balances({}, records) == EXPECTED
+    assert replay_balances(replay_balances({}, records), records) == EXPECTED
+    assert replay_balances({}, records + records) == EXPECTED
+
+
+def test_crash_between_save_and_truncate(tmp_path, run):
+    directory = str(tmp_path)
+    path = os.path.join(directory, POINTS_JOURNAL_FILE)
+
+    async def compact_then_crash():
+        storage, ledger = await open_ledger(directory)
+        await trade(ledger)
+
+        async def crash_before_truncate():
+            raise OSError("crash")
+
+        ledger.journal.truncate = crash_before_truncate
+        await ledger.compact()
+        crash(ledger)
+        return await storage.load_balances()
+
+    saved = run(compact_then_crash())
+    # Saldo sudah di storage, journal belum dipotong
+    assert saved == EXPECTED
+    assert len(Journal(path).read()) == 5
+
+    async def reopen():
+        storage, ledger = await open_ledger(directory)
+        balances = dict(ledger.balances)
+        await ledger.commit(ledger.stage_adjust("1", 1))
+        await ledger.close()
+        return balances, await storage.load_balances()
+
+    balances, saved = run(reopen())
+    # Replay di atas snapshot yang sudah memuat journal tidak menghitung dua kali
+    assert balances == EXPECTED
+    assert saved == {**EXPECTED, "1": 16.5}
+    assert Journal(path).read() == []
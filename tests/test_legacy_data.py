@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from storage import POINTS_FILE, POINTS_JOURNAL_FILE
+
+
+@pytest.fixture
+def legacy_dir(tmp_path, monkeypatch):
+    # Direktori kerja bot satu server: file data langsung di root
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "LEGACY_GUILD_ID", None)
+    (tmp_path / POINTS_FILE).write_text('{"5": 10.0}')
+    (tmp_path / POINTS_JOURNAL_FILE).write_text("")
+    return tmp_path
+
+
+def test_legacy_data_adopted_by_only_guild(legacy_dir):
+    assert main.adopt_legacy_data([SimpleNamespace(id=42)])
+    assert main.legacy_data_files() == []
+    assert (legacy_dir / "guilds" / "42" / POINTS_FILE).read_text() == '{"5": 10.0}'
+    assert (legacy_dir / "guilds" / "42" / POINTS_JOURNAL_FILE).exists()
+
+
+def test_legacy_data_without_mapping_refuses_to_start(legacy_dir):
+    assert not main.adopt_legacy_data([SimpleNamespace(id=42), SimpleNamespace(id=43)])
+    # Direktori guild sudah ada: data lama tidak ditimpa ke sana
+    (legacy_dir / "guilds" / "42").mkdir(parents=True)
+    assert not main.adopt_legacy_data([SimpleNamespace(id=42)])
+    assert (legacy_dir / POINTS_FILE).exists()
+    assert not (legacy_dir / "guilds" / "42" / POINTS_FILE).exists()
@@ -0,0 +1,101 @@
+import asyncio
+import random
+
+from locks import LockManager
+
+
+def test_reversed_key_order_does_not_deadlock(run):
+    locks = LockManager()
+    rng = random.Random(5)
+    held = set()
+
+    async def transfer(keys):
+        async with locks.hold(*keys):
+            for key in keys:
+                assert key not in held
+                held.add(key)
+            await asyncio.sleep(0)
+            for key in keys:
+                held.discard(key)
+
+    async def scenario():
+        # Transfer A->B dan B->A bersamaan, plus kombinasi key acak
+        jobs = []
+        for _ in range(200):
+            a, b, c = rng.sample(range(6), 3)
+            jobs.append(transfer([("user", a), ("user", b)]))
+            jobs.append(transfer([("user", b), ("user", a)]))
+            jobs.append(transfer([("user", c), ("request", a), ("user", b)]))
+        await asyncio.wait_for(asyncio.gather(*jobs), timeout=10)
+
+    run(scenario())
+    assert len(locks) == 0
+    assert locks.snapshot()["user"]["acquired"] == 1200
+    assert locks.snapshot()["request"]["acquired"] == 200
+
+
+def test_entries_removed_after_release_and_cancel(run):
+    locks = LockManager()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def holder():
+            async with locks.hold(("user", 1), ("request", 9)):
+                await release.wait()
+
+        async def waiter():
+            async with locks.hold(("user", 1)):
+                pass
+
+        holding = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        assert len(locks) == 2
+        # Pemakai yang dibatalkan saat menunggu ikut dilepas
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert locks._locks[("user", "1")][1] == 1
+        release.set()
+        await holding
+        assert len(locks) == 0
+
+        # Key int dan str dianggap sama
+        async with locks.hold(("user", 1), ("user", "1")):
+            assert len(locks) == 1
+        assert len(locks) == 0
+
+    run(scenario())
+
+
+def test_handoff_counted_as_contended(run):
+    locks = LockManager()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def holder():
+            async with locks.hold(("user", 1)):
+                await release.wait()
+
+        async def waiter():
+            async with locks.hold(("user", 1)):
+                pass
+
+        holding = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0)
+        # Lock baru dilepas ke waiter yang belum sempat jalan: lock kosong
+        # sesaat, tapi pemakai baru tetap harus antre di belakangnya
+        async with locks.hold(("user", 1)):
+            assert waiting.done()
+        await holding
+
+    run(scenario())
+    stats = locks.snapshot()["user"]
+    assert stats["acquired"] == 3
+    assert stats["contended"] == 2
@@ -0,0 +1,22 @@
+import pytest
+
+import main
+
+
+def test_failed_open_releases_guild_lease(tmp_path, monkeypatch, run):
+    monkeypatch.setattr(main, "GUILD_DATA_DIR", str(tmp_path))
+
+    async def broken_storage(state):
+        raise OSError("storage tidak bisa dibaca")
+
+    monkeypatch.setattr(main, "arm_guild_timers", broken_storage)
+
+    async def scenario():
+        with pytest.raises(OSError):
+            await main.guild_states.open(7)
+        return main.coordinator.holds("guild:7"), await main.shared.get("lease", "guild:7")
+
+    held, lease = run(scenario())
+    assert not held
+    assert lease is None
+    assert main.guild_states.get(7) is None
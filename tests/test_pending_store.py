@@ -0,0 +1,74 @@
+import os
+
+from journal import Journal
+from ledger import PointsLedger
+from pending_store import PendingStore
+from storage import PENDING_FILE, POINTS_JOURNAL_FILE, JsonStorage, SqliteStorage, migrate_json_to_sqlite
+
+
+async def open_ledger(directory):
+    storage = JsonStorage(directory)
+    pending = PendingStore()
+    pending.load(await storage.load_pending())
+    ledger = PointsLedger(
+        storage, os.path.join(directory, POINTS_JOURNAL_FILE), flush_interval=3600, pending=pending
+    )
+    await ledger.open()
+    return storage, pending, ledger
+
+
+def claim(n):
+    return {"guild_id": "1", "seller_id": str(n), "requester_id": "9", "price": 1.0, "deadline": 1000 + n}
+
+
+async def add_claims(directory):
+    storage, pending, ledger = await open_ledger(directory)
+    for n in range(1, 4):
+        await ledger.commit([], [pending.stage_put(f"dm{n}", claim(n))])
+    await ledger.commit([], [pending.stage_delete("dm2")])
+    assert pending.stage_delete("dm2") is None
+    # Crash sebelum compaction
+    ledger._closing = True
+    ledger._task.cancel()
+    return storage, pending
+
+
+def test_pending_changes_only_written_to_journal(tmp_path, run):
+    directory = str(tmp_path)
+    storage, pending = run(add_claims(directory))
+    assert sorted(pending.all()) == ["dm1", "dm3"]
+    assert not os.path.exists(os.path.join(directory, PENDING_FILE))
+    assert len(Journal(os.path.join(directory, POINTS_JOURNAL_FILE)).read()) == 4
+
+
+def test_pending_recovered_and_compacted_after_crash(tmp_path, run):
+    directory = str(tmp_path)
+    run(add_claims(directory))
+
+    async def reopen():
+        storage, pending, ledger = await open_ledger(directory)
+        recovered = pending.all()
+        await ledger.close()
+        return recovered, await storage.load_pending()
+
+    recovered, saved = run(reopen())
+    assert recovered == {"dm1": claim(1), "dm3": claim(3)}
+    assert saved == recovered
+    assert Journal(os.path.join(directory, POINTS_JOURNAL_FILE)).read() == []
+
+
+def test_migrate_replays_pending_from_journal(tmp_path, run):
+    directory = str(tmp_path / "json")
+    os.makedirs(directory)
+    run(add_claims(directory))
+    db_path = str(tmp_path / "bot.db")
+    migrate_json_to_sqlite(directory, db_path)
+
+    async def load():
+        storage = SqliteStorage(db_path)
+        try:
+            return await storage.load_pending()
+        finally:
+            await storage.close()
+
+    assert run(load()) == {"dm1": claim(1), "dm3": claim(3)}
@@ -0,0 +1,62 @@
+import random
+from collections import defaultdict
+
+import pytest
+
+from rate_limit import SlidingWindowLimiter
+
+
+def legacy_hits(limit, window, messages):
+    # Logika on_message sebelum SlidingWindowLimiter
+    user_message_count = defaultdict(list)
+    flagged = []
+    for key, now in messages:
+        user_message_count[key] = [t for t in user_message_count[key] if now - t < window]
+        user_message_count[key].append(now)
+        flagged.append(len(user_message_count[key]) > limit)
+    return flagged
+
+
+def limiter_hits(limiter, messages):
+    return [limiter.hit(key, now) for key, now in messages]
+
+
+def test_window_boundaries_match_legacy():
+    # limit 3 dalam 10 detik: pesan detik ke-0 sudah di luar window saat
+    # detik ke-10, pesan dengan timestamp sama dihitung masing-masing
+    messages = [("a", t) for t in (0, 1, 2, 10, 10, 11, 11, 12, 21, 22, 22, 22, 40)]
+    expected = legacy_hits(3, 10, messages)
+    assert limiter_hits(SlidingWindowLimiter(3, 10), messages) == expected
+    assert expected == [False, False, False, False, True, True, True, True, False, False, False, True, False]
+
+
+@pytest.mark.parametrize("limit,window", [(1, 5), (3, 10), (7, 60)])
+def test_random_stream_matches_legacy(limit, window):
+    rng = random.Random(limit * 100 + window)
+    now = 0
+    messages = []
+    for _ in range(5000):
+        # Langkah bulat supaya banyak pesan jatuh tepat di tepi window
+        now += rng.choice((0, 0, 1, 1, 2, window // 2, window, window + 1))
+        messages.append((rng.randrange(20), now))
+    limiter = SlidingWindowLimiter(limit, window)
+    assert limiter_hits(limiter, messages) == legacy_hits(limit, window, messages)
+    # Key idle dibuang, slot dipakai ulang
+    assert len(limiter) <= 20
+    limiter.hit("baru", now + window)
+    assert len(limiter) == 1
+    assert limiter.evicted == 0
+
+
+def test_capacity_evicts_least_recent_key():
+    limiter = SlidingWindowLimiter(1, 100, capacity=2)
+    assert limiter.hit("a", 0) is False
+    assert limiter.hit("b", 1) is False
+    assert limiter.hit("a", 2) is True
+    # "b" paling lama tidak aktif: dikorbankan, riwayatnya hilang
+    assert limiter.hit("c", 3) is False
+    assert limiter.evicted == 1
+    assert limiter.hit("b", 4) is False
+    assert limiter.evicted == 2
+    assert limiter.hit("c", 5) is True
+    assert len(limiter) == 2
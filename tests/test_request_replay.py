@@ -0,0 +1,179 @@
+import json
+import os
+
+from journal import Journal
+from ledger import PointsLedger
+from request_store import RequestStore
+from snapshot import Snapshot, export_json
+from storage import POINTS_JOURNAL_FILE, REQUESTS_FILE, JsonStorage, SqliteStorage, migrate_json_to_sqlite, replay_requests
+
+
+def make_request(requester_id, comments, link="https://x.com/a/status/1"):
+    return {
+        "requester_id": str(requester_id),
+        "link": link,
+        "tasks": [
+            {"type": "comment", "text": text, "price": 1.0, "assigned_to": None, "status": "open"}
+            for text in comments
+        ],
+        "channel_id": "100",
+        "liked_by": [],
+        "retweeted_by": [],
+        "followed_by": [],
+        "expiry_timestamp": 2_000_000_000,
+        "escrow_key": f"escrow_{requester_id}",
+    }
+
+
+def indexes(store):
+    requesters = {str(r["requester_id"]) for r in store.all().values()}
+    return (
+        {requester: store.by_requester(requester) for requester in requesters},
+        {msg_id: store.open_comments(msg_id) for msg_id in store.with_open_comments()},
+    )
+
+
+async def build_live(directory):
+    # Request lama sudah dipadatkan ke requests.json; perubahan berikutnya
+    # hanya ada di journal (bot crash sebelum compaction)
+    with open(os.path.join(directory, REQUESTS_FILE), "w") as f:
+        json.dump({"30": make_request(3, ["lama 1", "lama 2"], link="https://x.com/c/status/3")}, f)
+    storage = JsonStorage(directory)
+    requests = RequestStore()
+    requests.load(await storage.load_requests())
+    ledger = PointsLedger(
+        storage, os.path.join(directory, POINTS_JOURNAL_FILE), flush_interval=3600, requests=requests
+    )
+    await ledger.open()
+
+    await ledger.commit([], [requests.stage_put("10", make_request(1, ["satu", "dua", "tiga"]))])
+    await ledger.commit([], [requests.stage_put("20", make_request(2, ["x"], link="https://x.com/b/status/2"))])
+    await ledger.commit([], [requests.stage_task("10", 0, assigned_to="5", status="claimed")])
+    await ledger.commit([], [requests.stage_add_reactor("10", "liked_by", 7)])
+    await ledger.commit([], [requests.stage_add_reactor("10", "liked_by", 7)])  # None: sudah tercatat
+    await ledger.commit([], [requests.stage_task("10", 2, assigned_to="6", status="claimed")])
+    await ledger.commit([], [requests.stage_task("10", 2, assigned_to=None, status="open")])
+    await ledger.commit([], [requests.stage_task("30", 1, assigned_to="8", status="claimed")])
+    await ledger.commit([], [requests.stage_task("30", 1, status="confirmed")])
+    await ledger.commit([], [requests.stage_add_reactor("30", "followed_by", 9)])
+    await ledger.commit([], [requests.stage_delete("20")])
+
+    # Crash: tanpa close() / compaction
+    ledger._closing = True
+    ledger._task.cancel()
+    return requests
+
+
+def test_live_store_matches_expected_state(tmp_path, run):
+    live = run(build_live(str(tmp_path)))
+    requests = live.all()
+    assert sorted(requests) == ["10", "30"]
+    assert requests["10"]["liked_by"] == ["7"]
+    assert [t["status"] for t in requests["10"]["tasks"]] == ["claimed", "open", "open"]
+    assert (requests["30"]["tasks"][1]["assigned_to"], requests["30"]["tasks"][1]["status"]) == ("8", "confirmed")
+    assert requests["30"]["followed_by"] == ["9"]
+    assert live.open_comments("10") == [1, 2]
+    assert live.open_comments("30") == [0]
+
+
+def test_replay_twice_is_identical(tmp_path, run):
+    live = run(build_live(str(tmp_path)))
+    base = run(JsonStorage(str(tmp_path)).load_requests())
+    records = [
+        item
+        for record in Journal(str(tmp_path / POINTS_JOURNAL_FILE)).read()
+        for item in record.get("records", ())
+    ]
+
+    once = RequestStore()
+    once.load(json.loads(json.dumps(base)))
+    for record in records:
+        once.apply(record)
+
+    twice = RequestStore()
+    twice.load(json.loads(json.dumps(base)))
+    for record in records + records:
+        twice.apply(record)
+
+    assert once.all() == live.all()
+    assert twice.all() == live.all()
+    assert indexes(once) == indexes(live)
+    assert indexes(twice) == indexes(live)
+
+
+def test_crash_recovery_restores_live_store(tmp_path, run):
+    directory = str(tmp_path)
+    live = run(build_live(directory))
+
+    async def reopen():
+        storage = JsonStorage(directory)
+        requests = RequestStore()
+        requests.load(await storage.load_requests())
+        ledger = PointsLedger(storage, os.path.join(directory, POINTS_JOURNAL_FILE), requests=requests)
+        await ledger.open()
+        await ledger.close()
+        return requests, await storage.load_requests()
+
+    recovered, compacted = run(reopen())
+    assert recovered.all() == live.all()
+    assert indexes(recovered) == indexes(live)
+    # Replay di open() langsung dipadatkan ke storage
+    assert compacted == live.all()
+
+
+def test_mixed_value_and_op_records():
+    # Journal lama berisi request utuh ("value"), yang baru berisi "ops"
+    request = make_request(1, ["a", "b"])
+    updated = make_request(1, ["a", "b"])
+    updated["tasks"][0].update(assigned_to="4", status="claimed")
+    journal = [
+        {"legs": [], "records": [{"store": REQUESTS_FILE, "key": "10", "value": request}]},
+        {"legs": [], "records": [{"store": REQUESTS_FILE, "key": "10", "ops": [["add", "liked_by", "7"]]}]},
+        # Baris format lama menimpa seluruh request (termasuk liked_by)
+        {"legs": [], "records": [{"store": REQUESTS_FILE, "key": "10", "value": updated}]},
+        {"legs": [], "records": [
+            {"store": REQUESTS_FILE, "key": "10", "ops": [["task", 1, {"assigned_to": "5", "status": "claimed"}]]},
+            {"store": "pending_dm.json", "key": "99", "value": None},
+        ]},
+        {"legs": [], "records": [{"store": REQUESTS_FILE, "key": "11", "value": make_request(2, ["c"])}]},
+        {"legs": [], "records": [{"store": REQUESTS_FILE, "key": "11", "value": None}]},
+        # Op untuk request yang sudah dihapus diabaikan
+        {"legs": [], "records": [{"store": REQUESTS_FILE, "key": "11", "ops": [["add", "liked_by", "8"]]}]},
+    ]
+
+    replayed = replay_requests({}, json.loads(json.dumps(journal)))
+    assert sorted(replayed) == ["10"]
+    assert replayed["10"]["liked_by"] == []
+    assert [(t["assigned_to"], t["status"]) for t in replayed["10"]["tasks"]] == [("4", "claimed"), ("5", "claimed")]
+
+    store = RequestStore()
+    for record in journal:
+        for item in record["records"]:
+            if item["store"] == REQUESTS_FILE:
+                store.apply(json.loads(json.dumps(item)))
+    assert store.all() == replayed
+    assert store.with_open_comments() == []
+    assert store.by_requester(2) == []
+
+
+def test_migrate_and_export_match_live_store(tmp_path, run):
+    directory = str(tmp_path / "json")
+    os.makedirs(directory)
+    live = run(build_live(directory))
+
+    db_path = str(tmp_path / "bot.db")
+    migrate_json_to_sqlite(directory, db_path)
+
+    async def load_sqlite():
+        storage = SqliteStorage(db_path)
+        try:
+            return await storage.load_requests()
+        finally:
+            await storage.close()
+
+    assert run(load_sqlite()) == live.all()
+
+    snapshot_path = str(tmp_path / "state.snap")
+    export_json(directory, snapshot_path)
+    with Snapshot(snapshot_path) as snap:
+        assert snap.get("requests") == live.all()
@@ -0,0 +1,142 @@
+import asyncio
+import os
+
+import pytest
+
+from journal import Journal
+from ledger import PointsLedger
+from locks import LockManager
+from pending_store import PendingStore
+from request_store import RequestStore
+from settlement import SettlementQueue
+from storage import POINTS_JOURNAL_FILE, JsonStorage
+
+
+def make_request(requester_id, sellers):
+    return {
+        "requester_id": str(requester_id),
+        "link": "https://x.com/a/status/1",
+        "tasks": [
+            {"type": "comment", "text": f"komentar {seller}", "price": 1.0, "assigned_to": str(seller), "status": "claimed"}
+            for seller in sellers
+        ],
+        "channel_id": "100",
+        "liked_by": [],
+        "retweeted_by": [],
+        "followed_by": [],
+        "expiry_timestamp": 2_000_000_000,
+        "escrow_key": f"escrow_{requester_id}",
+    }
+
+
+def claim(seller_id, task_idx):
+    return {
+        "request_id": "10", "seller_id": str(seller_id), "requester_id": "1",
+        "task_idx": task_idx, "is_comment": True, "user_pays": 1.0, "price": 1.5,
+    }
+
+
+async def open_queue(directory):
+    storage = JsonStorage(directory)
+    requests = RequestStore()
+    pending = PendingStore()
+    ledger = PointsLedger(
+        storage, os.path.join(directory, POINTS_JOURNAL_FILE), flush_interval=3600,
+        requests=requests, pending=pending,
+    )
+    await ledger.open()
+    queue = SettlementQueue(ledger, requests, pending, LockManager(), window=0.05)
+    return ledger, requests, pending, queue
+
+
+async def setup(ledger, requests, pending):
+    await ledger.commit(ledger.stage_adjust("1", 10))
+    await ledger.commit([], [requests.stage_put("10", make_request(1, [5, 6]))])
+    for idx, seller in enumerate((5, 6)):
+        await ledger.commit([], [pending.stage_put(f"dm{seller}", claim(seller, idx))])
+
+
+def test_same_request_in_one_window_applied_once_each(tmp_path, run):
+    directory = str(tmp_path)
+    path = os.path.join(directory, POINTS_JOURNAL_FILE)
+
+    async def scenario():
+        ledger, requests, pending, queue = await open_queue(directory)
+        await setup(ledger, requests, pending)
+        before = len(Journal(path).read())
+        results = await asyncio.gather(
+            queue.submit(claim(5, 0), True, dm_id="dm5"),
+            queue.submit(claim(6, 1), True, dm_id="dm6"),
+        )
+        after = len(Journal(path).read())
+        live = (dict(ledger.balances), [task["status"] for task in requests.get("10")["tasks"]], pending.all())
+        # Crash lalu replay: batch tidak boleh diterapkan dua kali
+        ledger._closing = True
+        ledger._task.cancel()
+        ledger, requests, pending, _ = await open_queue(directory)
+        replayed = (dict(ledger.balances), [task["status"] for task in requests.get("10")["tasks"]], pending.all())
+        await ledger.close()
+        return [result.status for result in results], after - before, live, replayed
+
+    statuses, lines, live, replayed = run(scenario())
+    assert statuses == ["approved", "approved"]
+    # Satu baris journal (satu fsync) untuk kedua settlement
+    assert lines == 1
+    # Subsidi 0.5 per task dari sistem
+    expected = ({"1": 8.0, "5": 1.5, "6": 1.5}, ["confirmed", "confirmed"], {})
+    assert live == expected
+    assert replayed == expected
+
+
+def test_failed_commit_fails_every_waiter(tmp_path, run):
+    directory = str(tmp_path)
+
+    async def scenario():
+        ledger, requests, pending, queue = await open_queue(directory)
+        await setup(ledger, requests, pending)
+        commit = ledger.commit
+
+        async def failing_commit(legs, records=()):
+            raise OSError("disk penuh")
+
+        ledger.commit = failing_commit
+        outcomes = await asyncio.wait_for(asyncio.gather(
+            queue.submit(claim(5, 0), True, dm_id="dm5"),
+            queue.submit(claim(6, 1), False, dm_id="dm6"),
+            queue.submit({**claim(7, None), "request_id": "99"}, True),
+            return_exceptions=True,
+        ), timeout=5)
+
+        # Antrean tetap jalan setelah batch gagal
+        ledger.commit = commit
+        after = await asyncio.wait_for(queue.submit({**claim(7, None), "request_id": "99"}, True), timeout=5)
+        await queue.close()
+        await ledger.close()
+        return outcomes, after.status
+
+    outcomes, after = run(scenario())
+    assert len(outcomes) == 3
+    for outcome in outcomes:
+        assert isinstance(outcome, OSError)
+    assert after == "missing"
+
+
+@pytest.mark.parametrize("max_batch", [1, 500])
+def test_batch_size_does_not_change_result(tmp_path, run, max_batch):
+    directory = str(tmp_path)
+
+    async def scenario():
+        ledger, requests, pending, queue = await open_queue(directory)
+        queue.max_batch = max_batch
+        await setup(ledger, requests, pending)
+        results = await asyncio.gather(
+            queue.submit(claim(5, 0), True, dm_id="dm5"),
+            queue.submit(claim(6, 1), False, dm_id="dm6"),
+        )
+        state = (dict(ledger.balances), [task["status"] for task in requests.get("10")["tasks"]], pending.all())
+        await ledger.close()
+        return [result.status for result in results], state
+
+    statuses, state = run(scenario())
+    assert statuses == ["approved", "rejected"]
+    assert state == ({"1": 9.0, "5": 1.5}, ["confirmed", "open"], {})
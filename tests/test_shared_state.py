@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from shared_state import InProcessStateStore, LeaseCoordinator, SqliteStateStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path, clock):
+    # -> fn() yang membuat store baru; store sqlite di path yang sama
+    # berbagi data seperti dua proses
+    stores = []
+
+    def make():
+        if request.param == "memory":
+            store = stores[0] if stores else InProcessStateStore(clock=clock)
+        else:
+            store = SqliteStateStore(str(tmp_path / "shared.db"), clock=clock)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        if isinstance(store, SqliteStateStore):
+            asyncio.run(store.close())
+
+
+def test_double_decision_only_one_wins(make_store, clock, run):
+    # Pola decide_confirmation: reaksi DM vs auto-approve menulis "decision"
+    # dengan version=0; hanya satu yang menang dan nilainya yang tersimpan
+    first, second = make_store(), make_store()
+    key = "1:555"
+
+    async def race():
+        return await asyncio.gather(
+            first.put("decision", key, False, version=0, expires=clock() + 60),
+            second.put("decision", key, True, version=0, expires=clock() + 60),
+        )
+
+    results = run(race())
+    assert sum(result is not None for result in results) == 1
+    winner = False if results[0] is not None else True
+    assert run(first.get("decision", key)).value is winner
+    assert run(second.get("decision", key)).value is winner
+    # Keputusan berikutnya untuk klaim yang sama juga kalah
+    assert run(second.put("decision", key, not winner, version=0)) is None
+
+
+def test_version_zero_put_after_expiry(make_store, clock, run):
+    store = make_store()
+    assert run(store.put("daily_reward", "1:2", 1, version=0, expires=clock() + 10)) is not None
+    assert run(store.put("daily_reward", "1:2", 2, version=0, expires=clock() + 10)) is None
+
+    clock.advance(10)
+    assert run(store.get("daily_reward", "1:2")) is None
+    assert run(store.put("daily_reward", "1:2", 3, version=0, expires=clock() + 10)) is not None
+    assert run(store.get("daily_reward", "1:2")).value == 3
+
+
+def test_stale_version_rejected(make_store, run):
+    store = make_store()
+    version = run(store.put("confirm_batch", "9", {"claims": ["a", "b"]}))
+    assert run(store.put("confirm_batch", "9", {"claims": [None, "b"]}, version=version)) == version + 1
+    assert run(store.put("confirm_batch", "9", {"claims": ["a", None]}, version=version)) is None
+    assert run(store.get("confirm_batch", "9")).value == {"claims": [None, "b"]}
+
+
+def test_scan_decisions_per_guild(make_store, clock, run):
+    # poll_decisions membaca keputusan guild-nya lewat prefix "guild_id:"
+    store = make_store()
+    run(store.put("decision", "1:10", True, expires=clock() + 60))
+    run(store.put("decision", "1:11", False, expires=clock() + 5))
+    run(store.put("decision", "12:10", True, expires=clock() + 60))
+    assert sorted((k, r.value) for k, r in run(store.scan("decision", prefix="1:"))) == [("1:10", True), ("1:11", False)]
+
+    clock.advance(5)
+    assert [k for k, _ in run(store.scan("decision", prefix="1:"))] == ["1:10"]
+    run(store.purge_expired())
+    assert run(store.get("decision", "1:11")) is None
+
+
+def test_lease_takeover_after_ttl_calls_on_lost(make_store, clock, run):
+    lost = []
+
+    async def on_lost(name):
+        lost.append(name)
+
+    first = LeaseCoordinator(make_store(), "proses-a", ttl=30, on_lost=on_lost)
+    second = LeaseCoordinator(make_store(), "proses-b", ttl=30)
+
+    async def scenario():
+        assert await first.acquire("guild:1", wait=False)
+        # Masih dipegang proses lain
+        assert not await second.acquire("guild:1", wait=False)
+
+        # Proses A macet lebih lama dari TTL; B mengambil alih
+        clock.advance(31)
+        assert await second.acquire("guild:1", wait=False)
+
+        # Perpanjangan A gagal -> on_lost dipanggil, lease tidak lagi dipegang
+        await first._tick()
+        await asyncio.gather(*first._lost_tasks)
+        assert not first.holds("guild:1")
+        assert second.holds("guild:1")
+
+        # Pelepasan oleh A tidak boleh menghapus lease milik B
+        await first.store.release_lease("guild:1", "proses-a")
+        assert (await second.store.get("lease", "guild:1")).value == "proses-b"
+
+    run(scenario())
+    assert lost == ["guild:1"]
+
+
+def test_in_process_capacity_only_bounds_cache_namespaces(run):
+    store = InProcessStateStore(capacity=2, bounded=("daily_given",))
+
+    async def fill():
+        for i in range(5):
+            await store.put("daily_given", str(i), i)
+            await store.put("pending", str(i), "1")
+
+    run(fill())
+    assert len(run(store.scan("daily_given"))) == 2
+    assert len(run(store.scan("pending"))) == 5
@@ -0,0 +1,55 @@
+import os
+import signal
+import subprocess
+import sys
+
+from journal import Journal
+from storage import POINTS_JOURNAL_FILE, JsonStorage
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Proses bot tanpa koneksi Discord: buka satu guild, kredit masuk buffer
+# ledger (belum di-fsync), lalu tunggu sampai close() selesai
+BOT = """
+import asyncio
+import main
+
+async def run():
+    await main.bot.setup_hook()
+    state = await main.guild_states.open(5)
+    state.ledger.credit(42, 3.5)
+    print("siap", flush=True)
+    while not main.bot.is_closed():
+        await asyncio.sleep(0.05)
+
+asyncio.run(run())
+"""
+
+
+def test_buffered_credit_survives_sigterm(tmp_path, run):
+    directory = tmp_path / "guilds" / "5"
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        GUILD_DATA_DIR=str(tmp_path / "guilds"),
+        LEDGER_FLUSH_INTERVAL="3600",
+        METRICS_PORT="0",
+    )
+    bot = subprocess.Popen(
+        [sys.executable, "-c", BOT], cwd=tmp_path, env=env, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        for line in bot.stdout:
+            if line.strip() == "siap":
+                break
+        # Kredit hanya ada di memori proses bot
+        assert Journal(str(directory / POINTS_JOURNAL_FILE)).read() == []
+        assert run(JsonStorage(str(directory)).load_balances()) == {}
+
+        bot.send_signal(signal.SIGTERM)
+        assert bot.wait(timeout=30) == 0
+    finally:
+        bot.kill()
+        bot.stdout.close()
+
+    assert run(JsonStorage(str(directory)).load_balances()) == {"42": 3.5}
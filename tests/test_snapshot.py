@@ -0,0 +1,146 @@
+import os
+from array import array
+
+import pytest
+
+from guild_state import GuildState
+from snapshot import SNAPSHOT_FILE, Snapshot, SnapshotError, build_sections, write_snapshot
+from storage import POINTS_FILE, JsonStorage
+
+
+def make_state(directory):
+    return GuildState(
+        1, directory, render=lambda request: None, ledger_flush_interval=3600,
+        snapshot_path=os.path.join(directory, SNAPSHOT_FILE),
+    )
+
+
+def make_request(requester_id):
+    return {
+        "requester_id": str(requester_id),
+        "link": "https://x.com/a/status/1",
+        "tasks": [{"type": "comment", "text": "halo", "price": 1.0, "assigned_to": "5", "status": "claimed"}],
+        "channel_id": "100",
+        "liked_by": ["7"],
+        "retweeted_by": [],
+        "followed_by": [],
+        "expiry_timestamp": 2_000_000_000,
+        "escrow_key": f"escrow_{requester_id}",
+    }
+
+
+ENGAGEMENT_KEY = f"{0xabcdef:016x}"
+
+
+def dump(state):
+    return {
+        "balances": dict(state.ledger.balances),
+        "requests": state.requests.all(),
+        "pending": state.pending.all(),
+        "engaged": state.engagement_index.contains(ENGAGEMENT_KEY, "like"),
+        "follows": (state.follow_graph.is_following(5, 6), state.follow_graph.is_following(6, 5)),
+        "giver_stats": state.giver_stats.all(),
+        "preferences": state.preferences,
+    }
+
+
+async def populate(directory):
+    state = make_state(directory)
+    await state.open()
+    ledger = state.ledger
+    await ledger.commit(ledger.stage_adjust("1", 12.5))
+    ledger.hold_escrow("1", "escrow_1", 2)
+    await ledger.commit([], [state.requests.stage_put("10", make_request(1))])
+    await ledger.commit([], [state.pending.stage_put("dm1", {"request_id": "10", "seller_id": "5"})])
+    await ledger.commit([], [state.engagement_index.stage(ENGAGEMENT_KEY, "like")])
+    await state.storage.add_follow(5, 6)
+    state.follow_graph.add(5, 6)
+    await ledger.commit(ledger.stage_transfer("1", "5", 2), [state.giver_stats.stage_add("1", 2)])
+    await state.storage.put_preferences("5", {"confirm_mode": "digest"})
+    state.preferences["5"] = {"confirm_mode": "digest"}
+    expected = dump(state)
+    await state.close()
+    return expected
+
+
+async def reopen(directory):
+    state = make_state(directory)
+    await state.open()
+    result = dump(state)
+    await state.close()
+    return result
+
+
+def test_close_and_reopen_round_trips_through_snapshot(tmp_path, run, capsys):
+    directory = str(tmp_path)
+    expected = run(populate(directory))
+    assert os.path.exists(os.path.join(directory, SNAPSHOT_FILE))
+    capsys.readouterr()
+
+    assert run(reopen(directory)) == expected
+    assert "dibuka dari snapshot" in capsys.readouterr().out
+    # Tanpa perubahan storage, snapshot tetap dipakai pada start berikutnya
+    assert run(reopen(directory)) == expected
+    assert "dibuka dari snapshot" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("change", ["size", "mtime"])
+def test_stale_fingerprint_falls_back_to_storage(tmp_path, run, capsys, change):
+    directory = str(tmp_path)
+    expected = run(populate(directory))
+    path = os.path.join(directory, POINTS_FILE)
+    if change == "size":
+        # Storage ditulis proses lain setelah snapshot
+        JsonStorage(directory)._write(POINTS_FILE, {"1": 8.5, "5": 2.0, "escrow_1": 2.0, "9": 100.0})
+        expected["balances"]["9"] = 100.0
+    else:
+        # Isi sama, hanya mtime yang maju
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    capsys.readouterr()
+
+    assert run(reopen(directory)) == expected
+    out = capsys.readouterr().out
+    assert "lebih lama dari storage" in out
+    assert "dibuka dari storage" in out
+
+
+def test_corrupt_snapshot_falls_back_to_storage(tmp_path, run, capsys):
+    directory = str(tmp_path)
+    expected = run(populate(directory))
+    with open(os.path.join(directory, SNAPSHOT_FILE), "r+b") as f:
+        f.write(b"rusak")
+    capsys.readouterr()
+
+    assert run(reopen(directory)) == expected
+    out = capsys.readouterr().out
+    assert "tidak bisa dibaca" in out
+    assert "dibuka dari storage" in out
+
+
+def test_sections_round_trip(tmp_path):
+    path = str(tmp_path / SNAPSHOT_FILE)
+    follows = (array('Q', [5]), array('Q', [6]), array('Q', [6]), array('Q', [5]))
+    write_snapshot(path, build_sections(
+        balances={"1": 1.5, "escrow_1": 2.0},
+        engagements=(array('Q', [1, 2]), bytearray([1, 3])),
+        follows=follows,
+        giver_stats={"5": (3, 4.5)},
+        requests={"10": make_request(1)},
+        pending={"dm1": {"seller_id": "5"}},
+        mutes={},
+        meta={"fingerprint": {"a": [1, 2]}},
+    ))
+    with Snapshot(path) as snap:
+        assert snap.meta()["fingerprint"] == {"a": [1, 2]}
+        assert snap.balances() == {"1": 1.5, "escrow_1": 2.0}
+        keys, masks = snap.engagements()
+        assert (list(keys), list(masks)) == ([1, 2], [1, 3])
+        assert snap.follows() == list(follows)
+        assert snap.giver_stats() == {"5": (3, 4.5)}
+        assert snap.get("requests") == {"10": make_request(1)}
+        assert snap.get("pending") == {"dm1": {"seller_id": "5"}}
+        assert snap.get("preferences") == {}
+        assert "tidak_ada" not in snap
+        with pytest.raises(SnapshotError):
+            snap.require("tidak_ada")